@@ -2,6 +2,7 @@ import hashlib
 import hmac as _hmac
 import json
 import logging
+from datetime import datetime, timezone
 
 from flask import Flask, g, render_template
 from flask import request as flask_request
@@ -13,10 +14,13 @@ from flask_wtf.csrf import CSRFProtect
 from app.i18n import (
     DEFAULT_LOCALE,
     build_switch_locale_url,
+    compile_catalogs,
     get_alternate_locale,
     get_locale_meta,
     get_supported_locale_codes,
+    get_translator,
     load_translations,
+    reload_catalogs_if_changed,
     resolve_locale,
     translate,
 )
@@ -58,6 +62,11 @@ def create_app(config_name="development"):
     # Logging
     _configure_logging(app)
 
+    # Request timing — registered first so the total covers every other hook
+    from app.perf import request_metrics
+
+    request_metrics.init_app(app)
+
     # Custom Jinja filters
     @app.template_filter("from_json")
     def from_json_filter(value):
@@ -66,6 +75,15 @@ def create_app(config_name="development"):
         except (json.JSONDecodeError, TypeError):
             return []
 
+    # Translation catalogs are compiled once; debug servers pick up edits
+    # to the JSON files without a restart.
+    compile_catalogs()
+    if app.debug:
+
+        @app.before_request
+        def reload_translation_catalogs():
+            reload_catalogs_if_changed()
+
     @app.before_request
     def set_request_locale_defaults():
         raw_locale = (
@@ -79,6 +97,7 @@ def create_app(config_name="development"):
         meta = get_locale_meta(locale)
         alternate_locale = get_alternate_locale(locale)
         return {
+            "t": get_translator(locale),
             "current_locale": locale,
             "locale_dir": meta["dir"],
             "locale_label": meta["label"],
@@ -92,6 +111,11 @@ def create_app(config_name="development"):
     app.jinja_env.globals["t"] = translate
     app.jinja_env.globals["load_locale_translations"] = load_translations
 
+    # image_url() / picture() for responsive image variants
+    from app.images import init_images
+
+    init_images(app)
+
     # ── Security headers ─────────────────────────────────────────────
     @app.after_request
     def set_security_headers(response):
@@ -141,9 +165,18 @@ def create_app(config_name="development"):
         return render_template("errors/500.html"), 500
 
     # ── Visitor tracking ────────────────────────────────────────────
+    from app.analytics import visit_buffer
+    from app.utils import classify_user_agent
+
+    visit_buffer.init_app(app)
+
     @app.before_request
     def track_page_visit():
-        """Record page visits for analytics (public GET pages only)."""
+        """Record page visits for analytics (public GET pages only).
+
+        Visits are queued on ``visit_buffer`` and written in batches by a
+        background flusher, so no database round-trip happens here.
+        """
         path = flask_request.path
         normalized_path = path
         segments = [segment for segment in path.split("/") if segment]
@@ -156,11 +189,10 @@ def create_app(config_name="development"):
             flask_request.method != "GET"
             or path.startswith(("/static", "/admin", "/api"))
             or normalized_path in ("/robots.txt", "/sitemap.xml", "/feed.xml")
+            or normalized_path.startswith("/sitemap-")
         ):
             return
         try:
-            from app.models import PageVisit
-
             ip_raw = flask_request.remote_addr or "unknown"
             # Salted HMAC — not rainbow-tableable unlike plain sha256
             secret = app.config["SECRET_KEY"].encode()
@@ -170,17 +202,36 @@ def create_app(config_name="development"):
             country = (
                 accept_lang.split(",")[0].split(";")[0].strip() if accept_lang else ""
             )
-            visit = PageVisit(
+            user_agent = (flask_request.user_agent.string or "")[:500]
+            browser, os_code, device = classify_user_agent(user_agent)
+            visit_buffer.record(
                 path=normalized_path[:500],
                 referrer=(flask_request.referrer or "")[:500],
-                user_agent=(flask_request.user_agent.string or "")[:500],
+                user_agent=user_agent,
                 ip_hash=ip_hash,
-                country=country,
+                country=country[:100],
+                visited_at=datetime.now(timezone.utc),
+                browser=browser,
+                os=os_code,
+                device=device,
             )
-            db.session.add(visit)
-            db.session.commit()
         except Exception:
-            db.session.rollback()
+            app.logger.exception("Failed to queue page visit")
+
+    # ── Email outbox ────────────────────────────────────────────────
+    from app.outbox import outbox
+
+    outbox.init_app(app)
+
+    # ── Page cache ──────────────────────────────────────────────────
+    from app.cache import page_cache
+
+    page_cache.init_app(app)
+
+    # ── Hashed static assets ────────────────────────────────────────
+    from app.assets import asset_pipeline
+
+    asset_pipeline.init_app(app)
 
     # Register blueprints
     from app.admin import admin_bp
@@ -189,6 +240,16 @@ def create_app(config_name="development"):
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp)
 
+    # CLI maintenance commands
+    from app.commands import register_commands
+
+    register_commands(app)
+
+    # Compile templates now instead of on each worker's first requests
+    from app.templating import init_templates
+
+    init_templates(app)
+
     # Create database tables
     with app.app_context():
         db.create_all()
@@ -7,7 +7,6 @@ import hmac
 import json
 import logging
 import os
-import uuid
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 
@@ -16,6 +15,7 @@ from flask import (
     abort,
     current_app,
     flash,
+    get_template_attribute,
     jsonify,
     redirect,
     render_template,
@@ -23,25 +23,31 @@ from flask import (
     session,
     url_for,
 )
-from werkzeug.utils import secure_filename
 
 from app import db, limiter
+from app.analytics import compact_visits, dashboard_stats, visit_buffer
+from app.cache import page_cache
+from app.images import generate_variants, strip_metadata
+from app.mailer import transport_stats
 from app.models import (
     BlogPost,
     Experience,
     ImpactCard,
     LanguageItem,
+    ListingMixin,
     Message,
     PageVisit,
     Project,
     SiteConfig,
     SkillCluster,
 )
+from app.outbox import outbox
+from app.pagination import keyset_page
+from app.perf import request_metrics
+from app.uploads import UploadRejected, store_upload
 from app.utils import (
     generate_slug,
     get_email_config_status,
-    parse_locale,
-    parse_user_agent_short,
     safe_int,
     sanitize_html,
     sanitize_input,
@@ -154,150 +160,110 @@ def test_email():
     return redirect(url_for("admin.dashboard") + "#tab-messages")
 
 
-# ── Dashboard ────────────────────────────────────
-@admin_bp.route("/")
+@admin_bp.route("/outbox/retry", methods=["POST"])
 @login_required
-def dashboard():
-    from sqlalchemy import func
-
-    projects = Project.query.order_by(Project.sort_order).all()
-    experiences = Experience.query.order_by(Experience.sort_order).all()
-    messages = Message.query.order_by(Message.created_at.desc()).all()
-    unread = Message.query.filter_by(is_read=False).count()
-    blog_posts = BlogPost.query.order_by(BlogPost.created_at.desc()).all()
-    site_configs = SiteConfig.query.order_by(SiteConfig.group, SiteConfig.key).all()
-    impact_cards = ImpactCard.query.order_by(ImpactCard.sort_order).all()
-    skill_clusters = SkillCluster.query.order_by(SkillCluster.sort_order).all()
-    language_items = LanguageItem.query.order_by(LanguageItem.sort_order).all()
-
-    # ── Analytics (wrapped so a DB issue doesn't crash the whole dashboard) ──
-    total_visits = 0
-    today_visits = 0
-    unique_visitors = 0
-    top_pages = []
-    top_referrers = []
-    top_countries = []
-    recent_visits = []
-    daily_labels = []
-    daily_counts = []
-    top_browsers = []
-    top_os = []
-    device_breakdown = []
-    avg_pages = 0
-    bounce_rate = 0
+def outbox_retry():
+    """Re-queue notification emails that exhausted their delivery attempts."""
+    count = outbox.retry_dead()
+    logger.info("Outbox: %d dead email(s) re-queued", count)
+    flash(f"Re-queued {count} failed email(s).", "success")
+    return redirect(url_for("admin.dashboard") + "#tab-messages")
 
-    try:
-        total_visits = PageVisit.query.count()
 
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        today_visits = PageVisit.query.filter(
-            PageVisit.visited_at >= today_start
-        ).count()
+@admin_bp.route("/performance/reset", methods=["POST"])
+@login_required
+def performance_reset():
+    """Clear this worker's request latency histograms."""
+    request_metrics.reset()
+    flash("Performance figures reset.", "success")
+    return redirect(url_for("admin.dashboard") + "#tab-performance")
 
-        unique_visitors = (
-            db.session.query(func.count(func.distinct(PageVisit.ip_hash))).scalar() or 0
-        )
 
-        top_pages = (
-            db.session.query(PageVisit.path, func.count(PageVisit.id).label("count"))
-            .group_by(PageVisit.path)
-            .order_by(func.count(PageVisit.id).desc())
-            .limit(10)
-            .all()
-        )
-
-        top_referrers = (
-            db.session.query(
-                PageVisit.referrer, func.count(PageVisit.id).label("count")
-            )
-            .filter(PageVisit.referrer.isnot(None), PageVisit.referrer != "")
-            .group_by(PageVisit.referrer)
-            .order_by(func.count(PageVisit.id).desc())
-            .limit(10)
-            .all()
-        )
+# ── Dashboard ────────────────────────────────────
+# Paginated dashboard tables: list name → (model, sort key, newest first,
+# row macro in admin/_rows.html, key that NULL sort keys page as).  The
+# first page is rendered with the dashboard; "Load more" fetches the rest
+# from ``admin.list_page``.
+ADMIN_LISTS = {
+    # sort_order is nullable: NULL rows page as the column default, 0
+    "projects": (Project, "sort_order", False, "project_row", 0),
+    "experiences": (Experience, "sort_order", False, "experience_row", 0),
+    "blog-posts": (BlogPost, "created_at", True, "blog_post_row", None),
+    "messages": (Message, "created_at", True, "message_row", None),
+}
 
-        # Parse locale tags into readable names
-        raw_countries = (
-            db.session.query(PageVisit.country, func.count(PageVisit.id).label("count"))
-            .filter(PageVisit.country.isnot(None), PageVisit.country != "")
-            .group_by(PageVisit.country)
-            .order_by(func.count(PageVisit.id).desc())
-            .limit(20)
-            .all()
-        )
-        top_countries = [(parse_locale(c.country), c.count) for c in raw_countries]
 
-        recent_visits = (
-            PageVisit.query.order_by(PageVisit.visited_at.desc()).limit(20).all()
-        )
+def _list_page(name, after=None):
+    """Return (rows, next-page URL or None) for one of ``ADMIN_LISTS``."""
+    model, key, descending, _, null_key = ADMIN_LISTS[name]
+    query = model.query
+    if issubclass(model, ListingMixin):
+        query = query.options(model.listing_options())
+    page = keyset_page(
+        query,
+        getattr(model, key),
+        model.id,
+        after=after,
+        per_page=current_app.config["ADMIN_PAGE_SIZE"],
+        descending=descending,
+        null_key=null_key,
+    )
+    next_url = None
+    if page.has_next:
+        next_url = url_for("admin.list_page", name=name, after=page.next_cursor)
+    return page.items, next_url
 
-        # ── Enhanced Analytics ──
 
-        # Visits per day (last 30 days) — use cast for PostgreSQL compat
-        thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
+@admin_bp.route("/api/lists/<name>")
+@login_required
+def list_page(name):
+    """JSON page of dashboard table rows: ``{"html": ..., "next": url}``."""
+    if name not in ADMIN_LISTS:
+        abort(404)
+    try:
+        rows, next_url = _list_page(name, request.args.get("after"))
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid cursor."}), 400
+    render_row = get_template_attribute("admin/_rows.html", ADMIN_LISTS[name][3])
+    return jsonify(
+        {"html": "".join(str(render_row(row)) for row in rows), "next": next_url}
+    )
 
-        from sqlalchemy import Date, cast
 
-        daily_visits_raw = (
-            db.session.query(
-                cast(PageVisit.visited_at, Date).label("day"),
-                func.count(PageVisit.id).label("count"),
-            )
-            .filter(PageVisit.visited_at >= thirty_days_ago)
-            .group_by(cast(PageVisit.visited_at, Date))
-            .order_by(cast(PageVisit.visited_at, Date))
-            .all()
-        )
-        # Build full 30-day series (fill gaps with 0)
-        visits_by_day = {str(row.day): row.count for row in daily_visits_raw}
-        for i in range(30):
-            d = (datetime.now(timezone.utc) - timedelta(days=29 - i)).strftime(
-                "%Y-%m-%d"
-            )
-            daily_labels.append(d)
-            daily_counts.append(visits_by_day.get(d, 0))
-
-        # Browser stats
-        all_uas = (
-            db.session.query(PageVisit.user_agent)
-            .filter(PageVisit.user_agent.isnot(None), PageVisit.user_agent != "")
-            .all()
-        )
-        browser_counts = {}
-        os_counts = {}
-        device_counts = {}
-        for (ua_str,) in all_uas:
-            parsed = parse_user_agent_short(ua_str)
-            browser_counts[parsed["browser"]] = (
-                browser_counts.get(parsed["browser"], 0) + 1
-            )
-            os_counts[parsed["os"]] = os_counts.get(parsed["os"], 0) + 1
-            device_counts[parsed["device"]] = device_counts.get(parsed["device"], 0) + 1
-
-        # Sort by count, take top 6
-        top_browsers = sorted(browser_counts.items(), key=lambda x: -x[1])[:6]
-        top_os = sorted(os_counts.items(), key=lambda x: -x[1])[:6]
-        device_breakdown = sorted(device_counts.items(), key=lambda x: -x[1])
-
-        # Avg pages per unique visitor
-        avg_pages = round(total_visits / unique_visitors, 1) if unique_visitors else 0
-
-        # Bounce rate (visitors who only viewed 1 page)
-        visitor_page_counts = (
-            db.session.query(PageVisit.ip_hash, func.count(PageVisit.id).label("pages"))
-            .group_by(PageVisit.ip_hash)
-            .all()
-        )
-        single_page_visitors = sum(1 for _, pages in visitor_page_counts if pages == 1)
-        bounce_rate = (
-            round(single_page_visitors / len(visitor_page_counts) * 100, 1)
-            if visitor_page_counts
-            else 0
-        )
+@admin_bp.route("/")
+@login_required
+def dashboard():
+    projects, projects_next = _list_page("projects")
+    experiences, experiences_next = _list_page("experiences")
+    messages, messages_next = _list_page("messages")
+    blog_posts, blog_posts_next = _list_page("blog-posts")
+    counts = {name: model.query.count() for name, (model, *_) in ADMIN_LISTS.items()}
+    unread = Message.query.filter_by(is_read=False).count()
+    site_configs = SiteConfig.query.order_by(SiteConfig.group, SiteConfig.key).all()
+    impact_cards = ImpactCard.query.order_by(ImpactCard.sort_order).all()
+    skill_clusters = SkillCluster.query.order_by(SkillCluster.sort_order).all()
+    language_items = LanguageItem.query.order_by(LanguageItem.sort_order).all()
 
+    # ── Analytics (wrapped so a DB issue doesn't crash the whole dashboard) ──
+    # Complete days come from the daily rollups; only today's rows are raw.
+    analytics = {
+        "total_visits": 0,
+        "today_visits": 0,
+        "unique_visitors": 0,
+        "top_pages": [],
+        "top_referrers": [],
+        "top_countries": [],
+        "recent_visits": [],
+        "daily_labels": [],
+        "daily_counts": [],
+        "top_browsers": [],
+        "top_os": [],
+        "device_breakdown": [],
+        "avg_pages": 0,
+        "bounce_rate": 0,
+    }
+    try:
+        analytics = dashboard_stats()
     except Exception:
         logger.exception("Analytics query failed — dashboard will show zeroes")
         db.session.rollback()
@@ -307,26 +273,29 @@ def dashboard():
         projects=projects,
         experiences=experiences,
         messages=messages,
-        unread=unread,
         blog_posts=blog_posts,
+        next_urls={
+            "projects": projects_next,
+            "experiences": experiences_next,
+            "messages": messages_next,
+            "blog-posts": blog_posts_next,
+        },
+        counts=counts,
+        unread=unread,
         site_configs=site_configs,
         impact_cards=impact_cards,
         skill_clusters=skill_clusters,
         language_items=language_items,
-        total_visits=total_visits,
-        today_visits=today_visits,
-        unique_visitors=unique_visitors,
-        top_pages=top_pages,
-        top_referrers=top_referrers,
-        top_countries=top_countries,
-        recent_visits=recent_visits,
-        daily_labels=json.dumps(daily_labels),
-        daily_counts=json.dumps(daily_counts),
-        top_browsers=top_browsers,
-        top_os=top_os,
-        device_breakdown=device_breakdown,
-        avg_pages=avg_pages,
-        bounce_rate=bounce_rate,
+        **{
+            **analytics,
+            "daily_labels": json.dumps(analytics["daily_labels"]),
+            "daily_counts": json.dumps(analytics["daily_counts"]),
+        },
+        visit_buffer_stats=visit_buffer.stats(),
+        page_cache_stats=page_cache.stats(),
+        outbox_stats=outbox.stats(),
+        mail_transports=transport_stats(),
+        perf_stats=request_metrics.stats(),
         email_config=get_email_config_status(),
     )
 
@@ -344,18 +313,20 @@ def site_config_update():
         "about_bio2_ar",
         "about_bio3_ar",
     }
-    count = 0
+    values = {}
     for key, value in request.form.items():
         if key.startswith("cfg_"):
             config_key = key[4:]  # strip 'cfg_' prefix
             if config_key in HTML_CONFIG_KEYS:
-                SiteConfig.set(config_key, sanitize_html(value, 5000))
+                values[config_key] = sanitize_html(value, 5000)
             else:
-                SiteConfig.set(config_key, sanitize_input(value, 5000))
-            count += 1
+                values[config_key] = sanitize_input(value, 5000)
+    changed = SiteConfig.set_many(values)
     db.session.commit()
-    logger.info("Site config updated — %d fields", count)
-    flash(f"Site configuration updated ({count} fields).", "success")
+    logger.info(
+        "Site config updated — %d of %d fields changed", len(changed), len(values)
+    )
+    flash(f"Site configuration updated ({len(changed)} fields changed).", "success")
     return redirect(url_for("admin.dashboard") + "#tab-site-config")
 
 
@@ -363,7 +334,11 @@ def site_config_update():
 @admin_bp.route("/purge-analytics", methods=["POST"])
 @login_required
 def purge_analytics():
-    """Delete PageVisit records older than 90 days for GDPR-style data retention."""
+    """Delete PageVisit records older than 90 days for GDPR-style data retention.
+
+    Raw rows are rolled up first so dashboard totals survive the purge.
+    """
+    compact_visits()
     retention_days = safe_int(request.form.get("retention_days", 90), 90)
     cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
     deleted = PageVisit.query.filter(PageVisit.visited_at < cutoff).delete()
@@ -462,30 +437,81 @@ def project_delete(project_id):
 
 
 # ── Experience CRUD ──────────────────────────────
+MAX_HIGHLIGHT_LENGTH = 500
+
+
+def _highlights_from_form(field: str) -> list:
+    """Sanitized highlight list from a newline-joined form field.
+
+    Raises ``ValueError`` (with a message for the admin) for a highlight
+    that would have to be truncated — cutting rich text mid-tag corrupts it.
+    """
+    highlights = []
+    for line in request.form.get(field, "").split("\n"):
+        cleaned = sanitize_html(line, MAX_HIGHLIGHT_LENGTH + 1)
+        if not cleaned:
+            continue
+        if len(cleaned) > MAX_HIGHLIGHT_LENGTH:
+            raise ValueError(
+                f"Highlight {len(highlights) + 1} is longer than "
+                f"{MAX_HIGHLIGHT_LENGTH} characters."
+            )
+        highlights.append(cleaned)
+    return highlights
+
+
+def _experience_fields() -> dict:
+    """Sanitized experience columns from the form, except the highlights."""
+    return {
+        "role": sanitize_input(request.form["role"], 200),
+        "company": sanitize_input(request.form["company"], 200),
+        "location": sanitize_input(request.form.get("location", ""), 200),
+        "date_range": sanitize_input(request.form["date_range"], 100),
+        "description": sanitize_input(request.form.get("description", ""), 2000),
+        # Arabic translations (optional)
+        "role_ar": sanitize_input(request.form.get("role_ar", ""), 200),
+        "description_ar": sanitize_input(request.form.get("description_ar", ""), 2000),
+        "sort_order": safe_int(request.form.get("sort_order", 0)),
+    }
+
+
+def _rejected_experience_form(exc: ValueError, exp_id=None):
+    """Re-render the experience form with everything the admin submitted.
+
+    The unsaved ``Experience`` keeps over-long highlights whole so only the
+    offending one needs shortening; it is never added to the session.
+    """
+    flash(str(exc), "error")
+    experience = Experience(
+        id=exp_id,
+        **_experience_fields(),
+        highlights=[
+            sanitize_html(line)
+            for line in request.form.get("highlights", "").split("\n")
+            if line.strip()
+        ],
+        highlights_ar=[
+            sanitize_html(line)
+            for line in request.form.get("highlights_ar", "").split("\n")
+            if line.strip()
+        ],
+    )
+    return render_template("admin/experience_form.html", experience=experience), 400
+
+
 @admin_bp.route("/experience/new", methods=["GET", "POST"])
 @login_required
 def experience_new():
     if request.method == "POST":
-        highlights_raw = request.form.get("highlights", "")
-        highlights = json.dumps(
-            [sanitize_html(h, 500) for h in highlights_raw.split("\n") if h.strip()]
-        )
-        highlights_raw_ar = request.form.get("highlights_ar", "")
-        highlights_ar = json.dumps(
-            [sanitize_html(h, 500) for h in highlights_raw_ar.split("\n") if h.strip()]
-        )
+        try:
+            highlights = _highlights_from_form("highlights")
+            highlights_ar = _highlights_from_form("highlights_ar")
+        except ValueError as exc:
+            return _rejected_experience_form(exc)
         experience = Experience(
-            role=sanitize_input(request.form["role"], 200),
-            company=sanitize_input(request.form["company"], 200),
-            location=sanitize_input(request.form.get("location", ""), 200),
-            date_range=sanitize_input(request.form["date_range"], 100),
-            description=sanitize_input(request.form.get("description", ""), 2000),
+            **_experience_fields(),
             highlights=highlights,
-            # Arabic translations (optional)
-            role_ar=sanitize_input(request.form.get("role_ar", ""), 200),
-            description_ar=sanitize_input(request.form.get("description_ar", ""), 2000),
             highlights_ar=highlights_ar,
-            sort_order=safe_int(request.form.get("sort_order", 0)),
         )
         db.session.add(experience)
         db.session.commit()
@@ -499,29 +525,15 @@ def experience_new():
 def experience_edit(exp_id):
     experience = Experience.query.get_or_404(exp_id)
     if request.method == "POST":
-        highlights_raw = request.form.get("highlights", "")
-        highlights = json.dumps(
-            [sanitize_html(h, 500) for h in highlights_raw.split("\n") if h.strip()]
-        )
-        highlights_raw_ar = request.form.get("highlights_ar", "")
-        highlights_ar = json.dumps(
-            [sanitize_html(h, 500) for h in highlights_raw_ar.split("\n") if h.strip()]
-        )
-        experience.role = sanitize_input(request.form["role"], 200)
-        experience.company = sanitize_input(request.form["company"], 200)
-        experience.location = sanitize_input(request.form.get("location", ""), 200)
-        experience.date_range = sanitize_input(request.form["date_range"], 100)
-        experience.description = sanitize_input(
-            request.form.get("description", ""), 2000
-        )
+        try:
+            highlights = _highlights_from_form("highlights")
+            highlights_ar = _highlights_from_form("highlights_ar")
+        except ValueError as exc:
+            return _rejected_experience_form(exc, exp_id)
+        for column, value in _experience_fields().items():
+            setattr(experience, column, value)
         experience.highlights = highlights
-        # Arabic translations
-        experience.role_ar = sanitize_input(request.form.get("role_ar", ""), 200)
-        experience.description_ar = sanitize_input(
-            request.form.get("description_ar", ""), 2000
-        )
         experience.highlights_ar = highlights_ar
-        experience.sort_order = safe_int(request.form.get("sort_order", 0))
         db.session.commit()
         logger.info("Experience updated: %s at %s", experience.role, experience.company)
         flash(f'Experience "{experience.role}" updated!', "success")
@@ -813,23 +825,6 @@ def _allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def _validate_image_bytes(stream) -> bool:
-    """Use Pillow to verify the file contains valid image data (magic-byte check).
-
-    Returns True if valid, False otherwise. Resets stream position after check.
-    """
-    try:
-        from PIL import Image
-
-        img = Image.open(stream)
-        img.verify()  # Checks headers / magic bytes without fully decoding
-        return True
-    except Exception:
-        return False
-    finally:
-        stream.seek(0)
-
-
 @admin_bp.route("/upload-image", methods=["POST"])
 @login_required
 @limiter.limit("10 per minute")
@@ -839,9 +834,14 @@ def upload_image():
     Security layers:
     1. Extension allowlist (no SVG — XSS vector)
     2. MIME type check (Content-Type header)
-    3. File-size guard
-    4. Pillow magic-byte verification (prevents disguised executables)
-    5. UUID filename (prevents path traversal / name collision)
+    3. Streamed to a temp file in chunks: magic bytes checked on the first
+       chunk, aborted as soon as it passes the size limit, then Pillow
+       verification (see app/uploads.py)
+    4. Content-hash filename (prevents path traversal / name collision, and
+       an identical re-upload reuses the stored file)
+
+    The image is stripped of metadata before it is hashed, and a newly stored
+    one is then given resized / WebP variants (see app/images.py).
     """
     if "image" not in request.files:
         return jsonify({"success": False, "message": "No file selected."}), 400
@@ -863,34 +863,34 @@ def upload_image():
         )
         return jsonify({"success": False, "message": "File type not allowed."}), 400
 
-    # 3. File-size guard (belt-and-braces alongside MAX_CONTENT_LENGTH)
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    file.seek(0)
-    if size > MAX_UPLOAD_BYTES:
-        return jsonify({"success": False, "message": "File too large (max 5 MB)."}), 400
-    if size == 0:
-        return jsonify({"success": False, "message": "Empty file."}), 400
-
-    # 4. Magic-byte validation via Pillow
-    if not _validate_image_bytes(file.stream):
-        logger.warning("Upload rejected — invalid image data: %s", file.filename)
-        return jsonify({"success": False, "message": "File is not a valid image."}), 400
-
     upload_dir = current_app.config.get(
         "UPLOAD_FOLDER",
         os.path.join(current_app.static_folder, "uploads"),
     )
-    os.makedirs(upload_dir, exist_ok=True)
 
-    # 5. UUID filename — prevents path traversal and name collisions
-    ext = file.filename.rsplit(".", 1)[1].lower()
-    unique_name = f"{uuid.uuid4().hex[:12]}.{ext}"
-    safe_name = secure_filename(unique_name)
-    file_path = os.path.join(upload_dir, safe_name)
-    file.save(file_path)
+    # 3 + 4. Stream, validate and store under the content hash
+    try:
+        stored = store_upload(
+            file.stream, upload_dir, MAX_UPLOAD_BYTES, prepare=strip_metadata
+        )
+    except UploadRejected as exc:
+        logger.warning("Upload rejected — %s (%s)", exc, file.filename)
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+    # 5. Build responsive variants; the original is still usable if this fails
+    if stored.created:
+        try:
+            generate_variants(stored.path)
+        except OSError:
+            logger.exception("Could not generate variants for %s", stored.name)
 
     # Return relative URL
-    image_url = url_for("static", filename=f"uploads/{safe_name}")
-    logger.info("Image uploaded: %s (%d bytes, %s)", safe_name, size, file.content_type)
+    image_url = url_for("static", filename=f"uploads/{stored.name}")
+    logger.info(
+        "Image uploaded: %s (%d bytes, %s%s)",
+        stored.name,
+        stored.size,
+        file.content_type,
+        "" if stored.created else ", duplicate",
+    )
     return jsonify({"success": True, "url": image_url})
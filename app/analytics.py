@@ -0,0 +1,655 @@
+"""
+Visitor analytics — write-behind ingestion, daily rollups and dashboard stats.
+
+``track_page_visit`` runs before every public GET, so it must never wait on
+the database.  Visits are appended to a bounded in-process queue and a
+background flusher writes them with one multi-row INSERT every
+``VISIT_BUFFER_BATCH_SIZE`` records or ``VISIT_BUFFER_FLUSH_MS`` milliseconds,
+whichever comes first.
+
+When the queue is full (database slow or down) new visits are dropped rather
+than blocking the request; the ``dropped`` counter reports how many.  The
+queue is drained on interpreter shutdown so a graceful worker restart loses
+nothing.
+
+With ``VISIT_BUFFER_ASYNC = False`` (the testing default) no thread is started
+and every visit is written inline, which keeps tests deterministic.
+
+Reading
+-------
+``compact_visits`` rolls each complete UTC day of raw visits up into
+``VisitRollup`` counts plus ``VisitorSketch`` HyperLogLogs (site-wide and per
+path).  ``dashboard_stats``, ``unique_visitors`` and ``bounce_counts`` then
+combine those with only today's raw rows, so the admin dashboard costs the
+same however much history is retained.
+"""
+
+import atexit
+import hashlib
+import logging
+import math
+import queue
+import threading
+import time
+import zlib
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.utils import (
+    UA_BROWSERS,
+    UA_DEVICES,
+    UA_OSES,
+    classify_user_agent,
+    parse_locale,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class VisitBuffer:
+    """Bounded queue of pending PageVisit rows with a background flusher.
+
+    Follows the Flask extension pattern: create once at import time and call
+    ``init_app(app)`` from the factory.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.async_mode = False
+        self.batch_size = 100
+        self.flush_interval = 2.0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.batch_size = max(1, app.config.get("VISIT_BUFFER_BATCH_SIZE", 100))
+        self.flush_interval = app.config.get("VISIT_BUFFER_FLUSH_MS", 2000) / 1000
+        self.async_mode = app.config.get("VISIT_BUFFER_ASYNC", True)
+        self._queue = queue.Queue(
+            maxsize=app.config.get("VISIT_BUFFER_MAX_SIZE", 10_000)
+        )
+        app.extensions["visit_buffer"] = self
+
+        if self.async_mode:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="visit-buffer-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    # ── Producer side (request thread) ────────────────────────────────
+
+    def record(self, **visit) -> bool:
+        """Queue one visit (column → value).  Never blocks.
+
+        Returns False when the visit was dropped because the queue is full.
+        """
+        try:
+            self._queue.put_nowait(visit)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            # Log the first drop and then every 1000th to avoid log floods
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(
+                    "Visit buffer full (%d queued) — %d visits dropped so far",
+                    self._queue.qsize(),
+                    dropped,
+                )
+            return False
+
+        if not self.async_mode:
+            self.flush()
+        return True
+
+    # ── Consumer side (flusher thread) ────────────────────────────────
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+    def _collect_batch(self) -> list:
+        """Block until ``batch_size`` visits arrive or the flush interval ends."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> list:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, rows: list) -> None:
+        """Insert *rows* in a single multi-row INSERT on a dedicated connection."""
+        from app.models import PageVisit
+
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(PageVisit.__table__.insert().values(rows))
+        except Exception:
+            with self._lock:
+                self.failed += len(rows)
+            logger.exception("Failed to write %d buffered page visits", len(rows))
+            return
+        with self._lock:
+            self.flushed += len(rows)
+
+    def flush(self) -> int:
+        """Synchronously write everything currently queued; return the count."""
+        if self._queue is None:
+            return 0
+        written = 0
+        while True:
+            batch = self._drain()
+            if not batch:
+                return written
+            for start in range(0, len(batch), self.batch_size):
+                self._write(batch[start : start + self.batch_size])
+            written += len(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the flusher thread and drain whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+        pending = self.flush()
+        if pending:
+            logger.info("Visit buffer drained %d visits on shutdown", pending)
+
+    def stats(self) -> dict:
+        """Counters for the admin dashboard."""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+
+visit_buffer = VisitBuffer()
+
+
+# ---------------------------------------------------------------------------
+# Distinct counting
+# ---------------------------------------------------------------------------
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch (Flajolet et al., 2007).
+
+    ``2**precision`` one-byte registers.  The relative standard error is
+    1.04 / sqrt(2**precision): about 1.6 % at precision 12 (site-wide
+    sketches) and 3.3 % at precision 10 (per-path sketches); roughly 95 % of
+    estimates fall within twice that.  Below ``2.5 * 2**precision`` distinct
+    values linear counting takes over, which is close to exact.  Merging is
+    a register-wise max, so a union over any range of days has the same
+    error bound as a single day.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        registers = zlib.decompress(data)
+        sketch = cls(len(registers).bit_length() - 1)
+        sketch.registers = bytearray(registers)
+        return sketch
+
+    def add(self, value: str) -> None:
+        digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+        x = int.from_bytes(digest, "big")
+        bits = 64 - self.precision
+        index = x >> bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """Compressed registers — sparse sketches shrink to a few bytes."""
+        return zlib.compress(bytes(self.registers))
+
+
+SITE_PRECISION = 12
+PATH_PRECISION = 10
+
+
+# ---------------------------------------------------------------------------
+# Daily rollups
+# ---------------------------------------------------------------------------
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _as_date(value) -> date:
+    """``func.date()`` returns a string on SQLite and a date on PostgreSQL."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def compact_visits(now: datetime = None) -> int:
+    """Roll up every complete UTC day of raw visits that has no rollup yet.
+
+    The newest rolled-up day is compacted again when it has gained raw
+    visits since: the write-behind buffer of this or another worker can
+    flush a day's last visits after that day was rolled up.
+
+    Idempotent and safe to run repeatedly (the dashboard runs it on load,
+    ``flask compact-analytics`` can run it from cron).  Returns the number
+    of days compacted.
+    """
+    from app.models import PageVisit, VisitRollup
+
+    today = (now or datetime.now(timezone.utc)).date()
+    watermark = (
+        db.session.query(func.max(VisitRollup.day))
+        .filter(VisitRollup.dimension == "total")
+        .scalar()
+    )
+    query = db.session.query(func.date(PageVisit.visited_at)).filter(
+        PageVisit.visited_at < _day_start(today)
+    )
+    last_day = _as_date(watermark) if watermark is not None else None
+    if last_day is not None:
+        query = query.filter(
+            PageVisit.visited_at >= _day_start(last_day + timedelta(days=1))
+        )
+    days = sorted({_as_date(day) for (day,) in query.distinct()})
+    if last_day is not None and _has_late_visits(last_day):
+        days.insert(0, last_day)
+    for day in days:
+        _compact_day(day)
+    if days:
+        logger.info("Compacted analytics for %d day(s) up to %s", len(days), days[-1])
+    return len(days)
+
+
+def _has_late_visits(day: date) -> bool:
+    """Whether *day* has more raw visits than its rollup counted.
+
+    Fewer is expected once old raw rows have been purged.
+    """
+    from app.models import PageVisit, VisitRollup
+
+    raw = (
+        db.session.query(func.count(PageVisit.id))
+        .filter(
+            PageVisit.visited_at >= _day_start(day),
+            PageVisit.visited_at < _day_start(day + timedelta(days=1)),
+        )
+        .scalar()
+    )
+    rolled = (
+        db.session.query(VisitRollup.count)
+        .filter(VisitRollup.day == day, VisitRollup.dimension == "total")
+        .scalar()
+    )
+    return raw > (rolled or 0)
+
+
+def _compact_day(day: date) -> None:
+    """Replace the rollups and sketch of *day* with fresh aggregates."""
+    from app.models import PageVisit, VisitorSketch, VisitRollup
+
+    in_day = (
+        PageVisit.visited_at >= _day_start(day),
+        PageVisit.visited_at < _day_start(day + timedelta(days=1)),
+    )
+    classify_visits(*in_day)
+    rows = []
+
+    def _add(dimension, value, count):
+        rows.append(
+            {"day": day, "dimension": dimension, "value": value or "", "count": count}
+        )
+
+    for dimension, column in (
+        ("path", PageVisit.path),
+        ("referrer", PageVisit.referrer),
+        ("locale", PageVisit.country),
+    ):
+        for value, count in (
+            db.session.query(column, func.count(PageVisit.id))
+            .filter(*in_day)
+            .group_by(column)
+        ):
+            if value or dimension == "path":
+                _add(dimension, value, count)
+
+    sketches = {"": HyperLogLog(SITE_PRECISION)}
+    total = visitors = bounces = 0
+    for ip_hash, pages in (
+        db.session.query(PageVisit.ip_hash, func.count(PageVisit.id))
+        .filter(*in_day)
+        .group_by(PageVisit.ip_hash)
+    ):
+        sketches[""].add(ip_hash or "")
+        total += pages
+        visitors += 1
+        bounces += pages == 1
+    _add("total", "", total)
+    _add("visitors", "", visitors)
+    _add("bounces", "", bounces)
+
+    for path, ip_hash in (
+        db.session.query(PageVisit.path, PageVisit.ip_hash).filter(*in_day).distinct()
+    ):
+        if path not in sketches:
+            sketches[path] = HyperLogLog(PATH_PRECISION)
+        sketches[path].add(ip_hash or "")
+
+    for dimension, counts in _agent_counts(*in_day).items():
+        for value, count in counts.items():
+            _add(dimension, value, count)
+
+    try:
+        db.session.execute(delete(VisitRollup).where(VisitRollup.day == day))
+        db.session.execute(delete(VisitorSketch).where(VisitorSketch.day == day))
+        db.session.execute(insert(VisitRollup), rows)
+        db.session.execute(
+            insert(VisitorSketch),
+            [
+                {"day": day, "scope": scope, "registers": sketch.to_bytes()}
+                for scope, sketch in sketches.items()
+            ],
+        )
+        db.session.commit()
+    except IntegrityError:
+        # Another worker (or the CLI) compacted the same day between our
+        # delete and insert; its rows come from the same raw visits.
+        db.session.rollback()
+        logger.info("Analytics for %s were compacted concurrently; kept theirs", day)
+
+
+# ---------------------------------------------------------------------------
+# User-agent codes
+# ---------------------------------------------------------------------------
+
+
+def _agent_counts(*criteria) -> dict:
+    """Browser / OS / device counts from the stored UA codes.
+
+    One indexed ``GROUP BY`` — no UA strings are loaded.  Code 0 (empty UA)
+    is left out, as are rows not yet classified.
+    """
+    from app.models import PageVisit
+
+    counts = {"browser": Counter(), "os": Counter(), "device": Counter()}
+    for browser, os_code, device, count in (
+        db.session.query(
+            PageVisit.browser,
+            PageVisit.os,
+            PageVisit.device,
+            func.count(PageVisit.id),
+        )
+        .filter(*criteria, PageVisit.browser > 0)
+        .group_by(PageVisit.browser, PageVisit.os, PageVisit.device)
+    ):
+        counts["browser"][UA_BROWSERS[browser]] += count
+        counts["os"][UA_OSES[os_code]] += count
+        counts["device"][UA_DEVICES[device]] += count
+    return counts
+
+
+def classify_visits(*criteria, batch_size: int = 500) -> int:
+    """Fill in UA codes for visits stored before classification at ingest.
+
+    Works one distinct UA string at a time, so each batch is a handful of
+    ``UPDATE … WHERE user_agent = ?`` statements.  Returns rows updated.
+    """
+    from app.models import PageVisit
+
+    unclassified = (PageVisit.browser.is_(None), *criteria)
+    updated = 0
+    while True:
+        agents = (
+            db.session.query(PageVisit.user_agent)
+            .filter(*unclassified)
+            .distinct()
+            .limit(batch_size)
+            .all()
+        )
+        if not agents:
+            return updated
+        for (ua,) in agents:
+            browser, os_code, device = classify_user_agent(ua or "")
+            same_ua = (
+                PageVisit.user_agent.is_(None)
+                if ua is None
+                else PageVisit.user_agent == ua
+            )
+            updated += db.session.execute(
+                update(PageVisit)
+                .where(*unclassified, same_ua)
+                .values(browser=browser, os=os_code, device=device)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        db.session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Dashboard
+# ---------------------------------------------------------------------------
+
+PageCount = namedtuple("PageCount", "path count")
+ReferrerCount = namedtuple("ReferrerCount", "referrer count")
+
+
+def _rollup_counts(dimension: str, start: date = None, end: date = None) -> Counter:
+    from app.models import VisitRollup
+
+    query = db.session.query(VisitRollup.value, func.sum(VisitRollup.count)).filter(
+        VisitRollup.dimension == dimension
+    )
+    if start is not None:
+        query = query.filter(VisitRollup.day >= start)
+    if end is not None:
+        query = query.filter(VisitRollup.day <= end)
+    return Counter(
+        {value: int(count) for value, count in query.group_by(VisitRollup.value)}
+    )
+
+
+def _today_counts(column, since: datetime) -> Counter:
+    from app.models import PageVisit
+
+    return Counter(
+        {
+            value: count
+            for value, count in db.session.query(column, func.count(PageVisit.id))
+            .filter(PageVisit.visited_at >= since)
+            .group_by(column)
+        }
+    )
+
+
+def _today_range(start, end, now) -> tuple:
+    """Return (today, today_start) if *start*–*end* reaches today, else None."""
+    today = (now or datetime.now(timezone.utc)).date()
+    if (start is None or start <= today) and (end is None or end >= today):
+        return today, _day_start(today)
+    return None
+
+
+def unique_visitors(
+    start: date = None, end: date = None, path: str = None, now: datetime = None
+) -> int:
+    """Estimated distinct visitors from *start* to *end* (inclusive, UTC days).
+
+    Merges the stored daily sketches — site-wide, or for one *path* — and
+    adds today's raw visitors when the range reaches today.  Accuracy is
+    that of ``HyperLogLog``; days not yet compacted are not counted.
+    """
+    from app.models import PageVisit, VisitorSketch
+
+    sketch = HyperLogLog(SITE_PRECISION if path is None else PATH_PRECISION)
+    query = db.session.query(VisitorSketch.registers).filter(
+        VisitorSketch.scope == (path or "")
+    )
+    if start is not None:
+        query = query.filter(VisitorSketch.day >= start)
+    if end is not None:
+        query = query.filter(VisitorSketch.day <= end)
+    for (registers,) in query:
+        sketch.merge(HyperLogLog.from_bytes(registers))
+
+    today = _today_range(start, end, now)
+    if today is not None:
+        raw = db.session.query(PageVisit.ip_hash).filter(
+            PageVisit.visited_at >= today[1]
+        )
+        if path is not None:
+            raw = raw.filter(PageVisit.path == path)
+        for (ip_hash,) in raw.distinct():
+            sketch.add(ip_hash or "")
+    return sketch.count()
+
+
+def bounce_counts(start: date = None, end: date = None, now: datetime = None) -> tuple:
+    """Return ``(visitors, bounces)`` summed over days *start*–*end*.
+
+    A bounce is a visitor who viewed a single page that day.  Complete days
+    come from the exact per-day rollup counts; today's figures are counted
+    in SQL without loading one row per visitor.
+    """
+    from app.models import PageVisit
+
+    visitors = _rollup_counts("visitors", start, end)[""]
+    bounces = _rollup_counts("bounces", start, end)[""]
+
+    today = _today_range(start, end, now)
+    if today is not None:
+        per_visitor = (
+            db.session.query(func.count(PageVisit.id).label("pages"))
+            .filter(PageVisit.visited_at >= today[1])
+            .group_by(PageVisit.ip_hash)
+            .subquery()
+        )
+        today_visitors, today_bounces = db.session.query(
+            func.count(),
+            func.coalesce(func.sum(case((per_visitor.c.pages == 1, 1))), 0),
+        ).one()
+        visitors += today_visitors
+        bounces += int(today_bounces)
+    return visitors, bounces
+
+
+def dashboard_stats(now: datetime = None) -> dict:
+    """Analytics for the admin dashboard from rollups + today's raw rows."""
+    from app.models import PageVisit, VisitRollup
+
+    now = now or datetime.now(timezone.utc)
+    compact_visits(now)
+    today = now.date()
+    today_start = _day_start(today)
+    classify_visits(PageVisit.visited_at >= today_start)
+
+    # Totals
+    today_visits = (
+        db.session.query(func.count(PageVisit.id))
+        .filter(PageVisit.visited_at >= today_start)
+        .scalar()
+    )
+    totals = _rollup_counts("total")[""] + today_visits
+    visitors_estimate = unique_visitors(now=now) if totals else 0
+
+    # Top lists
+    pages = _rollup_counts("path") + _today_counts(PageVisit.path, today_start)
+    referrers = _rollup_counts("referrer") + _today_counts(
+        PageVisit.referrer, today_start
+    )
+    referrers.pop("", None)
+    referrers.pop(None, None)
+    locales = _rollup_counts("locale") + _today_counts(PageVisit.country, today_start)
+    locales.pop("", None)
+    locales.pop(None, None)
+
+    # Visits per day (last 30 days)
+    first_day = today - timedelta(days=29)
+    visits_by_day = {
+        _as_date(day).isoformat(): count
+        for day, count in db.session.query(VisitRollup.day, VisitRollup.count).filter(
+            VisitRollup.dimension == "total", VisitRollup.day >= first_day
+        )
+    }
+    visits_by_day[today.isoformat()] = today_visits
+    daily_labels = [(first_day + timedelta(days=i)).isoformat() for i in range(30)]
+    daily_counts = [visits_by_day.get(label, 0) for label in daily_labels]
+
+    # Browser / OS / device
+    agents = {
+        dimension: _rollup_counts(dimension) + today_agents
+        for dimension, today_agents in _agent_counts(
+            PageVisit.visited_at >= today_start
+        ).items()
+    }
+
+    visitors, bounces = bounce_counts(now=now)
+
+    return {
+        "total_visits": totals,
+        "today_visits": today_visits,
+        "unique_visitors": visitors_estimate,
+        "top_pages": [PageCount(*item) for item in pages.most_common(10)],
+        "top_referrers": [ReferrerCount(*item) for item in referrers.most_common(10)],
+        "top_countries": [
+            (parse_locale(tag), count) for tag, count in locales.most_common(20)
+        ],
+        "recent_visits": (
+            PageVisit.query.order_by(PageVisit.visited_at.desc()).limit(20).all()
+        ),
+        "daily_labels": daily_labels,
+        "daily_counts": daily_counts,
+        "top_browsers": agents["browser"].most_common(6),
+        "top_os": agents["os"].most_common(6),
+        "device_breakdown": agents["device"].most_common(),
+        "avg_pages": (round(totals / visitors_estimate, 1) if visitors_estimate else 0),
+        "bounce_rate": round(bounces / visitors * 100, 1) if visitors else 0,
+    }
@@ -0,0 +1,253 @@
+"""
+Content-hashed static assets with precompressed siblings.
+
+``flask --app run build-assets`` copies every stylesheet, script and image
+under ``app/static`` into ``app/static/dist`` with the first 12 hex digits
+of its SHA-256 in the filename (``css/style.css`` →
+``dist/css/style.<hash>.css``).  Stylesheets and scripts are minified first,
+and text assets get ``.gz`` (and, when the ``brotli`` package is installed,
+``.br``) siblings.  ``dist/manifest.json`` maps source paths to built ones.
+
+At start-up ``asset_pipeline`` loads the manifest and:
+
+- rewrites ``url_for('static', filename=...)`` to the hashed path, so
+  templates keep naming the source file;
+- serves hashed files with ``Cache-Control: public, max-age=31536000,
+  immutable`` and the smallest encoding the client accepts.  A changed file
+  gets a new name, so browsers never need to revalidate.
+
+Without a manifest (development, or before the first build) static files
+are served exactly as before.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional — gzip siblings are always built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Never fingerprinted: user uploads are referenced by URLs stored in the DB
+SKIP_DIRS = (ASSET_DIR, "uploads")
+HASHED_SUFFIXES = (".css", ".js", ".png", ".jpg", ".jpeg", ".webp", ".svg", ".ico")
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg")
+# Preferred first when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# ---------------------------------------------------------------------------
+# Minifiers
+# ---------------------------------------------------------------------------
+
+_CSS_STRINGS = r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+_CSS_TOKENS = re.compile(rf"({_CSS_STRINGS})|/\*.*?\*/", re.S)
+_CSS_SPLIT = re.compile(rf"({_CSS_STRINGS})", re.S)
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and redundant whitespace; string literals are kept.
+
+    Whitespace before ``:`` is preserved because ``a :hover`` and
+    ``a:hover`` are different selectors.
+    """
+    text = _CSS_TOKENS.sub(lambda m: m.group(1) or "", text)
+    pieces = _CSS_SPLIT.split(text)
+    for i in range(0, len(pieces), 2):  # odd indexes are string literals
+        piece = re.sub(r"\s+", " ", pieces[i])
+        piece = re.sub(r"\s*([{};,>])\s*", r"\1", piece)
+        piece = re.sub(r":\s+", ":", piece)
+        pieces[i] = piece.replace(";}", "}")
+    return "".join(pieces).strip()
+
+
+def minify_js(text: str) -> str:
+    """Drop indentation, blank lines and whole-line comments.
+
+    Deliberately conservative: statements stay on their own lines (so
+    automatic semicolon insertion is unaffected) and lines inside template
+    literals are copied verbatim.
+    """
+    out = []
+    in_template = False
+    in_comment = False
+    for line in text.splitlines():
+        if in_template:
+            out.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                if "*/" not in stripped:
+                    continue
+                in_comment = False
+                stripped = stripped.split("*/", 1)[1].strip()
+            if stripped.startswith("/*"):
+                if "*/" not in stripped:
+                    in_comment = True
+                    continue
+                stripped = stripped.split("*/", 1)[1].strip()
+            if not stripped or stripped.startswith("//"):
+                continue
+            out.append(stripped)
+            line = stripped
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_template = not in_template
+    return "\n".join(out) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder: str) -> dict:
+    """Build ``dist/`` under *static_folder*; return the manifest.
+
+    Files from earlier builds are left in place so pages rendered before a
+    deploy can still load the assets they reference.
+    """
+    out_dir = os.path.join(static_folder, ASSET_DIR)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        dirs.sort()
+        for name in sorted(files):
+            stem, suffix = os.path.splitext(name)
+            if suffix.lower() not in HASHED_SUFFIXES:
+                continue
+            source = os.path.join(root, name)
+            rel_dir = os.path.relpath(root, static_folder)
+            rel = name if rel_dir == "." else f"{rel_dir}/{name}".replace(os.sep, "/")
+            with open(source, "rb") as fh:
+                data = fh.read()
+            minify = MINIFIERS.get(suffix.lower())
+            if minify is not None:
+                data = minify(data.decode("utf-8")).encode("utf-8")
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            built = f"{os.path.dirname(rel)}/{stem}.{digest}{suffix}".lstrip("/")
+            target = os.path.join(out_dir, built)
+            _write(target, data)
+            if suffix.lower() in COMPRESSIBLE_SUFFIXES:
+                _write(target + ".gz", gzip.compress(data, 9, mtime=0))
+                if brotli is not None:
+                    _write(target + ".br", brotli.compress(data))
+            manifest[rel] = f"{ASSET_DIR}/{built}"
+
+    _write(
+        os.path.join(out_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    if brotli is None:
+        logger.info("brotli is not installed; built gzip siblings only")
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+
+class AssetPipeline:
+    """Maps static filenames to hashed builds and serves them immutably."""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_age = 31536000
+        self.manifest = {}
+        self._encodings = {}  # built path → encodings present on disk
+        self._static_folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("ASSET_PIPELINE", True)
+        self.max_age = app.config.get("ASSET_MAX_AGE", 31536000)
+        app.url_defaults(self._hashed_url)
+        serve_plain = app.view_functions["static"]
+
+        def static(filename):
+            if filename in self._encodings:
+                return self._send_built(filename)
+            return serve_plain(filename=filename)
+
+        app.view_functions["static"] = static
+        app.extensions["asset_pipeline"] = self
+        if self.enabled:
+            self.load(app.static_folder)
+
+    def load(self, static_folder: str) -> dict:
+        """Read ``dist/manifest.json``; an absent manifest disables rewriting."""
+        path = os.path.join(static_folder, ASSET_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            logger.info("No asset manifest at %s; serving unhashed files", path)
+            manifest = {}
+        encodings = {}
+        for built in manifest.values():
+            full = os.path.join(static_folder, built)
+            encodings[built] = tuple(
+                name for name, ext in ENCODINGS if os.path.exists(full + ext)
+            )
+        self.manifest = manifest
+        self._encodings = encodings
+        self._static_folder = static_folder
+        return manifest
+
+    def clear(self) -> None:
+        self.manifest = {}
+        self._encodings = {}
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == "static" and self.manifest:
+            built = self.manifest.get(values.get("filename"))
+            if built is not None:
+                values["filename"] = built
+
+    def _send_built(self, filename):
+        accepted = request.accept_encodings
+        suffix, encoding = "", None
+        for name, ext in ENCODINGS:
+            if name in self._encodings[filename] and accepted[name]:
+                suffix, encoding = ext, name
+                break
+        response = send_from_directory(
+            self._static_folder,
+            filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0],
+            max_age=self.max_age,
+        )
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+asset_pipeline = AssetPipeline()
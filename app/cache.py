@@ -0,0 +1,484 @@
+"""
+Content-versioned caching for the public site.
+
+Any committed change to a content model (projects, posts, experience, site
+config, homepage cards, …) rewrites a version stamp in the ``cache_versions``
+table inside the same transaction.  Rendered pages are cached per
+(endpoint, locale, URL) together with the stamp they were rendered under and
+are only served while that stamp is still current.
+
+Each process keeps the stamp in memory and re-reads it from the database at
+most every ``CONTENT_VERSION_TTL`` seconds, so a cache hit costs no queries
+while an edit saved through another gunicorn worker still shows up within
+that window.  Edits made by *this* process are visible immediately.
+
+The same stamp drives HTTP validators: ``conditional_get`` answers
+``If-None-Match`` / ``If-Modified-Since`` with a bodiless 304 before the view
+runs, so a revalidation never touches templates or content queries.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from itertools import chain
+from types import MappingProxyType
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import event, insert, select, update
+from werkzeug.http import is_resource_modified
+
+from app import db
+from app.i18n import SUPPORTED_LOCALES
+from app.models import (
+    BlogPost,
+    CacheVersion,
+    Experience,
+    ImpactCard,
+    LanguageItem,
+    Project,
+    SiteConfig,
+    SkillCluster,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stamp name → models whose changes invalidate it
+STAMP_MODELS = {
+    "content": (
+        Project,
+        Experience,
+        BlogPost,
+        SiteConfig,
+        ImpactCard,
+        SkillCluster,
+        LanguageItem,
+    ),
+    # Only posts and projects contribute URLs / lastmod dates to sitemap.xml
+    "sitemap": (BlogPost, Project),
+    # Full-text search index (app/search.py)
+    "search": (BlogPost, Project),
+}
+
+
+# ---------------------------------------------------------------------------
+# Version stamps
+# ---------------------------------------------------------------------------
+
+
+class VersionStamp:
+    """Process-local view of one ``CacheVersion`` row."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        """Return the stamp, re-reading the database once the TTL has passed."""
+        ttl = current_app.config.get("CONTENT_VERSION_TTL", 2.0)
+        if self._value is None or time.monotonic() - self._checked_at >= ttl:
+            value = db.session.execute(
+                select(CacheVersion.version).where(CacheVersion.name == self.name)
+            ).scalar()
+            self._set(value or 0)
+        return self._value
+
+    def _set(self, value: int) -> None:
+        with self._lock:
+            self._value = value
+            self._checked_at = time.monotonic()
+
+    def _write(self, connection) -> int:
+        """Store a fresh value on *connection* (inside the caller's transaction)."""
+        value = max(time.time_ns(), (self._value or 0) + 1)
+        table = CacheVersion.__table__
+        result = connection.execute(
+            update(table).where(table.c.name == self.name).values(version=value)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(name=self.name, version=value))
+        return value
+
+    def reset(self) -> None:
+        """Forget the cached value so the next ``current()`` hits the database."""
+        with self._lock:
+            self._value = None
+            self._checked_at = 0.0
+
+
+stamps = {name: VersionStamp(name) for name in STAMP_MODELS}
+content_version = stamps["content"]
+
+
+def touch(session, *names: str) -> None:
+    """Bump the named stamps as part of *session*'s current transaction.
+
+    Needed only for writes that bypass the ORM unit of work (bulk / Core
+    statements); ordinary ``add`` / attribute edits / ``delete`` are detected
+    automatically by the flush hook below.
+    """
+    pending = session.info.setdefault("cache_stamps", {})
+    connection = session.connection()
+    for name in names:
+        pending[name] = stamps[name]._write(connection)
+
+
+@event.listens_for(db.session, "after_flush")
+def _bump_stamps_on_flush(session, flush_context):
+    changed = [
+        obj
+        for obj in chain(session.new, session.deleted)
+        if not isinstance(obj, CacheVersion)
+    ]
+    changed += [obj for obj in session.dirty if session.is_modified(obj)]
+    if not changed:
+        return
+    names = [
+        name
+        for name, models in STAMP_MODELS.items()
+        if any(isinstance(obj, models) for obj in changed)
+    ]
+    if names:
+        touch(session, *names)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_stamps(session):
+    for name, value in session.info.pop("cache_stamps", {}).items():
+        stamps[name]._set(value)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_stamps(session):
+    session.info.pop("cache_stamps", None)
+
+
+# ---------------------------------------------------------------------------
+# Rendered page cache
+# ---------------------------------------------------------------------------
+
+
+class PageCache:
+    """LRU + TTL store of rendered responses keyed by request identity.
+
+    Entries remember the content version they were rendered under; a lookup
+    with a newer version is a miss and evicts the stale entry.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_entries = 256
+        self.ttl = 300.0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PAGE_CACHE_ENABLED", True)
+        self.max_entries = app.config.get("PAGE_CACHE_MAX_ENTRIES", 256)
+        self.ttl = app.config.get("PAGE_CACHE_TTL", 300)
+        app.extensions["page_cache"] = self
+
+    def get(self, key, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, payload = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, payload) -> None:
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0,
+            }
+
+
+page_cache = PageCache()
+
+
+def cached_page(view):
+    """Serve a public GET view from ``page_cache`` while content is unchanged.
+
+    Only successful responses are stored.  The key includes the full URL so
+    query-string variants (``?category=``) and the host used for absolute
+    links in ``<head>`` are cached separately.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not page_cache.enabled or request.method != "GET":
+            return view(*args, **kwargs)
+
+        version = content_version.current()
+        key = (request.endpoint, getattr(g, "locale", None), request.url)
+        payload = page_cache.get(key, version)
+        if payload is not None:
+            body, mimetype = payload
+            return current_app.response_class(body, mimetype=mimetype)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+            page_cache.set(key, version, (response.get_data(), response.mimetype))
+        return response
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET (ETag / Last-Modified)
+# ---------------------------------------------------------------------------
+
+# Templates and assets change on deploy without touching the content stamp,
+# so validators never claim a page is older than the running code.
+_STARTED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def stamp_time(version: int) -> datetime:
+    """Convert a nanosecond stamp to an HTTP-date precision datetime."""
+    if not version:
+        return _STARTED_AT
+    changed = datetime.fromtimestamp(version / 1e9, timezone.utc)
+    return max(changed.replace(microsecond=0), _STARTED_AT)
+
+
+def conditional_get(view=None, *, stamp="content", vary=None):
+    """Add strong ETag / Last-Modified validators and answer 304s early.
+
+    The ETag hashes the release, the full URL and the named version stamp
+    (plus ``vary()`` for views whose output also depends on time or content
+    negotiation), so checking it costs one in-memory version lookup.  ``Cache-Control: no-cache`` makes
+    browsers revalidate instead of guessing freshness from Last-Modified.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            version = stamps[stamp].current()
+            release = current_app.config.get("RELEASE_ID") or _STARTED_AT.isoformat()
+            extra = vary() if vary is not None else ""
+            etag = hashlib.sha256(
+                f"{release}|{request.url}|{version}|{extra}".encode()
+            ).hexdigest()[:32]
+            last_modified = stamp_time(version)
+
+            if not is_resource_modified(
+                request.environ, etag=etag, last_modified=last_modified
+            ):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    if view is not None:
+        return decorator(view)
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Site configuration
+# ---------------------------------------------------------------------------
+
+
+class SiteConfigCache:
+    """Every ``site_config`` row held in memory under the content stamp.
+
+    The whole table (a few dozen short rows) is loaded in one query and kept
+    until the content version changes, so ``SiteConfig.get`` /
+    ``get_many`` / ``get_group`` cost no queries.  Reads see committed data:
+    a value written earlier in the current, uncommitted transaction is not
+    visible until the commit publishes the new stamp.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._values = MappingProxyType({})
+        self._groups = MappingProxyType({})
+        self._lock = threading.Lock()
+
+    def _current(self):
+        version = content_version.current()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    values, groups = {}, {}
+                    for key, value, group in db.session.execute(
+                        select(SiteConfig.key, SiteConfig.value, SiteConfig.group)
+                    ):
+                        values[key] = value
+                        groups.setdefault(group, {})[key] = value
+                    self._values = MappingProxyType(values)
+                    self._groups = MappingProxyType(
+                        {name: MappingProxyType(rows) for name, rows in groups.items()}
+                    )
+                    self._version = version
+        return self._values, self._groups
+
+    def values(self) -> MappingProxyType:
+        """Read-only ``{key: value}`` of every row."""
+        return self._current()[0]
+
+    def group(self, name) -> MappingProxyType:
+        """Read-only ``{key: value}`` of the rows in group *name*."""
+        return self._current()[1].get(name, MappingProxyType({}))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version = None
+            self._values = MappingProxyType({})
+            self._groups = MappingProxyType({})
+
+
+site_config = SiteConfigCache()
+
+
+# ---------------------------------------------------------------------------
+# Homepage content snapshot
+# ---------------------------------------------------------------------------
+
+
+class HomepageSnapshot:
+    """Everything ``index.html`` needs, loaded in one pass and shared.
+
+    Rows are expunged from the loading session, so later commits in that
+    request cannot expire them and other requests can read them safely.
+    Projects and posts carry only their listing columns.  Featured projects
+    are derived from ``all_projects`` instead of being queried separately.
+    """
+
+    __slots__ = (
+        "version",
+        "all_projects",
+        "featured_projects",
+        "experiences",
+        "latest_posts",
+        "cfg",
+        "impact_cards",
+        "skill_clusters",
+        "language_items",
+    )
+
+    def __init__(self, version: int):
+        self.version = version
+        self.all_projects = _load(
+            Project.query.options(
+                Project.listing_options("description", "description_ar")
+            ).order_by(Project.sort_order)
+        )
+        self.featured_projects = tuple(p for p in self.all_projects if p.featured)
+        self.experiences = _load(Experience.query.order_by(Experience.sort_order))
+        # Decode highlights now so no homepage render parses JSON
+        for exp in self.experiences:
+            for locale in SUPPORTED_LOCALES:
+                exp.highlight_list(locale)
+        self.latest_posts = _load(
+            BlogPost.query.options(BlogPost.listing_options())
+            .filter_by(published=True)
+            .order_by(BlogPost.created_at.desc())
+            .limit(3)
+        )
+        self.cfg = site_config.values()
+        self.impact_cards = _load(ImpactCard.query.order_by(ImpactCard.sort_order))
+        self.skill_clusters = _load(
+            SkillCluster.query.order_by(SkillCluster.sort_order)
+        )
+        self.language_items = _load(
+            LanguageItem.query.order_by(LanguageItem.sort_order)
+        )
+
+    def template_context(self) -> dict:
+        return {
+            "featured_projects": self.featured_projects,
+            "all_projects": self.all_projects,
+            "experiences": self.experiences,
+            "latest_posts": self.latest_posts,
+            "cfg": self.cfg,
+            "impact_cards": self.impact_cards,
+            "skill_clusters": self.skill_clusters,
+            "language_items": self.language_items,
+        }
+
+
+def _load(query) -> tuple:
+    rows = tuple(query.all())
+    for row in rows:
+        db.session.expunge(row)
+    return rows
+
+
+_homepage = None
+_homepage_lock = threading.Lock()
+_reset_hooks = []
+
+
+def get_homepage_snapshot() -> HomepageSnapshot:
+    """Return the current snapshot, rebuilding it only after content changes."""
+    global _homepage
+    version = content_version.current()
+    snapshot = _homepage
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _homepage_lock:
+        if _homepage is None or _homepage.version != version:
+            _homepage = HomepageSnapshot(version)
+        return _homepage
+
+
+def on_reset(func):
+    """Register *func* to run from ``reset_caches`` (for caches kept elsewhere)."""
+    _reset_hooks.append(func)
+    return func
+
+
+def reset_caches() -> None:
+    """Drop every in-process cache and stamp (used after schema resets)."""
+    global _homepage
+    for stamp in stamps.values():
+        stamp.reset()
+    page_cache.clear()
+    site_config.clear()
+    _homepage = None
+    for hook in _reset_hooks:
+        hook()
@@ -0,0 +1,123 @@
+"""
+Flask CLI commands for maintenance jobs (``flask --app run <command>``).
+"""
+
+import click
+
+
+def register_commands(app):
+    """Attach the maintenance commands to *app*."""
+
+    @app.cli.command("compact-analytics")
+    def compact_analytics():
+        """Roll up raw page visits of every complete day into daily counts."""
+        from app.analytics import compact_visits
+
+        days = compact_visits()
+        click.echo(f"Compacted {days} day(s) of page visits.")
+
+    @app.cli.command("classify-visits")
+    def classify_visits_command():
+        """Backfill browser / OS / device codes on older page visits."""
+        from app.analytics import classify_visits
+
+        updated = classify_visits()
+        click.echo(f"Classified {updated} page visit(s).")
+
+    @app.cli.command("send-outbox")
+    def send_outbox():
+        """Deliver every due email in the outbox once and exit."""
+        from app.outbox import outbox
+
+        sent = outbox.dispatch_due()
+        click.echo(f"Sent {sent} queued email(s).")
+
+    @app.cli.command("outbox-worker")
+    def outbox_worker():
+        """Deliver outbox email in the foreground (OUTBOX_MODE=external on web)."""
+        from app.outbox import outbox
+
+        click.echo("Email outbox worker running — Ctrl+C to stop.")
+        outbox.run_forever()
+
+    @app.cli.command("warm-templates")
+    def warm_templates_command():
+        """Compile every template into the bytecode cache and print timings."""
+        from app.templating import warm_templates
+
+        app.jinja_env.cache.clear()  # time loads, not in-memory hits
+        timings = warm_templates(app)
+        for name, ms in sorted(timings, key=lambda item: item[1], reverse=True):
+            click.echo(f"{ms:8.1f} ms  {name}")
+        click.echo(f"Compiled {len(timings)} template(s).")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Write hashed, minified and precompressed static files to static/dist."""
+        from app.assets import build_assets
+
+        manifest = build_assets(app.static_folder)
+        for source, built in sorted(manifest.items()):
+            click.echo(f"{source} -> {built}")
+        click.echo(f"Built {len(manifest)} asset(s).")
+
+    @app.cli.command("optimize-images")
+    @click.option("--force", is_flag=True, help="Regenerate up-to-date variants too.")
+    def optimize_images_command(force):
+        """Generate resized and WebP variants for bundled images and uploads."""
+        import os
+
+        from app.images import optimize_folder
+
+        folders = (
+            os.path.join(app.static_folder, "images"),
+            app.config["UPLOAD_FOLDER"],
+        )
+        for folder in folders:
+            for record in optimize_folder(folder, force=force):
+                total = sum(v["bytes"] for v in record["variants"])
+                click.echo(
+                    f"{record['source']}: {len(record['variants'])} variant(s), "
+                    f"{total / 1024:.0f} KiB"
+                )
+        click.echo("Image variants are up to date.")
+
+    @app.cli.command("build-search-index")
+    def build_search_index_command():
+        """Re-analyse every post and project into the persisted search index."""
+        from app.search import index_path, rebuild_index
+
+        index = rebuild_index()
+        kinds = [doc["kind"] for doc in index.docs.values()]
+        click.echo(
+            f"Indexed {kinds.count('post')} post(s) and {kinds.count('project')} "
+            f"project(s), {index.term_count} term(s)."
+        )
+        if app.config.get("SEARCH_INDEX_PERSIST", True):
+            click.echo(f"Wrote {index_path()}")
+
+    @app.cli.command("gc-uploads")
+    @click.option("--dry-run", is_flag=True, help="Report only; delete nothing.")
+    @click.option(
+        "--min-age-hours",
+        default=24.0,
+        show_default=True,
+        help="Keep files uploaded more recently than this.",
+    )
+    def gc_uploads_command(dry_run, min_age_hours):
+        """Delete uploads (and their variants) that no content references."""
+        from app.uploads import collect_garbage
+
+        report = collect_garbage(
+            app.config["UPLOAD_FOLDER"],
+            dry_run=dry_run,
+            min_age=min_age_hours * 3600,
+        )
+        verb = "Would remove" if dry_run else "Removed"
+        for name, size, count in report.orphans:
+            click.echo(f"{verb} {name} ({count} file(s), {size / 1024:.0f} KiB)")
+        click.echo(
+            f"{verb} {report.files_reclaimed} file(s), "
+            f"{report.bytes_reclaimed / 1024:.0f} KiB; kept {report.kept} "
+            f"referenced and {report.skipped_recent} recent upload(s)."
+        )
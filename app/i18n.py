@@ -1,6 +1,8 @@
 import json
+import threading
 from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 from urllib.parse import urlencode
 
 from flask import g, request, url_for
@@ -69,15 +71,85 @@ def load_translations(locale):
     normalized = resolve_locale(locale)
     fallback = _load_raw_translations(DEFAULT_LOCALE)
     if normalized == DEFAULT_LOCALE:
-        return fallback
-    localized = _load_raw_translations(normalized)
+        return MappingProxyType(dict(fallback))
     merged = dict(fallback)
-    merged.update(localized)
-    return merged
+    merged.update(_load_raw_translations(normalized))
+    return MappingProxyType(merged)
+
+
+# Compiled catalogs: locale → read-only merged dict and a ``t`` bound to it.
+# Swapped as a whole by ``compile_catalogs`` so readers never see a mix.
+_compiled = {"catalogs": {}, "translators": {}, "mtimes": {}}
+_compile_lock = threading.Lock()
+
+
+def _catalog_mtimes():
+    mtimes = {}
+    for code in SUPPORTED_LOCALES:
+        try:
+            mtimes[code] = (TRANSLATIONS_DIR / f"{code}.json").stat().st_mtime_ns
+        except OSError:
+            mtimes[code] = None
+    return mtimes
+
+
+def _bind_translator(catalog, locale):
+    def t(key, locale=None, default=None):
+        if locale is not None:
+            return translate(key, locale=locale, default=default)
+        value = catalog.get(key)
+        if value is not None:
+            return value
+        return key if default is None else default
+
+    t.locale = locale
+    return t
+
+
+def compile_catalogs():
+    """Load every supported locale's JSON once into immutable merged dicts.
+
+    Called from the app factory; each locale also gets a ``t`` bound to its
+    catalog, which ``inject_i18n_context`` hands to templates so a lookup
+    is a single dict access.
+    """
+    with _compile_lock:
+        mtimes = _catalog_mtimes()
+        _load_raw_translations.cache_clear()
+        load_translations.cache_clear()
+        catalogs = {code: load_translations(code) for code in SUPPORTED_LOCALES}
+        _compiled.update(
+            catalogs=catalogs,
+            translators={
+                code: _bind_translator(catalog, code)
+                for code, catalog in catalogs.items()
+            },
+            mtimes=mtimes,
+        )
+    return catalogs
+
+
+def reload_catalogs_if_changed():
+    """Recompile when a catalog file's mtime changed (debug-mode hot reload)."""
+    if _catalog_mtimes() == _compiled["mtimes"]:
+        return False
+    compile_catalogs()
+    return True
+
+
+def get_translator(locale=None):
+    """Return ``t`` bound to *locale*'s compiled catalog."""
+    locale = resolve_locale(locale or get_current_locale())
+    translator = _compiled["translators"].get(locale)
+    if translator is None:
+        compile_catalogs()
+        translator = _compiled["translators"][locale]
+    return translator
 
 
 def translate(key, locale=None, default=None):
-    translations = load_translations(locale or get_current_locale())
+    locale = locale or get_current_locale()
+    translations = _compiled["catalogs"].get(locale) or load_translations(locale)
     if key in translations:
         return translations[key]
     if default is not None:
@@ -0,0 +1,284 @@
+"""
+Responsive image variants for bundled images and uploads.
+
+Browsers were downloading ``images/logo.png`` (4096×4096, 3.4 MB) to draw a
+92 px navbar logo and a favicon.  ``generate_variants`` writes resized
+copies of an image into a ``variants/`` directory beside it — one per width
+in ``IMAGE_VARIANT_WIDTHS`` that is narrower than the source, in the source
+format and as WebP — and records them in ``variants/<stem>.json``.  EXIF,
+XMP and text chunks are dropped from every variant (the ICC colour profile
+is kept), and uploads have their original re-saved without metadata too.
+
+Templates use two globals:
+
+- ``image_url(filename, width)`` — URL of the smallest variant at least
+  *width* pixels wide (favicons, ``og:image``);
+- ``picture(filename, alt, sizes, class_=...)`` — a ``<picture>`` with a
+  WebP ``<source>`` and an ``<img>`` carrying ``srcset`` / ``sizes`` and the
+  intrinsic ``width`` / ``height``.
+
+Both fall back to the original file when no variants were generated, so
+run ``flask --app run optimize-images`` after adding bundled images.
+"""
+
+import json
+import logging
+import os
+
+from flask import current_app, url_for
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = "variants"
+DEFAULT_WIDTHS = (96, 192, 384, 768, 1280)
+SOURCE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+_SAVE_OPTIONS = {
+    "PNG": {"optimize": True},
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+    "WEBP": {"method": 4},
+}
+_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def record_path(path: str) -> str:
+    """Where the variant record for the image at *path* is stored."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, VARIANT_DIR, os.path.splitext(name)[0] + ".json")
+
+
+def _save(image, path: str, fmt: str, icc_profile, webp_quality: int) -> int:
+    options = dict(_SAVE_OPTIONS[fmt])
+    if fmt == "WEBP":
+        options["quality"] = webp_quality
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    tmp = f"{path}.tmp"
+    image.save(tmp, fmt, **options)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def strip_metadata(path: str) -> None:
+    """Re-save the image at *path* in place without EXIF / XMP / text chunks.
+
+    The EXIF orientation is applied to the pixels first so the image still
+    displays upright.  Animated images are left untouched.
+    """
+    with Image.open(path) as source:
+        if getattr(source, "n_frames", 1) > 1 or source.format not in _SAVE_OPTIONS:
+            return
+        fmt = source.format
+        icc_profile = source.info.get("icc_profile")
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    _save(image, path, fmt, icc_profile, webp_quality=90)
+
+
+def generate_variants(path: str, widths=None, webp_quality: int = None) -> dict:
+    """Write resized + WebP variants of the image at *path*; return the record.
+
+    Widths at or above the source width are replaced by one full-size
+    re-encode.  Animated GIFs get no variants (the record lists none).
+    """
+    if widths is None:
+        widths = current_app.config.get("IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS)
+    if webp_quality is None:
+        webp_quality = current_app.config.get("IMAGE_WEBP_QUALITY", 80)
+    folder, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    out_dir = os.path.join(folder, VARIANT_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(path) as source:
+        fmt = source.format
+        animated = getattr(source, "n_frames", 1) > 1
+        icc_profile = source.info.get("icc_profile")
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGB")
+
+    record = {
+        "source": name,
+        "width": image.width,
+        "height": image.height,
+        "variants": [],
+    }
+    if not animated:
+        # GIF / WebP sources fall back to PNG for the same-format variant
+        base_fmt = fmt if fmt in ("PNG", "JPEG") else "PNG"
+        targets = sorted({min(w, image.width) for w in widths})
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = (
+                image
+                if width == image.width
+                else image.resize((width, height), Image.Resampling.LANCZOS)
+            )
+            for out_fmt in (base_fmt, "WEBP"):
+                filename = f"{stem}-{width}w{_EXTENSIONS[out_fmt]}"
+                size = _save(
+                    resized,
+                    os.path.join(out_dir, filename),
+                    out_fmt,
+                    icc_profile,
+                    webp_quality,
+                )
+                record["variants"].append(
+                    {
+                        "file": f"{VARIANT_DIR}/{filename}",
+                        "type": _MIME_TYPES[out_fmt],
+                        "width": width,
+                        "height": height,
+                        "bytes": size,
+                    }
+                )
+
+    tmp = record_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(record, fh, indent=2)
+    os.replace(tmp, record_path(path))
+    return record
+
+
+def optimize_folder(folder: str, force: bool = False) -> list:
+    """Generate variants for every image directly inside *folder*.
+
+    Images whose record is newer than the file are skipped unless *force*.
+    Returns the records written.
+    """
+    records = []
+    if not os.path.isdir(folder):
+        return records
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not name.lower().endswith(SOURCE_SUFFIXES) or not os.path.isfile(path):
+            continue
+        existing = record_path(path)
+        if (
+            not force
+            and os.path.exists(existing)
+            and os.path.getmtime(existing) >= os.path.getmtime(path)
+        ):
+            continue
+        try:
+            records.append(generate_variants(path))
+        except OSError:
+            logger.exception("Could not generate variants for %s", path)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Template helpers
+# ---------------------------------------------------------------------------
+
+_records = {}  # record path → (mtime, record)
+
+
+def _static_name(filename: str):
+    """Map a static-relative name or ``/static/...`` URL to a static path."""
+    prefix = current_app.static_url_path.rstrip("/") + "/"
+    if filename.startswith(prefix):
+        return filename[len(prefix) :]
+    if "://" in filename or filename.startswith("/"):
+        return None  # external or non-static URL
+    return filename
+
+
+def load_variants(filename: str):
+    """Return the variant record for static *filename*, or ``None``."""
+    name = _static_name(filename)
+    if name is None:
+        return None
+    path = record_path(os.path.join(current_app.static_folder, name))
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _records.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as fh:
+            cached = _records[path] = (mtime, json.load(fh))
+    return cached[1]
+
+
+def _variant_url(name: str, variant: dict, external: bool = False) -> str:
+    folder = os.path.dirname(name)
+    return url_for(
+        "static",
+        filename=f"{folder}/{variant['file']}".lstrip("/"),
+        _external=external,
+    )
+
+
+def _original_url(filename: str, external: bool = False) -> str:
+    name = _static_name(filename)
+    if name is None:
+        return filename
+    return url_for("static", filename=name, _external=external)
+
+
+def image_url(filename: str, width: int = None, _external: bool = False) -> str:
+    """URL of the smallest same-format variant at least *width* px wide."""
+    record = load_variants(filename)
+    name = _static_name(filename)
+    candidates = [
+        v for v in (record or {}).get("variants", ()) if v["type"] != "image/webp"
+    ]
+    if candidates and width:
+        wide_enough = [v for v in candidates if v["width"] >= width]
+        variant = wide_enough[0] if wide_enough else candidates[-1]
+        return _variant_url(name, variant, _external)
+    return _original_url(filename, _external)
+
+
+def picture(filename: str, alt: str = "", sizes: str = "100vw", **attrs) -> Markup:
+    """Render a responsive ``<picture>`` for *filename*.
+
+    Extra keyword arguments become ``<img>`` attributes; use ``class_`` for
+    ``class``.  ``loading="lazy"`` and ``decoding="async"`` are added unless
+    overridden.
+    """
+    record = load_variants(filename)
+    name = _static_name(filename)
+    attrs = {key.rstrip("_"): value for key, value in attrs.items()}
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+
+    variants = (record or {}).get("variants", ())
+    webp = [v for v in variants if v["type"] == "image/webp"]
+    fallback = [v for v in variants if v["type"] != "image/webp"]
+    img = {"src": _original_url(filename), "alt": alt}
+    source = ""
+    if fallback:
+        largest = fallback[-1]
+        img["src"] = _variant_url(name, largest)
+        img["srcset"] = ", ".join(
+            f"{_variant_url(name, v)} {v['width']}w" for v in fallback
+        )
+        img["sizes"] = sizes
+        img["width"] = record["width"]
+        img["height"] = record["height"]
+        srcset = ", ".join(f"{_variant_url(name, v)} {v['width']}w" for v in webp)
+        source = (
+            f'<source type="image/webp" srcset="{escape(srcset)}" '
+            f'sizes="{escape(sizes)}">'
+        )
+    img.update(attrs)
+    rendered = " ".join(f'{key}="{escape(value)}"' for key, value in img.items())
+    if not source:
+        return Markup(f"<img {rendered}>")
+    return Markup(f"<picture>{source}<img {rendered}></picture>")
+
+
+def init_images(app) -> None:
+    """Expose the template helpers."""
+    app.jinja_env.globals["image_url"] = image_url
+    app.jinja_env.globals["picture"] = picture
@@ -0,0 +1,386 @@
+"""
+Pooled delivery transports for notification email.
+
+Opening a fresh connection per email costs a TCP + TLS handshake and, for
+SMTP, EHLO / STARTTLS / EHLO / AUTH on top — several round trips before the
+message is even sent.  The outbox sends from one long-lived thread per
+process, so connections are kept and reused instead:
+
+- ``SMTPPool`` keeps authenticated SMTP sessions.  A session idle for more
+  than ``check_after`` seconds is probed with NOOP before reuse, and one idle
+  longer than ``idle_timeout`` is closed unused (servers drop idle clients
+  after a few minutes anyway).
+- ``KeepAliveClient`` keeps persistent HTTP/1.1 connections for the Resend
+  API.
+
+A reused connection that turns out to be closed by the peer before the
+server has replied is replaced and the send retried once on a fresh
+connection; a failure after that is never repeated, so a retry cannot
+deliver an email twice.  Every transport records
+``TransportMetrics`` (connections opened vs reused, send latency), shown on
+the admin dashboard via ``transport_stats()``.
+
+Transports are shared per destination through ``smtp_pool()`` and
+``http_client()``, so changed credentials get a new pool.
+"""
+
+import atexit
+import http.client
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class TransportMetrics:
+    """Thread-safe connection and latency counters for one transport."""
+
+    def __init__(self, window: int = 256):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+        self.sent = 0
+        self.failed = 0
+
+    def connection(self, reused: bool) -> None:
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.opened += 1
+
+    def discard(self) -> None:
+        with self._lock:
+            self.discarded += 1
+
+    def delivery(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            checkouts = self.opened + self.reused
+
+            def _ms(fraction):
+                if not latencies:
+                    return 0
+                index = min(len(latencies) - 1, int(fraction * len(latencies)))
+                return round(latencies[index] * 1000, 1)
+
+            return {
+                "opened": self.opened,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "reuse_rate": (
+                    round(self.reused / checkouts * 100, 1) if checkouts else 0
+                ),
+                "sent": self.sent,
+                "failed": self.failed,
+                "p50_ms": _ms(0.5),
+                "p95_ms": _ms(0.95),
+                "max_ms": _ms(1.0),
+            }
+
+
+class _ConnectionPool:
+    """LIFO stack of idle connections shared by one destination.
+
+    Subclasses implement ``_open``, ``_close`` and ``_healthy``.
+    """
+
+    def __init__(self, *, max_idle: int, idle_timeout: float, check_after: float):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.metrics = TransportMetrics()
+        self._idle = []  # (connection, last used at)
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        """Return ``(connection, reused)``, health-checking idle connections."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for < self.idle_timeout and (
+                idle_for < self.check_after or self._healthy(conn)
+            ):
+                self.metrics.connection(reused=True)
+                return conn, True
+            self._discard(conn)
+        conn = self._open()
+        self.metrics.connection(reused=False)
+        return conn, False
+
+    def _checkin(self, conn) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def _discard(self, conn) -> None:
+        self.metrics.discard()
+        self._close(conn)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {"idle": idle, **self.metrics.snapshot()}
+
+
+class SMTPPool(_ConnectionPool):
+    """Authenticated SMTP sessions reused across sends.
+
+    Port 465 uses implicit TLS; any other port upgrades with STARTTLS unless
+    *starttls* is false (local relays and test servers).
+    """
+
+    # A reused session closed by the server fails with one of these before
+    # the message is accepted, so the send is safe to repeat once.
+    _STALE = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        *,
+        starttls: bool = True,
+        timeout: float = 15,
+        max_idle: int = 2,
+        idle_timeout: float = 240,
+        check_after: float = 5,
+    ):
+        super().__init__(
+            max_idle=max_idle, idle_timeout=idle_timeout, check_after=check_after
+        )
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def _open(self):
+        if self.port == 465:
+            conn = smtplib.SMTP_SSL(
+                self.host,
+                self.port,
+                timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            conn.ehlo()
+            if self.starttls:
+                conn.starttls(context=ssl.create_default_context())
+                conn.ehlo()
+        try:
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        return conn
+
+    def _close(self, conn) -> None:
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    def _healthy(self, conn) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, msg) -> None:
+        """Send an ``email.message.Message``; smtplib errors propagate."""
+        started = time.perf_counter()
+        conn = None
+        try:
+            conn, reused = self._checkout()
+            try:
+                conn.send_message(msg)
+            except self._STALE:
+                if not reused:
+                    raise
+                logger.info("SMTP session to %s went stale; reconnecting", self.host)
+                self._discard(conn)
+                conn = None
+                conn = self._open()
+                self.metrics.connection(reused=False)
+                conn.send_message(msg)
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+            self.metrics.delivery(time.perf_counter() - started, ok=False)
+            raise
+        self._checkin(conn)
+        self.metrics.delivery(time.perf_counter() - started, ok=True)
+
+
+class KeepAliveClient(_ConnectionPool):
+    """Persistent HTTP/1.1 connections to one origin."""
+
+    # A reused connection closed by the server fails with one of these while
+    # the request is sent or before any of the response arrives (the closed
+    # socket reads as EOF or a reset), so it is safe to repeat once.  Errors
+    # once the reply has started — ``IncompleteRead``, a garbled status line
+    # — propagate: the server may already have acted on the request.
+    _STALE = (ConnectionError,)
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 15,
+        max_idle: int = 2,
+        idle_timeout: float = 60,
+    ):
+        # The peer closing an idle keep-alive socket shows up on the next
+        # request and is retried, so no probe is needed before reuse.
+        super().__init__(
+            max_idle=max_idle, idle_timeout=idle_timeout, check_after=idle_timeout
+        )
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {base_url!r}")
+        self.base_url = base_url.rstrip("/")
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.netloc, timeout=self.timeout, context=ssl.create_default_context()
+            )
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _close(self, conn) -> None:
+        conn.close()
+
+    def _healthy(self, conn) -> bool:
+        return True
+
+    def _send(self, conn, method, path, body, headers):
+        conn.request(method, self.prefix + path, body=body, headers=headers)
+        return conn.getresponse()
+
+    def request(self, method: str, path: str, body=None, headers=None) -> tuple:
+        """Send one request; return ``(status, body bytes)``.
+
+        Non-2xx statuses are returned, not raised; connection errors
+        propagate as ``OSError`` / ``http.client.HTTPException``.
+        """
+        started = time.perf_counter()
+        headers = headers or {}
+        conn = None
+        try:
+            conn, reused = self._checkout()
+            try:
+                response = self._send(conn, method, path, body, headers)
+            except self._STALE:
+                if not reused:
+                    raise
+                self._discard(conn)
+                conn = None
+                conn = self._open()
+                self.metrics.connection(reused=False)
+                response = self._send(conn, method, path, body, headers)
+            data = response.read()
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+            self.metrics.delivery(time.perf_counter() - started, ok=False)
+            raise
+        if response.will_close:
+            self._close(conn)
+        else:
+            self._checkin(conn)
+        self.metrics.delivery(
+            time.perf_counter() - started, ok=200 <= response.status < 300
+        )
+        return response.status, data
+
+
+# ---------------------------------------------------------------------------
+# Shared transports
+# ---------------------------------------------------------------------------
+
+_transports = {}  # key → SMTPPool | KeepAliveClient
+_transports_lock = threading.Lock()
+
+
+def smtp_pool(
+    host: str, port: int, username: str, password: str, starttls: bool = True
+) -> SMTPPool:
+    """Return the process-wide pool for this server and account."""
+    key = ("smtp", host, port, username, password, starttls)
+    with _transports_lock:
+        pool = _transports.get(key)
+        if pool is None:
+            pool = _transports[key] = SMTPPool(
+                host, port, username, password, starttls=starttls
+            )
+        return pool
+
+
+def http_client(base_url: str) -> KeepAliveClient:
+    """Return the process-wide keep-alive client for *base_url*."""
+    key = ("http", base_url)
+    with _transports_lock:
+        client = _transports.get(key)
+        if client is None:
+            client = _transports[key] = KeepAliveClient(base_url)
+        return client
+
+
+def transport_stats() -> dict:
+    """Label → stats for every transport used by this process."""
+    with _transports_lock:
+        transports = list(_transports.values())
+    stats = {}
+    for transport in transports:
+        if isinstance(transport, SMTPPool):
+            label = f"smtp://{transport.host}:{transport.port}"
+        else:
+            label = transport.base_url
+        stats[label] = transport.stats()
+    return stats
+
+
+@atexit.register
+def close_transports() -> None:
+    """Close and forget every shared transport."""
+    with _transports_lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close()
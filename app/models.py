@@ -1,8 +1,9 @@
 """
 Database models for the personal portfolio website.
 
-Nine models covering portfolio content, blog, contact messages,
-site configuration, and lightweight analytics.  All timestamps
+Thirteen models covering portfolio content, blog, contact messages and
+their email outbox, site configuration, lightweight analytics (raw visits
+plus daily rollups), and cache bookkeeping.  All timestamps
 use timezone-aware UTC via the ``_utcnow`` helper.
 
 Multilingual content
@@ -17,13 +18,27 @@ Usage in templates::
 
     {{ project.get_field('title', current_locale) }}
     {{ project.get_field('challenge', current_locale) | safe }}
-    {{ exp.get_highlights(current_locale) | from_json }}
+    {% for h in exp.highlight_list(current_locale) %}...{% endfor %}
+
+Resolved values are memoised per instance and locale, and
+``Model.localized_rows(rows, locale, fields)`` turns rows into plain
+records for JSON payloads and feeds.
 """
 
+import json
+import logging
+from collections import namedtuple
 from datetime import datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only, validates
 
 from app import db
 
+logger = logging.getLogger(__name__)
+
 
 def _utcnow():
     """Timezone-aware UTC timestamp (replaces deprecated datetime.utcnow)."""
@@ -60,8 +75,54 @@ class LocalizedMixin:
     The fallback chain is:
         1. ``<field>_ar`` (when locale == 'ar' and the value is non-empty)
         2. ``<field>``    (English — always present)
+
+    Every translatable field that is loaded is resolved once per instance
+    and locale (see ``localized``); the memo is dropped when an attribute
+    is assigned, expired or refreshed.
     """
 
+    def __setattr__(self, name, value):
+        if not name.startswith("_"):
+            self.__dict__.pop("_localized_views", None)
+        super().__setattr__(name, value)
+
+    @classmethod
+    def localized_fields(cls) -> tuple:
+        """Base names of the columns that have an ``_ar`` sibling."""
+        fields = cls.__dict__.get("_localized_fields")
+        if fields is None:
+            columns = {attr.key for attr in cls.__mapper__.column_attrs}
+            fields = tuple(sorted(c for c in columns if f"{c}_ar" in columns))
+            cls._localized_fields = fields
+        return fields
+
+    def localized(self, locale: str = "en") -> dict:
+        """Return ``{field: value}`` for *locale*, resolved once per load.
+
+        Only fields whose columns are already loaded are included, so
+        building the view never triggers a query (or trips ``raiseload``).
+        """
+        views = self.__dict__.get("_localized_views")
+        if views is None:
+            views = self.__dict__["_localized_views"] = {}
+        view = views.get(locale)
+        if view is None:
+            loaded = self.__dict__
+            view = {}
+            for field in self.localized_fields():
+                if field not in loaded:
+                    continue
+                if locale != "en":
+                    if f"{field}_ar" not in loaded:
+                        continue
+                    ar_val = loaded[f"{field}_ar"]
+                    if ar_val and ar_val.strip():
+                        view[field] = ar_val
+                        continue
+                view[field] = loaded[field] or ""
+            views[locale] = view
+        return view
+
     def get_field(self, field: str, locale: str = "en") -> str:
         """Return the localized value of *field* or fall back to English.
 
@@ -78,6 +139,9 @@ class LocalizedMixin:
             The translated string, or the English value if no translation
             exists, or ``''`` if neither is set.
         """
+        value = self.localized(locale).get(field)
+        if value is not None:
+            return value
         if locale != "en":
             ar_val = getattr(self, f"{field}_ar", None)
             if ar_val and ar_val.strip():
@@ -89,11 +153,106 @@ class LocalizedMixin:
 
         Falls back to English ``highlights`` when ``highlights_ar`` is empty.
         """
-        if locale != "en":
-            ar_val = getattr(self, "highlights_ar", None)
-            if ar_val and ar_val.strip():
-                return ar_val
-        return getattr(self, "highlights", "") or "[]"
+        return self.get_field("highlights", locale) or "[]"
+
+    def highlight_list(self, locale: str = "en") -> tuple:
+        """Return the decoded highlights for *locale* as a tuple of strings.
+
+        Decoded once per load and locale, alongside the ``localized`` view.
+        A stored value that is not a JSON array of strings (only possible
+        for rows written before validation) renders as no highlights.
+        """
+        views = self.__dict__.get("_localized_views")
+        if views is None:
+            views = self.__dict__["_localized_views"] = {}
+        key = ("highlights", locale)
+        items = views.get(key)
+        if items is None:
+            raw = self.get_highlights(locale)
+            try:
+                items = parse_highlights(raw)
+            except ValueError:
+                logger.warning("Ignoring malformed highlights on %s: %.80r", self, raw)
+                items = ()
+            views[key] = items
+        return items
+
+    @classmethod
+    def localized_rows(cls, rows, locale: str, fields) -> list:
+        """Return one immutable record per row with *fields* resolved.
+
+        Translatable names get the *locale* value (with English fallback);
+        any other name is copied as-is, e.g.
+        ``Project.localized_rows(projects, "ar", ("id", "title", "year"))``.
+        """
+        fields = tuple(fields)
+        record = _record_type(cls.__name__, fields)
+        localized = set(cls.localized_fields())
+        return [
+            record(
+                *(
+                    (
+                        row.get_field(name, locale)
+                        if name in localized
+                        else getattr(row, name)
+                    )
+                    for name in fields
+                )
+            )
+            for row in rows
+        ]
+
+
+def parse_highlights(raw) -> tuple:
+    """Decode a stored highlights value into a tuple of strings.
+
+    Empty values decode to ``()``; anything other than a JSON array of
+    strings raises ``ValueError``.
+    """
+    if not raw:
+        return ()
+    items = json.loads(raw)  # JSONDecodeError is a ValueError
+    if not isinstance(items, list) or not all(isinstance(h, str) for h in items):
+        raise ValueError("highlights must be a JSON array of strings")
+    return tuple(items)
+
+
+@lru_cache(maxsize=64)
+def _record_type(model_name: str, fields: tuple):
+    return namedtuple(f"{model_name}Record", fields)
+
+
+@event.listens_for(LocalizedMixin, "expire", propagate=True)
+def _drop_localized_views_on_expire(target, attrs):
+    target.__dict__.pop("_localized_views", None)
+
+
+@event.listens_for(LocalizedMixin, "refresh", propagate=True)
+def _drop_localized_views_on_refresh(target, context, attrs):
+    target.__dict__.pop("_localized_views", None)
+
+
+# ---------------------------------------------------------------------------
+# Mixin — column projection for listing queries
+# ---------------------------------------------------------------------------
+
+
+class ListingMixin:
+    """Mixin that names the columns listing pages actually render.
+
+    ``Model.query.options(Model.listing_options())`` loads only
+    ``LISTING_COLUMNS`` (plus any *extra* names), leaving long HTML bodies
+    in the database.  Unloaded attributes raise on access instead of
+    lazy-loading, so a template that starts using a new field fails loudly
+    in tests rather than silently issuing one query per row.
+    """
+
+    LISTING_COLUMNS = ()
+
+    @classmethod
+    def listing_options(cls, *extra: str):
+        names = (*cls.LISTING_COLUMNS, *extra)
+        return load_only(*(getattr(cls, name) for name in names), raiseload=True)
 
 
 # ---------------------------------------------------------------------------
@@ -101,7 +260,7 @@ class LocalizedMixin:
 # ---------------------------------------------------------------------------
 
 
-class Project(LocalizedMixin, SortableMixin, db.Model):
+class Project(ListingMixin, LocalizedMixin, SortableMixin, db.Model):
     """Portfolio project with optional deep-dive case study.
 
     Fields:
@@ -164,6 +323,22 @@ class Project(LocalizedMixin, SortableMixin, db.Model):
     results_ar = db.Column(db.Text)
     has_case_study = db.Column(db.Boolean, default=False)
 
+    # Card fields (homepage grid, /api/projects) — no description or
+    # case-study HTML; the homepage adds the description as a fallback
+    LISTING_COLUMNS = (
+        "id",
+        "title",
+        "title_ar",
+        "short_description",
+        "short_description_ar",
+        "technologies",
+        "category",
+        "year",
+        "featured",
+        "has_case_study",
+        "sort_order",
+    )
+
     def __repr__(self):
         return f"<Project {self.title}>"
 
@@ -196,6 +371,14 @@ class Experience(LocalizedMixin, SortableMixin, db.Model):
     highlights = db.Column(db.Text)
     highlights_ar = db.Column(db.Text)
 
+    @validates("highlights", "highlights_ar")
+    def _validate_highlights(self, key, value):
+        """Store lists as JSON and reject strings that are not a JSON array."""
+        if isinstance(value, (list, tuple)):
+            value = json.dumps(list(value))
+        parse_highlights(value)
+        return value
+
     def __repr__(self):
         return f"<Experience {self.role} at {self.company}>"
 
@@ -226,7 +409,49 @@ class Message(db.Model):
         return f"<Message from {self.name}>"
 
 
-class BlogPost(LocalizedMixin, SortableMixin, db.Model):
+class EmailOutbox(db.Model):
+    """Queued outgoing email, written in the same transaction as its cause.
+
+    Delivered by ``app.outbox.outbox`` (background thread or
+    ``flask outbox-worker``) so a slow mail provider never holds a request.
+
+    Fields:
+        kind            – What to send (``contact_notification``).
+        payload         – JSON arguments for the sender.
+        status          – ``pending``, ``sending`` (claimed), ``sent`` or
+                          ``dead`` (gave up after ``OUTBOX_MAX_ATTEMPTS``).
+        attempts        – Delivery attempts so far.
+        next_attempt_at – Earliest time the row may be (re)claimed; doubles
+                          as the lease expiry while ``sending``.
+        last_error      – Provider diagnostic from the latest failure.
+        message_id      – Contact message that triggered the email, if any.
+        created_at      – When the email was queued.
+        sent_at         – When delivery succeeded.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=_utcnow)
+    last_error = db.Column(db.String(500))
+    message_id = db.Column(
+        db.Integer, db.ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
+    )
+    created_at = db.Column(db.DateTime, nullable=False, default=_utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.kind} #{self.id} {self.status}>"
+
+
+class BlogPost(ListingMixin, LocalizedMixin, SortableMixin, db.Model):
     """Blog article with rich-text HTML content.
 
     Fields:
@@ -246,6 +471,17 @@ class BlogPost(LocalizedMixin, SortableMixin, db.Model):
     """
 
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        # Listing / feeds / homepage: published posts newest first
+        db.Index("ix_blog_posts_published_created_at", "published", "created_at"),
+        # Category filter, category list and related posts
+        db.Index(
+            "ix_blog_posts_published_category_created_at",
+            "published",
+            "category",
+            "created_at",
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
@@ -266,6 +502,22 @@ class BlogPost(LocalizedMixin, SortableMixin, db.Model):
         db.DateTime, nullable=False, default=_utcnow, onupdate=_utcnow
     )
 
+    # Card fields (blog listing, homepage, feeds, related posts) — no body
+    LISTING_COLUMNS = (
+        "id",
+        "slug",
+        "title",
+        "title_ar",
+        "excerpt",
+        "excerpt_ar",
+        "cover_image",
+        "category",
+        "read_time",
+        "published",
+        "created_at",
+        "updated_at",
+    )
+
     def __repr__(self):
         return f"<BlogPost {self.title}>"
 
@@ -275,11 +527,17 @@ class BlogPost(LocalizedMixin, SortableMixin, db.Model):
 # ---------------------------------------------------------------------------
 
 
+# Dialects whose INSERT supports ON CONFLICT (used by SiteConfig.set_many)
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
 class SiteConfig(db.Model):
     """Key-value store for editable homepage content (hero, about, etc.).
 
-    Use the static helpers ``get()``, ``set()``, ``get_group()`` instead
-    of querying directly — they handle defaults and upsert logic.
+    Use the static helpers ``get()``, ``get_many()``, ``get_group()``,
+    ``set()`` and ``set_many()`` instead of querying directly.  Reads are
+    served from the in-process ``app.cache.site_config`` copy of the table;
+    writes only touch keys whose value actually changed.
     """
 
     __tablename__ = "site_config"
@@ -296,24 +554,77 @@ class SiteConfig(db.Model):
     @staticmethod
     def get(key, default=""):
         """Retrieve a config value by key."""
-        row = SiteConfig.query.filter_by(key=key).first()
-        return row.value if row else default
+        from app.cache import site_config
+
+        return site_config.values().get(key, default)
+
+    @staticmethod
+    def get_many(keys, default=""):
+        """Return ``{key: value}`` for *keys*, using *default* for missing ones."""
+        from app.cache import site_config
+
+        values = site_config.values()
+        return {key: values.get(key, default) for key in keys}
 
     @staticmethod
     def get_group(group):
         """Return all config rows in a group as a ``{key: value}`` dict."""
-        rows = SiteConfig.query.filter_by(group=group).all()
-        return {r.key: r.value for r in rows}
+        from app.cache import site_config
+
+        return dict(site_config.group(group))
 
     @staticmethod
     def set(key, value):
         """Upsert a config value."""
-        row = SiteConfig.query.filter_by(key=key).first()
-        if row:
-            row.value = str(value)
+        SiteConfig.set_many({key: value})
+
+    @staticmethod
+    def set_many(values) -> list:
+        """Upsert ``{key: value}`` pairs; return the keys that changed.
+
+        The stored values are read in one query and only changed keys are
+        written, in a single ``INSERT ... ON CONFLICT DO UPDATE`` on SQLite
+        and PostgreSQL.  Like ``set()`` this joins the caller's transaction;
+        commit to publish the change.
+        """
+        from app.cache import touch
+
+        values = {key: str(value) for key, value in values.items()}
+        if not values:
+            return []
+        stored = dict(
+            db.session.execute(
+                db.select(SiteConfig.key, SiteConfig.value).where(
+                    SiteConfig.key.in_(values)
+                )
+            ).all()
+        )
+        changed = {k: v for k, v in values.items() if stored.get(k) != v}
+        if not changed:
+            return []
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect in _UPSERT_INSERTS:
+            stmt = _UPSERT_INSERTS[dialect](SiteConfig.__table__).values(
+                [{"key": k, "value": v} for k, v in changed.items()]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"], set_={"value": stmt.excluded.value}
+            )
+            db.session.execute(stmt)
+            # Core statements bypass the flush hook that bumps the stamp
+            touch(db.session, "content")
         else:
-            row = SiteConfig(key=key, value=str(value))
-            db.session.add(row)
+            rows = {
+                row.key: row
+                for row in SiteConfig.query.filter(SiteConfig.key.in_(changed))
+            }
+            for key, value in changed.items():
+                if key in rows:
+                    rows[key].value = value
+                else:
+                    db.session.add(SiteConfig(key=key, value=value))
+        return list(changed)
 
 
 class ImpactCard(LocalizedMixin, SortableMixin, db.Model):
@@ -402,9 +713,24 @@ class PageVisit(db.Model):
         ip_hash    – HMAC-SHA256 digest of visitor IP (privacy-safe).
         country    – Rough locale inferred from Accept-Language header.
         visited_at – UTC timestamp (indexed for efficient range queries).
+        browser    – UA browser code, classified at ingest (see
+                     ``app.utils.UA_BROWSERS``; NULL until backfilled).
+        os         – UA operating-system code (``app.utils.UA_OSES``).
+        device     – UA device code (``app.utils.UA_DEVICES``).
     """
 
     __tablename__ = "page_visits"
+    __table_args__ = (
+        # Covering indexes for the per-day GROUP BYs run by compaction and
+        # for today's rows on the dashboard
+        db.Index("ix_page_visits_visited_at_path", "visited_at", "path", "ip_hash"),
+        db.Index("ix_page_visits_visited_at_ip_hash", "visited_at", "ip_hash"),
+        db.Index("ix_page_visits_visited_at_referrer", "visited_at", "referrer"),
+        db.Index("ix_page_visits_visited_at_country", "visited_at", "country"),
+        db.Index(
+            "ix_page_visits_visited_at_ua", "visited_at", "browser", "os", "device"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     path = db.Column(db.String(500), nullable=False)
@@ -413,6 +739,95 @@ class PageVisit(db.Model):
     ip_hash = db.Column(db.String(64))
     country = db.Column(db.String(100))
     visited_at = db.Column(db.DateTime, nullable=False, default=_utcnow, index=True)
+    browser = db.Column(db.SmallInteger)
+    os = db.Column(db.SmallInteger)
+    device = db.Column(db.SmallInteger)
 
     def __repr__(self):
         return f"<PageVisit {self.path} @ {self.visited_at}>"
+
+
+class VisitRollup(db.Model):
+    """Daily aggregate of PageVisit rows for one dimension value.
+
+    Written by ``app.analytics.compact_visits`` for each complete UTC day so
+    the dashboard reads a few rows per day instead of scanning every visit.
+    Rollups outlive the raw rows removed by the retention purge.
+
+    Fields:
+        day       – UTC calendar day.
+        dimension – ``total``, ``path``, ``referrer``, ``locale``, ``browser``,
+                    ``os``, ``device``, ``visitors`` or ``bounces``.
+        value     – Dimension value (``''`` for ``total`` / ``visitors`` /
+                    ``bounces``).
+        count     – Page views for that value (visitors for ``visitors``,
+                    single-page visitors for ``bounces``).
+    """
+
+    __tablename__ = "visit_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("day", "dimension", "value"),
+        db.Index("ix_visit_rollups_dimension_day", "dimension", "day"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)
+    value = db.Column(db.String(500), nullable=False, default="")
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VisitRollup {self.day} {self.dimension}={self.value!r}: {self.count}>"
+
+
+class VisitorSketch(db.Model):
+    """HyperLogLog sketch of distinct visitors (``ip_hash``) for one day.
+
+    Sketches are mergeable, so distinct visitors over any range of days is
+    the union of that range's rows.  See ``app.analytics.HyperLogLog``.
+
+    Fields:
+        day       – UTC calendar day.
+        scope     – ``''`` for the whole site, otherwise a page path.
+        registers – zlib-compressed HLL registers.
+    """
+
+    __tablename__ = "visitor_sketches"
+
+    day = db.Column(db.Date, primary_key=True)
+    scope = db.Column(db.String(500), primary_key=True, default="")
+    registers = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<VisitorSketch {self.day} {self.scope!r}>"
+
+
+# ---------------------------------------------------------------------------
+# Cache bookkeeping
+# ---------------------------------------------------------------------------
+
+
+class CacheVersion(db.Model):
+    """Named version stamp used to invalidate in-process caches.
+
+    One row per stamp (e.g. ``"content"``).  ``version`` is rewritten in the
+    same transaction as any change to the models the stamp covers, so every
+    gunicorn worker can tell that its cached pages are stale.  See
+    ``app/cache.py``.
+
+    Fields:
+        name       – Stamp name (primary key).
+        version    – Opaque monotonically increasing value (nanosecond clock).
+        updated_at – When the stamp last changed.
+    """
+
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=_utcnow, onupdate=_utcnow
+    )
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
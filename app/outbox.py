@@ -0,0 +1,309 @@
+"""
+Transactional email outbox.
+
+``contact()`` used to call the mail provider inline, which could hold one of
+the two gunicorn workers for up to 15 s on a slow Resend request or SMTP
+handshake.  Instead, the email is now an ``EmailOutbox`` row committed in
+the same transaction as the ``Message`` — if the message is saved, its
+notification is guaranteed to be attempted — and the response returns as
+soon as that commit succeeds.
+
+Delivery
+--------
+``OutboxDispatcher`` runs a daemon thread per process that wakes on
+``notify()`` (right after a commit) or every ``OUTBOX_POLL_SECONDS``.  Rows
+are claimed with a conditional UPDATE that also pushes ``next_attempt_at``
+out by ``OUTBOX_LEASE_SECONDS``, so several workers never send the same row
+twice and a row claimed by a crashed worker becomes due again once the lease
+expires.  Failures are retried with exponential backoff
+(``OUTBOX_BACKOFF_SECONDS * 2**(attempt-1)``, capped at
+``OUTBOX_BACKOFF_MAX_SECONDS``); after ``OUTBOX_MAX_ATTEMPTS`` the row is
+marked ``dead`` and can be re-queued from the admin dashboard.  Every
+attempt at a row carries the same idempotency key (``outbox-<id>``), so an
+attempt whose response was lost does not email the owner twice.
+
+``OUTBOX_MODE`` selects who delivers: ``thread`` (default, the dispatcher
+thread above), ``inline`` (inside ``notify()`` — the testing default) or
+``external`` (web processes only queue; run ``flask outbox-worker``).
+"""
+
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, update
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _send_contact_notification(payload: dict, idempotency_key: str) -> tuple:
+    from app.utils import send_notification_email
+
+    return send_notification_email(
+        payload["name"],
+        payload["email"],
+        payload["subject"],
+        payload["message"],
+        idempotency_key=idempotency_key,
+    )
+
+
+# Outbox kind → sender(payload, idempotency_key) returning (success, detail).
+# The key is derived from the row id, so every attempt at one row shares it.
+SENDERS = {"contact_notification": _send_contact_notification}
+
+
+def enqueue(kind: str, payload: dict, message_id: int = None):
+    """Add an email to the current session; it is sent after the commit."""
+    from app.models import EmailOutbox
+
+    if kind not in SENDERS:
+        raise ValueError(f"Unknown outbox kind: {kind!r}")
+    entry = EmailOutbox(
+        kind=kind,
+        payload=json.dumps(payload),
+        message_id=message_id,
+        next_attempt_at=_now(),
+    )
+    db.session.add(entry)
+    return entry
+
+
+class OutboxDispatcher:
+    """Delivers due ``EmailOutbox`` rows with retries and a dead-letter state.
+
+    Follows the Flask extension pattern: create once at import time and call
+    ``init_app(app)`` from the factory.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.mode = "inline"
+        self.poll_interval = 30.0
+        self.lease = 120
+        self.max_attempts = 6
+        self.backoff = 30
+        self.backoff_max = 3600
+        self.batch_size = 20
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.mode = app.config.get("OUTBOX_MODE", "thread")
+        self.poll_interval = app.config.get("OUTBOX_POLL_SECONDS", 30)
+        self.lease = app.config.get("OUTBOX_LEASE_SECONDS", 120)
+        self.max_attempts = max(1, app.config.get("OUTBOX_MAX_ATTEMPTS", 6))
+        self.backoff = app.config.get("OUTBOX_BACKOFF_SECONDS", 30)
+        self.backoff_max = app.config.get("OUTBOX_BACKOFF_MAX_SECONDS", 3600)
+        app.extensions["outbox"] = self
+
+        if self.mode == "thread":
+            self.start()
+
+    def start(self) -> None:
+        """Start the dispatcher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="email-outbox", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    # ── Producer side (request thread) ────────────────────────────────
+
+    def notify(self) -> None:
+        """Signal that new rows were committed.
+
+        Wakes the dispatcher thread, or delivers right away in ``inline``
+        mode.  In ``external`` mode the worker process picks rows up on its
+        next poll.
+        """
+        if self.mode == "thread":
+            self._wake.set()
+        elif self.mode == "inline":
+            self.dispatch_due()
+
+    # ── Consumer side ─────────────────────────────────────────────────
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self._app.app_context():
+                    self.dispatch_due()
+            except Exception:
+                logger.exception("Email outbox dispatch failed")
+
+    def run_forever(self) -> None:
+        """Poll and deliver in the calling thread (``flask outbox-worker``).
+
+        A separate worker process is not woken by ``notify()`` in the web
+        processes, so it relies on ``OUTBOX_POLL_SECONDS`` alone.
+        """
+        self._stop.clear()
+        self.dispatch_due()
+        try:
+            self._run()
+        except KeyboardInterrupt:
+            pass
+
+    def backoff_delay(self, attempts: int) -> timedelta:
+        """Wait before retry number *attempts* + 1."""
+        seconds = self.backoff * 2 ** max(0, attempts - 1)
+        return timedelta(seconds=min(seconds, self.backoff_max))
+
+    def dispatch_due(self) -> int:
+        """Claim and deliver every due row; return how many were sent."""
+        from app.models import EmailOutbox
+
+        sent = 0
+        while True:
+            due = [
+                row_id
+                for (row_id,) in db.session.query(EmailOutbox.id)
+                .filter(
+                    EmailOutbox.status.in_(("pending", "sending")),
+                    EmailOutbox.next_attempt_at <= _now(),
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+            ]
+            db.session.commit()  # end the read transaction before sending
+            if not due:
+                return sent
+            for row_id in due:
+                entry = self._claim(row_id)
+                if entry is not None:
+                    sent += self._deliver(entry)
+
+    def _claim(self, row_id: int):
+        """Lease one row to this process; None if another worker won it."""
+        from app.models import EmailOutbox
+
+        now = _now()
+        claimed = db.session.execute(
+            update(EmailOutbox)
+            .where(
+                EmailOutbox.id == row_id,
+                EmailOutbox.status.in_(("pending", "sending")),
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .values(
+                status="sending",
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=self.lease),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return None
+        return db.session.get(EmailOutbox, row_id, populate_existing=True)
+
+    def _deliver(self, entry) -> int:
+        try:
+            ok, detail = SENDERS[entry.kind](
+                json.loads(entry.payload), f"outbox-{entry.id}"
+            )
+        except Exception as exc:
+            logger.exception("Outbox sender for #%d raised", entry.id)
+            ok, detail = False, f"{type(exc).__name__}: {exc}"
+
+        if ok:
+            entry.status = "sent"
+            entry.sent_at = _now()
+            entry.last_error = None
+        elif entry.attempts >= self.max_attempts:
+            entry.status = "dead"
+            entry.last_error = (detail or "")[:500]
+            logger.error(
+                "Outbox email #%d dead after %d attempts: %s",
+                entry.id,
+                entry.attempts,
+                detail,
+            )
+        else:
+            entry.status = "pending"
+            entry.next_attempt_at = _now() + self.backoff_delay(entry.attempts)
+            entry.last_error = (detail or "")[:500]
+            logger.warning(
+                "Outbox email #%d attempt %d failed, retrying at %s: %s",
+                entry.id,
+                entry.attempts,
+                entry.next_attempt_at,
+                detail,
+            )
+        db.session.commit()
+
+        with self._lock:
+            if ok:
+                self.sent += 1
+            elif entry.status == "dead":
+                self.dead += 1
+            else:
+                self.retried += 1
+        return int(ok)
+
+    def retry_dead(self) -> int:
+        """Re-queue every dead row with a fresh attempt budget."""
+        from app.models import EmailOutbox
+
+        count = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.status == "dead")
+            .values(status="pending", attempts=0, next_attempt_at=_now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if count:
+            self.notify()
+        return count
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the dispatcher thread; undelivered rows stay in the table."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        """Row counts by status plus this process's delivery counters."""
+        from app.models import EmailOutbox
+
+        counts = dict(
+            db.session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+            .group_by(EmailOutbox.status)
+            .all()
+        )
+        with self._lock:
+            return {
+                "pending": counts.get("pending", 0) + counts.get("sending", 0),
+                "dead": counts.get("dead", 0),
+                "sent": self.sent,
+                "retried": self.retried,
+            }
+
+
+outbox = OutboxDispatcher()
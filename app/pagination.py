@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with ``WHERE (sort_key, id) < (:last_sort_key, :last_id)``
+instead of ``OFFSET``, so fetching page 50 costs the same index range read as
+page 1 and rows inserted meanwhile never shift items between pages.
+
+Cursors are opaque URL-safe strings encoding the last row's sort key and id;
+a malformed cursor raises ``ValueError`` so callers can answer 400.
+"""
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import func, literal, tuple_
+
+
+class Page:
+    """One page of rows plus the cursor for the following page (or None)."""
+
+    __slots__ = ("items", "next_cursor")
+
+    def __init__(self, items: list, next_cursor: str = None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(key, row_id: int) -> str:
+    """Encode a (sort key, id) pair; datetimes and integers are supported."""
+    if isinstance(key, datetime):
+        raw = f"t{key.isoformat()}|{row_id}"
+    else:
+        raw = f"i{int(key)}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` on bad input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        kind, rest = raw[0], raw[1:]
+        key, row_id = rest.rsplit("|", 1)
+        if kind == "t":
+            return datetime.fromisoformat(key), int(row_id)
+        if kind == "i":
+            return int(key), int(row_id)
+    except (ValueError, IndexError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def keyset_page(
+    query,
+    key_column,
+    id_column,
+    after: str = None,
+    per_page=20,
+    descending=True,
+    null_key=None,
+) -> Page:
+    """Return the page of *query* following cursor *after*.
+
+    Rows are ordered by ``(key_column, id_column)`` — newest first when
+    *descending* — and one extra row is fetched to learn whether another
+    page exists.  Rows with a NULL sort key are not paginated unless
+    *null_key* is given, in which case they sort as if it were their key.
+    """
+    key = key_column
+    if null_key is not None:
+        key = func.coalesce(key_column, literal(null_key, key_column.type))
+    position = tuple_(key, id_column)
+    if after:
+        last_key, last_id = decode_cursor(after)
+        bound = tuple_(
+            literal(last_key, key_column.type), literal(last_id, id_column.type)
+        )
+        query = query.filter(position < bound if descending else position > bound)
+    if descending:
+        query = query.order_by(key.desc(), id_column.desc())
+    else:
+        query = query.order_by(key.asc(), id_column.asc())
+
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return Page(rows)
+    rows = rows[:per_page]
+    last_key = getattr(rows[-1], key_column.key)
+    if last_key is None:
+        last_key = null_key
+    return Page(rows, encode_cursor(last_key, getattr(rows[-1], id_column.key)))
@@ -0,0 +1,391 @@
+"""
+Per-request timing: database, template and Python time.
+
+``RequestMetrics`` hooks into three places:
+
+- ``before_request`` / ``after_request`` timestamps give the total;
+- SQLAlchemy ``before/after_cursor_execute`` events add up statement time
+  and count queries made while a request is active;
+- Flask's ``before_render_template`` / ``template_rendered`` signals time
+  ``render_template`` calls.  Queries issued from inside a template (lazy
+  loads) are counted as database time, not template time.
+
+Each response gets a ``Server-Timing`` header (``db``, ``tpl``, ``app`` for
+the remaining Python time, and ``total``), which browser dev tools show
+next to the request.  Durations are also added to an in-memory
+``LatencyHistogram`` per endpoint, so the admin Performance tab can show
+p50 / p95 / p99 since the worker started.  Each gunicorn worker keeps its
+own histograms.
+
+The same cursor hooks feed two guards against query regressions:
+
+- any statement slower than ``SLOW_QUERY_MS`` is logged as a warning with
+  its normalised SQL, the endpoint and the app (or template) frame that
+  issued it;
+- ``count_queries(budget)`` records the statements run inside a block and
+  raises ``QueryBudgetExceeded`` — listing repeated statements, the usual
+  sign of an N+1 — when there are more than *budget*.  Tests use it through
+  the ``query_budget`` fixture.
+"""
+
+import contextvars
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import (
+    before_render_template,
+    g,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Endpoints not worth tracking (static files are served by the same app)
+IGNORED_ENDPOINTS = frozenset({"static"})
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with bounded memory.
+
+    Bucket *i* holds durations up to ``GROWTH ** i`` ms, so any percentile
+    is reported to within about 10% regardless of how many requests were
+    recorded.
+    """
+
+    GROWTH = 1.1
+    _LOG_GROWTH = math.log(GROWTH)
+
+    __slots__ = ("buckets", "count", "total_ms", "max_ms", "db_ms", "tpl_ms", "queries")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_ms = 0.0
+        self.tpl_ms = 0.0
+        self.queries = 0
+
+    def add(self, total_ms: float, db_ms=0.0, tpl_ms=0.0, queries=0) -> None:
+        index = (
+            max(0, math.ceil(math.log(total_ms) / self._LOG_GROWTH))
+            if total_ms > 1
+            else 0
+        )
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.db_ms += db_ms
+        self.tpl_ms += tpl_ms
+        self.queries += queries
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound (ms) of the bucket holding the *fraction* quantile."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.GROWTH**index, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict:
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(0.50), 1),
+            "p95": round(self.percentile(0.95), 1),
+            "p99": round(self.percentile(0.99), 1),
+            "max": round(self.max_ms, 1),
+            "mean": round(self.total_ms / count, 1),
+            "db_mean": round(self.db_ms / count, 1),
+            "tpl_mean": round(self.tpl_ms / count, 1),
+            "queries_mean": round(self.queries / count, 1),
+        }
+
+
+class RequestMetrics:
+    """Server-Timing header and per-endpoint latency histograms.
+
+    Follows the Flask extension pattern: create once at import time and call
+    ``init_app(app)`` from the factory, before other ``before_request``
+    hooks so their time is included in the total.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.server_timing = True
+        self._histograms = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        global _slow_query_seconds
+        self.enabled = app.config.get("PERF_METRICS_ENABLED", True)
+        self.server_timing = app.config.get("SERVER_TIMING_HEADER", True)
+        slow_ms = app.config.get("SLOW_QUERY_MS", 250)
+        _slow_query_seconds = slow_ms / 1000 if slow_ms else None
+        app.extensions["request_metrics"] = self
+        _install_engine_hooks()
+        if not self.enabled:
+            return
+        before_render_template.connect(_template_started, app)
+        template_rendered.connect(_template_finished, app)
+        app.before_request(_start_request)
+        app.after_request(self._finish_request)
+
+    def _finish_request(self, response):
+        timing = g.pop("perf", None)
+        if timing is None:
+            return response
+        total_ms = (time.perf_counter() - timing.started) * 1000
+        db_ms = timing.db * 1000
+        tpl_ms = timing.tpl * 1000
+        app_ms = max(0.0, total_ms - db_ms - tpl_ms)
+
+        if self.server_timing:
+            response.headers["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{timing.queries} queries", '
+                f"tpl;dur={tpl_ms:.1f}, app;dur={app_ms:.1f}, total;dur={total_ms:.1f}"
+            )
+
+        endpoint = timing.endpoint
+        if endpoint and endpoint not in IGNORED_ENDPOINTS:
+            with self._lock:
+                histogram = self._histograms.get(endpoint)
+                if histogram is None:
+                    histogram = self._histograms[endpoint] = LatencyHistogram()
+                histogram.add(total_ms, db_ms, tpl_ms, timing.queries)
+        return response
+
+    def stats(self) -> list:
+        """One summary dict per endpoint, slowest p95 first."""
+        with self._lock:
+            rows = [
+                {"endpoint": endpoint, **histogram.summary()}
+                for endpoint, histogram in self._histograms.items()
+            ]
+        return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class _RequestTiming:
+    __slots__ = ("started", "endpoint", "db", "queries", "tpl", "tpl_stack")
+
+    def __init__(self, endpoint):
+        self.started = time.perf_counter()
+        self.endpoint = endpoint
+        self.db = 0.0
+        self.queries = 0
+        self.tpl = 0.0
+        self.tpl_stack = []  # (render start, db time at start)
+
+
+def _start_request():
+    g.perf = _RequestTiming(request.endpoint)
+
+
+def _current_timing():
+    if not has_request_context():
+        return None  # background threads (outbox, visit flusher, CLI)
+    return g.get("perf")
+
+
+# ── Template timing ──────────────────────────────────────────────────
+
+
+def _template_started(sender, template, context, **extra):
+    timing = _current_timing()
+    if timing is not None:
+        timing.tpl_stack.append((time.perf_counter(), timing.db))
+
+
+def _template_finished(sender, template, context, **extra):
+    timing = _current_timing()
+    if timing is not None and timing.tpl_stack:
+        started, db_at_start = timing.tpl_stack.pop()
+        if not timing.tpl_stack:  # count nested renders once
+            elapsed = time.perf_counter() - started
+            timing.tpl += max(0.0, elapsed - (timing.db - db_at_start))
+
+
+# ── Query timing ─────────────────────────────────────────────────────
+
+_hooks_installed = False
+_slow_query_seconds = 0.25  # None disables the slow-query log
+
+
+def _install_engine_hooks():
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _discard_query_start)
+    _hooks_installed = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("perf_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    starts = conn.info.get("perf_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    timing = _current_timing()
+    if timing is not None:
+        timing.db += elapsed
+        timing.queries += 1
+    for recorder in _recorders.get():
+        recorder.record(statement)
+    if _slow_query_seconds is not None and elapsed >= _slow_query_seconds:
+        _log_slow_query(statement, elapsed, timing)
+
+
+def _discard_query_start(exception_context):
+    conn = exception_context.connection
+    starts = conn.info.get("perf_query_start") if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+# ── Slow-query log ───────────────────────────────────────────────────
+
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|(?<!:):\w+|\$\d+"
+    r"|__\[POSTCOMPILE_\w+\]"
+)
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.I)
+_SKIP_FRAMES = ("perf.py",)
+
+
+def normalize_sql(statement: str, limit: int = 500) -> str:
+    """Collapse whitespace and replace literals / bind params with ``?``.
+
+    Statements that differ only in their values (the rows of an N+1 loop)
+    normalise to the same string.
+    """
+    sql = " ".join(statement.split())
+    sql = _LITERALS.sub("?", sql)
+    sql = _IN_LISTS.sub("IN (?)", sql)
+    return sql if len(sql) <= limit else sql[: limit - 1] + "…"
+
+
+def query_caller() -> str:
+    """Innermost app frame (module or template) on the current stack."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and not filename.endswith(_SKIP_FRAMES):
+            path = os.path.relpath(filename, os.path.dirname(APP_DIR))
+            if filename.endswith((".html", ".xml")):
+                return path  # compiled template line numbers are meaningless
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _log_slow_query(statement, elapsed, timing) -> None:
+    sql = normalize_sql(statement)
+    caller = query_caller()
+    endpoint = timing.endpoint if timing is not None else None
+    logger.warning(
+        "Slow query %.1f ms endpoint=%s caller=%s sql=%s",
+        elapsed * 1000,
+        endpoint,
+        caller,
+        sql,
+        extra={
+            "duration_ms": round(elapsed * 1000, 1),
+            "endpoint": endpoint,
+            "caller": caller,
+            "sql": sql,
+        },
+    )
+
+
+# ── Query budgets ────────────────────────────────────────────────────
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements ran inside a ``count_queries`` block than allowed."""
+
+
+class QueryRecorder:
+    """Statements seen inside one ``count_queries`` block."""
+
+    def __init__(self, budget=None, selects_only=True):
+        self.budget = budget
+        self.selects_only = selects_only
+        self.statements = []
+
+    def record(self, statement: str) -> None:
+        if self.selects_only and not statement.lstrip()[:6].upper() == "SELECT":
+            return
+        self.statements.append(normalize_sql(statement))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self) -> list:
+        """``(statement, times)`` for statements run more than once."""
+        return [(sql, n) for sql, n in Counter(self.statements).most_common() if n > 1]
+
+    def check(self) -> None:
+        if self.budget is None or self.count <= self.budget:
+            return
+        lines = [f"{self.count} queries ran, budget is {self.budget}."]
+        repeated = self.repeated()
+        if repeated:
+            lines.append("Repeated statements (possible N+1):")
+            lines += [f"  {n}× {sql}" for sql, n in repeated[:5]]
+        else:
+            lines += [f"  {sql}" for sql in self.statements[:10]]
+        raise QueryBudgetExceeded("\n".join(lines))
+
+
+_recorders = contextvars.ContextVar("query_recorders", default=())
+
+
+@contextmanager
+def count_queries(budget=None, selects_only=True):
+    """Record the statements run in this context; enforce *budget* on exit.
+
+    ``with count_queries(3) as queries: client.get("/en/blog")`` raises
+    ``QueryBudgetExceeded`` if the request ran more than three SELECTs;
+    ``queries.count`` / ``queries.statements`` are available either way.
+    Blocks may be nested.
+    """
+    recorder = QueryRecorder(budget, selects_only)
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+    recorder.check()
@@ -5,6 +5,7 @@ from flask import (
     Blueprint,
     Response,
     abort,
+    current_app,
     g,
     jsonify,
     make_response,
@@ -15,24 +16,19 @@ from flask import (
 )
 
 from app import csrf, db, limiter
+from app.cache import cached_page, conditional_get, get_homepage_snapshot
 from app.i18n import (
     DEFAULT_LOCALE,
     get_locale_meta,
-    get_supported_locale_codes,
     is_supported_locale,
     resolve_locale,
 )
-from app.models import (
-    BlogPost,
-    Experience,
-    ImpactCard,
-    LanguageItem,
-    Message,
-    Project,
-    SiteConfig,
-    SkillCluster,
-)
-from app.utils import sanitize_input, send_notification_email, validate_email
+from app.models import BlogPost, Message, Project
+from app.outbox import enqueue, outbox
+from app.pagination import keyset_page
+from app.search import MAX_QUERY_LENGTH, search_content
+from app.sitemap import get_sitemap
+from app.utils import sanitize_input, validate_email
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +63,7 @@ def add_locale_to_main_urls(endpoint, values):
         return
     if endpoint in {
         "main.sitemap",
+        "main.sitemap_shard",
         "main.robots",
         "main.rss_feed",
         "main.rss_feed_localized",
@@ -86,43 +83,16 @@ def index_legacy():
 
 
 @main_bp.route("/<locale>/")
+@conditional_get
+@cached_page
 def index(locale):
     """Homepage — single-page layout with all portfolio sections.
 
-    Loads featured projects, experiences, latest blog posts, editable
-    site config values, impact cards, skill clusters, and languages.
+    Featured projects, experiences, latest blog posts, editable site config
+    values, impact cards, skill clusters, and languages come from a shared
+    ``HomepageSnapshot`` that is rebuilt only when content changes.
     """
-    projects = Project.query.filter_by(featured=True).order_by(Project.sort_order).all()
-    experiences = Experience.query.order_by(Experience.sort_order).all()
-    all_projects = Project.query.order_by(Project.sort_order).all()
-    latest_posts = (
-        BlogPost.query.filter_by(published=True)
-        .order_by(BlogPost.created_at.desc())
-        .limit(3)
-        .all()
-    )
-
-    # Editable site content
-    cfg = {}
-    for sc in SiteConfig.query.all():
-        cfg[sc.key] = sc.value
-
-    # Dynamic sections
-    impact_cards = ImpactCard.query.order_by(ImpactCard.sort_order).all()
-    skill_clusters = SkillCluster.query.order_by(SkillCluster.sort_order).all()
-    language_items = LanguageItem.query.order_by(LanguageItem.sort_order).all()
-
-    return render_template(
-        "index.html",
-        featured_projects=projects,
-        all_projects=all_projects,
-        experiences=experiences,
-        latest_posts=latest_posts,
-        cfg=cfg,
-        impact_cards=impact_cards,
-        skill_clusters=skill_clusters,
-        language_items=language_items,
-    )
+    return render_template("index.html", **get_homepage_snapshot().template_context())
 
 
 @main_bp.route("/project/<int:project_id>", endpoint="project_detail_legacy")
@@ -134,6 +104,8 @@ def project_detail_legacy(project_id):
 
 
 @main_bp.route("/<locale>/project/<int:project_id>")
+@conditional_get
+@cached_page
 def project_detail(locale, project_id):
     """Individual project detail page.
 
@@ -152,6 +124,8 @@ def case_study_legacy(project_id):
 
 
 @main_bp.route("/<locale>/case-study/<int:project_id>")
+@conditional_get
+@cached_page
 def case_study(locale, project_id):
     """Deep-dive case study page for a project.
 
@@ -173,20 +147,35 @@ def blog_legacy():
 
 
 @main_bp.route("/<locale>/blog")
+@conditional_get
+@cached_page
 def blog(locale):
-    """Blog listing page with optional ``?category=`` filter."""
+    """Blog listing page with optional ``?category=`` filter.
+
+    Paginated newest first; ``?after=<cursor>`` selects the next page and the
+    template links it with ``rel="next"``.
+    """
     category = request.args.get("category", "all")
+    query = BlogPost.query.options(BlogPost.listing_options()).filter_by(published=True)
     if category and category != "all":
-        posts = (
-            BlogPost.query.filter_by(published=True, category=category)
-            .order_by(BlogPost.created_at.desc())
-            .all()
+        query = query.filter_by(category=category)
+    try:
+        page = keyset_page(
+            query,
+            BlogPost.created_at,
+            BlogPost.id,
+            after=request.args.get("after"),
+            per_page=current_app.config["BLOG_PAGE_SIZE"],
         )
-    else:
-        posts = (
-            BlogPost.query.filter_by(published=True)
-            .order_by(BlogPost.created_at.desc())
-            .all()
+    except ValueError:
+        abort(400)
+    posts = page.items
+    next_url = None
+    if page.has_next:
+        next_url = url_for(
+            "main.blog",
+            category=category if category != "all" else None,
+            after=page.next_cursor,
         )
     categories = (
         db.session.query(BlogPost.category)
@@ -196,7 +185,11 @@ def blog(locale):
     )
     categories = [c[0] for c in categories if c[0]]
     return render_template(
-        "blog.html", posts=posts, categories=categories, active_category=category
+        "blog.html",
+        posts=posts,
+        categories=categories,
+        active_category=category,
+        next_url=next_url,
     )
 
 
@@ -209,12 +202,15 @@ def blog_detail_legacy(slug):
 
 
 @main_bp.route("/<locale>/blog/<slug>")
+@conditional_get
+@cached_page
 def blog_detail(locale, slug):
     """Individual blog post page with related articles sidebar."""
     post = BlogPost.query.filter_by(slug=slug, published=True).first_or_404()
     # Get related posts (same category, excluding current)
     related = (
-        BlogPost.query.filter(
+        BlogPost.query.options(BlogPost.listing_options())
+        .filter(
             BlogPost.category == post.category,
             BlogPost.id != post.id,
             BlogPost.published == True,
@@ -225,6 +221,29 @@ def blog_detail(locale, slug):
     return render_template("blog_detail.html", post=post, related=related)
 
 
+# ── Search ───────────────────────────────────────────────────────────────────
+
+
+@main_bp.route("/search", endpoint="search_legacy")
+def search_legacy():
+    return redirect(
+        url_for("main.search", locale=DEFAULT_LOCALE, q=request.args.get("q")),
+        code=301,
+    )
+
+
+@main_bp.route("/<locale>/search")
+def search(locale):
+    """Full-text search over published posts and projects.
+
+    Answered from the in-memory index in ``app/search.py``; not page-cached
+    because every query string would become its own cache entry.
+    """
+    query = (request.args.get("q") or "").strip()[:MAX_QUERY_LENGTH]
+    results = search_content(query, locale) if query else []
+    return render_template("search.html", query=query, results=results)
+
+
 # ── Contact ──────────────────────────────────────────────────────────────────
 
 
@@ -235,8 +254,8 @@ def blog_detail(locale, slug):
 def contact(locale=None):
     """Process a contact form submission (JSON only).
 
-    Validates all fields, checks for honeypot spam, saves to DB,
-    and sends an optional email notification.
+    Validates all fields, checks for honeypot spam, and saves the message
+    together with an outbox row for the email notification.
     """
     if not request.is_json:
         abort(400)
@@ -267,17 +286,16 @@ def contact(locale=None):
     try:
         message = Message(name=name, email=email, subject=subject, message=msg_text)
         db.session.add(message)
+        db.session.flush()
+        # Notification is queued in the same transaction and sent off-request
+        enqueue(
+            "contact_notification",
+            {"name": name, "email": email, "subject": subject, "message": msg_text},
+            message_id=message.id,
+        )
         db.session.commit()
         logger.info("Contact message received from %s <%s>", name, email)
-
-        # Send email notification (non-blocking: failure doesn't affect response)
-        email_sent, _detail = send_notification_email(name, email, subject, msg_text)
-        if not email_sent:
-            logger.warning(
-                "Email notification was not sent for message from %s: %s",
-                email,
-                _detail,
-            )
+        outbox.notify()
 
         return (
             jsonify({"success": True, "message": "Message sent successfully!"}),
@@ -295,6 +313,17 @@ def contact(locale=None):
 # ── API ──────────────────────────────────────────────────────────────────────
 
 
+API_PROJECT_FIELDS = (
+    "id",
+    "title",
+    "short_description",
+    "category",
+    "technologies",
+    "year",
+    "featured",
+)
+
+
 @main_bp.route("/api/projects")
 @main_bp.route("/<locale>/api/projects")
 def api_projects(locale=None):
@@ -306,21 +335,22 @@ def api_projects(locale=None):
     """
     # Prefer locale from URL segment; fall back to query-string; then default
     effective_locale = locale or request.args.get("locale", "en")
-    projects = Project.query.order_by(Project.sort_order).all()
+    projects = Project.localized_rows(
+        Project.query.options(Project.listing_options())
+        .order_by(Project.sort_order)
+        .all(),
+        effective_locale,
+        API_PROJECT_FIELDS,
+    )
     return jsonify(
         [
             {
-                "id": p.id,
-                "title": p.get_field("title", effective_locale),
-                "short_description": p.get_field("short_description", effective_locale),
-                "category": p.category,
+                **p._asdict(),
                 "technologies": (
                     [t.strip() for t in p.technologies.split(",")]
                     if p.technologies
                     else []
                 ),
-                "year": p.year,
-                "featured": p.featured,
             }
             for p in projects
         ]
@@ -335,112 +365,52 @@ def privacy_legacy():
     return redirect(url_for("main.privacy", locale=DEFAULT_LOCALE), code=301)
 
 
+def _privacy_month():
+    return datetime.now(timezone.utc).strftime("%B %Y")
+
+
 @main_bp.route("/<locale>/privacy")
+@conditional_get(vary=_privacy_month)
+@cached_page
 def privacy(locale):
     """Privacy policy page — describes data collection and retention."""
-    now = datetime.now(timezone.utc).strftime("%B %Y")
-    return render_template("privacy.html", now=now)
+    return render_template("privacy.html", now=_privacy_month())
+
+
+def _accepts_gzip():
+    return "gzip" if "gzip" in request.accept_encodings else ""
+
+
+def _sitemap_response(document):
+    """Send a prebuilt sitemap document, gzip-compressed when accepted."""
+    if _accepts_gzip():
+        response = Response(document.gzipped, mimetype="application/xml")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(document.body, mimetype="application/xml")
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 @main_bp.route("/sitemap.xml")
+@conditional_get(stamp="sitemap", vary=_accepts_gzip)
 def sitemap():
-    """Auto-generated XML sitemap covering all public pages."""
-    pages = []
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    """XML sitemap covering all public pages, served from a prebuilt blob.
 
-    # Static pages
-    for locale in get_supported_locale_codes():
-        pages.append(
-            {
-                "loc": url_for("main.index", locale=locale, _external=True),
-                "lastmod": now,
-                "changefreq": "weekly",
-                "priority": "1.0",
-            }
-        )
-        pages.append(
-            {
-                "loc": url_for("main.blog", locale=locale, _external=True),
-                "lastmod": now,
-                "changefreq": "weekly",
-                "priority": "0.8",
-            }
-        )
-        pages.append(
-            {
-                "loc": url_for("main.privacy", locale=locale, _external=True),
-                "lastmod": now,
-                "changefreq": "yearly",
-                "priority": "0.3",
-            }
-        )
+    Becomes a sitemap index pointing at ``/sitemap-<n>.xml`` shards once
+    the URL count exceeds ``SITEMAP_MAX_URLS``.
+    """
+    return _sitemap_response(get_sitemap().root)
 
-    # Blog posts
-    posts = BlogPost.query.filter_by(published=True).all()
-    for locale in get_supported_locale_codes():
-        for post in posts:
-            pages.append(
-                {
-                    "loc": url_for(
-                        "main.blog_detail",
-                        locale=locale,
-                        slug=post.slug,
-                        _external=True,
-                    ),
-                    "lastmod": (
-                        post.updated_at.strftime("%Y-%m-%d") if post.updated_at else now
-                    ),
-                    "changefreq": "monthly",
-                    "priority": "0.7",
-                }
-            )
-
-    # Projects
-    projects = Project.query.all()
-    for locale in get_supported_locale_codes():
-        for project in projects:
-            pages.append(
-                {
-                    "loc": url_for(
-                        "main.project_detail",
-                        locale=locale,
-                        project_id=project.id,
-                        _external=True,
-                    ),
-                    "lastmod": (
-                        project.updated_at.strftime("%Y-%m-%d")
-                        if project.updated_at
-                        else now
-                    ),
-                    "changefreq": "monthly",
-                    "priority": "0.6",
-                }
-            )
-
-    # Case studies
-    case_studies = Project.query.filter_by(has_case_study=True).all()
-    for locale in get_supported_locale_codes():
-        for cs in case_studies:
-            pages.append(
-                {
-                    "loc": url_for(
-                        "main.case_study",
-                        locale=locale,
-                        project_id=cs.id,
-                        _external=True,
-                    ),
-                    "lastmod": (
-                        cs.updated_at.strftime("%Y-%m-%d") if cs.updated_at else now
-                    ),
-                    "changefreq": "monthly",
-                    "priority": "0.7",
-                }
-            )
-
-    xml = render_template("sitemap.xml", pages=pages)
-    response = make_response(xml)
-    response.headers["Content-Type"] = "application/xml"
-    return response
+
+@main_bp.route("/sitemap-<int:shard>.xml")
+@conditional_get(stamp="sitemap", vary=_accepts_gzip)
+def sitemap_shard(shard):
+    """One shard of a sitemap index (404 while the sitemap fits in one file)."""
+    shards = get_sitemap().shards
+    if not 1 <= shard <= len(shards):
+        abort(404)
+    return _sitemap_response(shards[shard - 1])
 
 
 @main_bp.route("/robots.txt")
@@ -455,18 +425,23 @@ def robots():
     return Response(content, mimetype="text/plain")
 
 
+FEED_FIELDS = ("slug", "title", "excerpt", "category", "created_at")
+
+
 @main_bp.route("/feed.xml")
+@conditional_get
 def rss_feed():
     """RSS 2.0 feed of the latest 20 published blog posts (English)."""
     posts = (
-        BlogPost.query.filter_by(published=True)
+        BlogPost.query.options(BlogPost.listing_options())
+        .filter_by(published=True)
         .order_by(BlogPost.created_at.desc())
         .limit(20)
         .all()
     )
     xml = render_template(
         "feed.xml",
-        posts=posts,
+        posts=BlogPost.localized_rows(posts, "en", FEED_FIELDS),
         locale="en",
         rss_language=get_locale_meta("en")["rss_language"],
     )
@@ -476,6 +451,7 @@ def rss_feed():
 
 
 @main_bp.route("/<locale>/feed.xml", endpoint="rss_feed_localized")
+@conditional_get
 def rss_feed_localized(locale):
     """Locale-specific RSS 2.0 feed of the latest 20 published blog posts.
 
@@ -483,14 +459,15 @@ def rss_feed_localized(locale):
     Falls back to English for any untranslated content.
     """
     posts = (
-        BlogPost.query.filter_by(published=True)
+        BlogPost.query.options(BlogPost.listing_options())
+        .filter_by(published=True)
         .order_by(BlogPost.created_at.desc())
         .limit(20)
         .all()
     )
     xml = render_template(
         "feed.xml",
-        posts=posts,
+        posts=BlogPost.localized_rows(posts, locale, FEED_FIELDS),
         locale=locale,
         rss_language=get_locale_meta(locale)["rss_language"],
     )
@@ -0,0 +1,427 @@
+"""
+Full-text search over published blog posts and projects.
+
+Every document is indexed once per supported locale from its localized
+fields (Arabic falls back to English like the pages do), with HTML tags
+stripped.  The analyzer:
+
+- removes Arabic diacritics and tatweel, folds alef variants (أ إ آ ٱ) to
+  ا, taa marbuta (ة) to ه and alef maqsura (ى) to ي, and drops a leading
+  definite article (ال, وال, بال, …);
+- lowercases Latin text and applies a light suffix-stripping stemmer, so
+  "models", "modeling" and "model" meet;
+- skips a short list of stopwords in both languages.
+
+Queries are answered from an in-process inverted index (term → document →
+term frequency) ranked with BM25; a title term counts ``TITLE_WEIGHT`` times.
+No query reaches the database except the ``"search"`` version stamp check.
+
+The index follows that stamp: once posts or projects change, the next
+search lists ``(id, updated_at)`` for both tables and re-indexes only the
+rows whose timestamp moved, dropping deleted or unpublished ones.  Each
+update produces a new ``SearchIndex`` that shares the posting lists of
+untouched terms, so searches in flight never see a half-applied edit.
+
+The documents are written to ``SEARCH_INDEX_PATH`` (JSON) after each update
+and read back when a worker first searches, so a fresh worker only diffs
+timestamps instead of re-analysing every post.  ``flask --app run
+build-search-index`` rebuilds the file from scratch.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from html import unescape
+from operator import itemgetter
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.cache import on_reset, stamps
+from app.i18n import SUPPORTED_LOCALES
+from app.models import BlogPost, Project
+
+logger = logging.getLogger(__name__)
+
+search_version = stamps["search"]
+
+FORMAT = 1  # bump when the analyzer or document layout changes
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+MAX_QUERY_LENGTH = 200
+SNIPPET_LENGTH = 200
+
+# kind → (model, filters, body fields after the title, summary field)
+SOURCES = {
+    "post": (
+        BlogPost,
+        (BlogPost.published == True,),
+        ("excerpt", "content", "tags", "category"),
+        "excerpt",
+    ),
+    "project": (
+        Project,
+        (),
+        (
+            "short_description",
+            "description",
+            "case_study",
+            "challenge",
+            "approach",
+            "results",
+            "technologies",
+            "category",
+        ),
+        "short_description",
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Analyzer
+# ---------------------------------------------------------------------------
+
+_TAGS = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]+>", re.S | re.I)
+_SPACES = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_ARABIC_LETTERS = str.maketrans(
+    {"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ة": "ه", "ى": "ي"}
+)
+_ARABIC_ARTICLES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ations", "ation", "ments", "ment", "ness", "ings", "ing", "ed", "s")
+_STOPWORDS = frozenset(
+    (
+        "a an and are as at be but by for from has have how in into is it its "
+        "of on or our that the their this to was we were what when which will "
+        "with you your"
+    ).split()
+    # Arabic, already normalized (في من على الى عن ان ...)
+    + "في من على الي عن ان او ثم هذا هذه ذلك التي الذي هو هي مع كل قد لا ما".split()
+)
+
+
+def strip_html(text: str) -> str:
+    """Plain text of an HTML fragment, entities decoded, whitespace collapsed."""
+    if not text:
+        return ""
+    return _SPACES.sub(" ", unescape(_TAGS.sub(" ", text))).strip()
+
+
+def normalize_arabic(text: str) -> str:
+    """Drop diacritics / tatweel and fold letter variants (see module doc)."""
+    return _ARABIC_MARKS.sub("", text).translate(_ARABIC_LETTERS)
+
+
+def stem(word: str) -> str:
+    """Light English stemmer: strip one common suffix, then a final ``e``."""
+    if len(word) <= 3 or not word.isascii() or not word.isalpha():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        if suffix == "s" and word[-2] in "sui":  # class, status, analysis
+            break
+        if suffix == "ed" and word[-3] == "e":  # need, speed
+            break
+        word = word[: -len(suffix)]
+        if suffix in ("ing", "ings", "ed") and word[-1] == word[-2] not in "lsz":
+            word = word[:-1]  # running → run
+        break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def _strip_article(word: str) -> str:
+    for article in _ARABIC_ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 2:
+            return word[len(article) :]
+    return word
+
+
+def analyze(text: str) -> list:
+    """Index terms of plain *text*, in order (HTML must be stripped first)."""
+    terms = []
+    for word in _WORD.findall(normalize_arabic(text.lower())):
+        if len(word) < 2 or word in _STOPWORDS:
+            continue
+        if word.isascii():
+            terms.append(stem(word))
+        else:
+            terms.append(_strip_article(word))
+    return terms
+
+
+def _snippet(text: str) -> str:
+    if len(text) <= SNIPPET_LENGTH:
+        return text
+    cut = text.rfind(" ", 0, SNIPPET_LENGTH)
+    return text[: cut if cut > 0 else SNIPPET_LENGTH].rstrip(" ,.;:") + "…"
+
+
+def build_document(kind: str, obj, updated: str) -> dict:
+    """Analyse *obj* in every locale into a JSON-serialisable document."""
+    _, _, fields, summary_field = SOURCES[kind]
+    doc = {
+        "kind": kind,
+        "id": obj.id,
+        "slug": getattr(obj, "slug", None),
+        "updated": updated,
+        "locales": {},
+    }
+    for locale in SUPPORTED_LOCALES:
+        title = obj.get_field("title", locale)
+        terms = Counter()
+        for term in analyze(title):
+            terms[term] += TITLE_WEIGHT
+        texts = {field: strip_html(obj.get_field(field, locale)) for field in fields}
+        for text in texts.values():
+            terms.update(analyze(text))
+        summary = texts[summary_field] or next(
+            (text for text in texts.values() if text), ""
+        )
+        doc["locales"][locale] = {
+            "title": title,
+            "snippet": _snippet(summary),
+            "terms": dict(terms),
+            "length": sum(terms.values()),
+        }
+    return doc
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+
+class SearchResult:
+    """One ranked hit, ready for the template."""
+
+    __slots__ = ("kind", "id", "slug", "title", "snippet", "score")
+
+    def __init__(self, doc, locale, score):
+        entry = doc["locales"][locale]
+        self.kind = doc["kind"]
+        self.id = doc["id"]
+        self.slug = doc["slug"]
+        self.title = entry["title"]
+        self.snippet = entry["snippet"]
+        self.score = score
+
+
+class SearchIndex:
+    """Inverted index over both locales; never mutated once published."""
+
+    __slots__ = ("version", "docs", "postings", "total_length")
+
+    def __init__(self, version=None):
+        self.version = version
+        self.docs = {}  # "post:3" → document (see build_document)
+        self.postings = {locale: {} for locale in SUPPORTED_LOCALES}
+        self.total_length = dict.fromkeys(SUPPORTED_LOCALES, 0)
+
+    def updated(self, version, changed: dict, removed=()) -> "SearchIndex":
+        """Return a copy with *changed* documents (re)indexed and *removed* dropped.
+
+        Only the posting lists of terms the edited documents contain are
+        copied; every other list is shared with this index.
+        """
+        new = SearchIndex(version)
+        if not changed and not removed:
+            new.docs, new.postings = self.docs, self.postings
+            new.total_length = self.total_length
+            return new
+        new.docs = dict(self.docs)
+        new.postings = {locale: dict(p) for locale, p in self.postings.items()}
+        new.total_length = dict(self.total_length)
+        copied = set()
+
+        def postings_for(locale, term):
+            postings = new.postings[locale]
+            if (locale, term) not in copied:
+                postings[term] = dict(postings.get(term, ()))
+                copied.add((locale, term))
+            return postings[term]
+
+        for key in (*removed, *changed):
+            old = new.docs.pop(key, None)
+            if old is None:
+                continue
+            for locale, entry in old["locales"].items():
+                new.total_length[locale] -= entry["length"]
+                for term in entry["terms"]:
+                    postings_for(locale, term).pop(key, None)
+        for key, doc in changed.items():
+            new.docs[key] = doc
+            for locale, entry in doc["locales"].items():
+                new.total_length[locale] += entry["length"]
+                for term, tf in entry["terms"].items():
+                    postings_for(locale, term)[key] = tf
+        for locale, term in copied:
+            if not new.postings[locale][term]:
+                del new.postings[locale][term]
+        return new
+
+    def search(self, query: str, locale: str, limit: int = 20) -> list:
+        """Rank documents for *query* in *locale* with BM25; best first."""
+        postings = self.postings.get(locale)
+        count = len(self.docs)
+        terms = set(analyze(query[:MAX_QUERY_LENGTH]))
+        if not postings or not count or not terms:
+            return []
+        average = self.total_length[locale] / count or 1
+        scores = {}
+        for term in terms:
+            hits = postings.get(term)
+            if not hits:
+                continue
+            idf = math.log(1 + (count - len(hits) + 0.5) / (len(hits) + 0.5))
+            for key, tf in hits.items():
+                length = self.docs[key]["locales"][locale]["length"]
+                norm = K1 * (1 - B + B * length / average)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [SearchResult(self.docs[key], locale, score) for key, score in best]
+
+    @property
+    def term_count(self) -> int:
+        return sum(len(postings) for postings in self.postings.values())
+
+
+# ---------------------------------------------------------------------------
+# Synchronisation and persistence
+# ---------------------------------------------------------------------------
+
+
+def index_path() -> str:
+    """Where the index is persisted (``SEARCH_INDEX_PATH`` or the instance folder)."""
+    return current_app.config.get("SEARCH_INDEX_PATH") or os.path.join(
+        current_app.instance_path, "search-index.json"
+    )
+
+
+def save_index(index: SearchIndex, path: str) -> None:
+    """Write *index*'s documents to *path* atomically."""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".search-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "format": FORMAT,
+                    "locales": list(SUPPORTED_LOCALES),
+                    "docs": index.docs,
+                },
+                fh,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_index(path: str) -> SearchIndex:
+    """Rebuild the postings from the documents saved at *path*.
+
+    A missing, unreadable or outdated file yields an empty index (which
+    the next sync then fills).
+    """
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return SearchIndex()
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable search index %s", path, exc_info=True)
+        return SearchIndex()
+    if data.get("format") != FORMAT or data.get("locales") != list(SUPPORTED_LOCALES):
+        return SearchIndex()
+    return SearchIndex().updated(None, data.get("docs", {}))
+
+
+def sync_index(index: SearchIndex, version) -> SearchIndex:
+    """Bring *index* up to date with the database, re-indexing changed rows."""
+    current = {}
+    for kind, (model, filters, _, _) in SOURCES.items():
+        rows = db.session.execute(select(model.id, model.updated_at).where(*filters))
+        for row_id, updated_at in rows:
+            current[f"{kind}:{row_id}"] = str(updated_at)
+    removed = [key for key in index.docs if key not in current]
+    stale = [
+        key
+        for key, updated in current.items()
+        if index.docs.get(key, {}).get("updated") != updated
+    ]
+
+    changed = {}
+    for kind, (model, _, _, _) in SOURCES.items():
+        ids = [int(key.split(":")[1]) for key in stale if key.startswith(f"{kind}:")]
+        if not ids:
+            continue
+        for obj in db.session.execute(select(model).where(model.id.in_(ids))).scalars():
+            key = f"{kind}:{obj.id}"
+            changed[key] = build_document(kind, obj, current[key])
+
+    synced = index.updated(version, changed, removed)
+    if (changed or removed) and current_app.config.get("SEARCH_INDEX_PERSIST", True):
+        try:
+            save_index(synced, index_path())
+        except OSError:
+            logger.warning("Could not persist the search index", exc_info=True)
+    return synced
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Return the current index, loading or syncing it only when needed."""
+    global _index
+    version = search_version.current()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None:
+            persist = current_app.config.get("SEARCH_INDEX_PERSIST", True)
+            _index = load_index(index_path()) if persist else SearchIndex()
+        if _index.version != version:
+            _index = sync_index(_index, version)
+        return _index
+
+
+def rebuild_index() -> SearchIndex:
+    """Re-analyse every document and rewrite the persisted index."""
+    global _index
+    with _lock:
+        _index = sync_index(SearchIndex(), search_version.current())
+        return _index
+
+
+def search_content(query: str, locale: str, limit: int = None) -> list:
+    """Ranked ``SearchResult`` list for *query* in *locale*."""
+    if limit is None:
+        limit = current_app.config.get("SEARCH_RESULTS_LIMIT", 20)
+    return get_search_index().search(query, locale, limit)
+
+
+@on_reset
+def _drop_index():
+    global _index
+    _index = None
@@ -0,0 +1,172 @@
+"""
+Prebuilt sitemap.xml.
+
+The sitemap only changes when a BlogPost or Project is created, updated or
+deleted, so it is rendered once per ``"sitemap"`` version stamp and kept as
+ready-to-send bytes, plain and gzip-compressed.  A crawler hammering
+/sitemap.xml therefore costs a memory read.
+
+Once the URL count exceeds ``SITEMAP_MAX_URLS`` (50,000 is the protocol
+limit) the URLs are split into shards served at ``/sitemap-<n>.xml`` and
+/sitemap.xml becomes a sitemap index pointing at them.
+"""
+
+import gzip
+import threading
+
+from flask import current_app, render_template, request, url_for
+from sqlalchemy import select
+
+from app import db
+from app.cache import on_reset, stamp_time, stamps
+from app.i18n import get_supported_locale_codes
+from app.models import BlogPost, Project
+
+sitemap_version = stamps["sitemap"]
+
+
+class SitemapDocument:
+    """One XML document held as plain and gzip bytes."""
+
+    __slots__ = ("body", "gzipped")
+
+    def __init__(self, xml: str):
+        self.body = xml.encode("utf-8")
+        self.gzipped = gzip.compress(self.body, mtime=0)
+
+
+class BuiltSitemap:
+    """The root document plus shards (empty unless the root is an index)."""
+
+    __slots__ = ("version", "root", "shards")
+
+    def __init__(self, version, root, shards):
+        self.version = version
+        self.root = root
+        self.shards = shards
+
+
+def _collect_pages(built_on: str) -> list:
+    """Return one ``{loc, lastmod, changefreq, priority}`` dict per URL."""
+    posts = db.session.execute(
+        select(BlogPost.slug, BlogPost.updated_at).where(BlogPost.published == True)
+    ).all()
+    projects = db.session.execute(
+        select(Project.id, Project.updated_at, Project.has_case_study)
+    ).all()
+
+    def _day(value):
+        return value.strftime("%Y-%m-%d") if value else built_on
+
+    pages = []
+    for locale in get_supported_locale_codes():
+        for endpoint, changefreq, priority in (
+            ("main.index", "weekly", "1.0"),
+            ("main.blog", "weekly", "0.8"),
+            ("main.privacy", "yearly", "0.3"),
+        ):
+            pages.append(
+                {
+                    "loc": url_for(endpoint, locale=locale, _external=True),
+                    "lastmod": built_on,
+                    "changefreq": changefreq,
+                    "priority": priority,
+                }
+            )
+        for post in posts:
+            pages.append(
+                {
+                    "loc": url_for(
+                        "main.blog_detail",
+                        locale=locale,
+                        slug=post.slug,
+                        _external=True,
+                    ),
+                    "lastmod": _day(post.updated_at),
+                    "changefreq": "monthly",
+                    "priority": "0.7",
+                }
+            )
+        for project in projects:
+            pages.append(
+                {
+                    "loc": url_for(
+                        "main.project_detail",
+                        locale=locale,
+                        project_id=project.id,
+                        _external=True,
+                    ),
+                    "lastmod": _day(project.updated_at),
+                    "changefreq": "monthly",
+                    "priority": "0.6",
+                }
+            )
+        # Case studies are derived from the rows already loaded above
+        for project in projects:
+            if project.has_case_study:
+                pages.append(
+                    {
+                        "loc": url_for(
+                            "main.case_study",
+                            locale=locale,
+                            project_id=project.id,
+                            _external=True,
+                        ),
+                        "lastmod": _day(project.updated_at),
+                        "changefreq": "monthly",
+                        "priority": "0.7",
+                    }
+                )
+    return pages
+
+
+def build_sitemap(version: int) -> BuiltSitemap:
+    """Render the sitemap (or index + shards) for the current request host."""
+    built_on = stamp_time(version).strftime("%Y-%m-%d")
+    pages = _collect_pages(built_on)
+    max_urls = max(1, current_app.config.get("SITEMAP_MAX_URLS", 50_000))
+
+    if len(pages) <= max_urls:
+        root = SitemapDocument(render_template("sitemap.xml", pages=pages))
+        return BuiltSitemap(version, root, ())
+
+    shards = tuple(
+        SitemapDocument(
+            render_template("sitemap.xml", pages=pages[start : start + max_urls])
+        )
+        for start in range(0, len(pages), max_urls)
+    )
+    index = [
+        {
+            "loc": url_for("main.sitemap_shard", shard=number, _external=True),
+            "lastmod": built_on,
+        }
+        for number in range(1, len(shards) + 1)
+    ]
+    root = SitemapDocument(render_template("sitemap_index.xml", sitemaps=index))
+    return BuiltSitemap(version, root, shards)
+
+
+_built = {}  # request host → BuiltSitemap
+_lock = threading.Lock()
+
+
+def get_sitemap() -> BuiltSitemap:
+    """Return the prebuilt sitemap, rebuilding only after posts/projects change."""
+    version = sitemap_version.current()
+    host = request.host_url
+    built = _built.get(host)
+    if built is not None and built.version == version:
+        return built
+    with _lock:
+        built = _built.get(host)
+        if built is None or built.version != version:
+            if len(_built) >= 8:  # bound memory if many Host headers are seen
+                _built.clear()
+            built = _built[host] = build_sitemap(version)
+        return built
+
+
+@on_reset
+def _clear_built():
+    _built.clear()
@@ -87,9 +87,55 @@ document.addEventListener('DOMContentLoaded', function () {
 
     /* ── 7. Charts (Analytics) ───────────────────────────────── */
     initCharts();
+
+    /* ── 8. Paginated Tables ("Load more") ───────────────────── */
+    initLoadMore();
 });
 
 
+/* ═══════════════════════════════════════════════════════════════
+ *  Load More
+ *  Dashboard tables render their first page server-side; each
+ *  .load-more button fetches the next page of rendered rows as
+ *  JSON ({html, next}) and appends it to its target <tbody>.
+ * ═══════════════════════════════════════════════════════════════ */
+
+function initLoadMore() {
+    document.querySelectorAll('.load-more').forEach(function (btn) {
+        btn.addEventListener('click', function () {
+            var target = document.getElementById(btn.getAttribute('data-target'));
+            var url = btn.getAttribute('data-url');
+            if (!target || !url) return;
+
+            btn.disabled = true;
+            btn.textContent = 'Loading…';
+            fetch(url, {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            })
+                .then(function (res) {
+                    if (!res.ok) throw new Error('HTTP ' + res.status);
+                    return res.json();
+                })
+                .then(function (data) {
+                    target.insertAdjacentHTML('beforeend', data.html);
+                    if (data.next) {
+                        btn.setAttribute('data-url', data.next);
+                        btn.disabled = false;
+                        btn.textContent = 'Load more';
+                    } else {
+                        btn.parentNode.removeChild(btn);
+                    }
+                })
+                .catch(function () {
+                    btn.disabled = false;
+                    btn.textContent = 'Retry';
+                });
+        });
+    });
+}
+
+
 /* ═══════════════════════════════════════════════════════════════
  *  WYSIWYG Rich-Text Editor
  *  Converts any <textarea data-wysiwyg> into a contentEditable
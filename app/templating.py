@@ -0,0 +1,70 @@
+"""
+Jinja bytecode cache and startup template warm-up.
+
+Flask compiles a template the first time it is rendered, so after every
+deploy or gunicorn worker recycle the first visitors to each page paid for
+parsing and compiling it — ``admin/base.html`` and ``admin/dashboard.html``
+are close to 1,000 lines each.  ``init_templates`` moves that cost to start
+up:
+
+- Compiled templates are stored in a ``FileSystemBytecodeCache`` shared by
+  every worker and every restart on the host.  Entries are keyed by the
+  template's source checksum, so an edited template is simply recompiled.
+- ``warm_templates`` loads every template into the environment's in-memory
+  cache, logging how long each one took.
+"""
+
+import logging
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = (".html", ".xml")
+
+
+def init_templates(app) -> None:
+    """Attach the bytecode cache and warm templates as configured."""
+    if app.config.get("TEMPLATE_BYTECODE_CACHE", True):
+        cache_dir = app.config.get("TEMPLATE_CACHE_DIR")
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        # Without a directory Jinja uses a private per-user temp directory
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            cache_dir or None, "portfolio-%s.cache"
+        )
+    if app.config.get("TEMPLATE_WARMUP", True):
+        warm_templates(app)
+
+
+def warm_templates(app) -> list:
+    """Compile (or load from bytecode) every template; return (name, ms) pairs.
+
+    A template that fails to compile is logged and skipped so one bad file
+    does not stop the app from starting; rendering it still raises.
+    """
+    env = app.jinja_env
+    timings = []
+    started = time.perf_counter()
+    for name in env.list_templates(filter_func=lambda n: n.endswith(TEMPLATE_SUFFIXES)):
+        begin = time.perf_counter()
+        try:
+            env.get_template(name)
+        except TemplateError:
+            logger.exception("Template %s failed to compile during warm-up", name)
+            continue
+        elapsed = (time.perf_counter() - begin) * 1000
+        timings.append((name, elapsed))
+        logger.debug("Template %s ready in %.1f ms", name, elapsed)
+
+    if timings:
+        slowest = sorted(timings, key=lambda item: item[1], reverse=True)[:3]
+        logger.info(
+            "Warmed %d templates in %.0f ms (slowest: %s)",
+            len(timings),
+            (time.perf_counter() - started) * 1000,
+            ", ".join(f"{name} {ms:.1f} ms" for name, ms in slowest),
+        )
+    return timings
@@ -0,0 +1,288 @@
+"""
+Streaming storage for admin image uploads.
+
+``store_upload`` copies the uploaded stream to a temporary file inside
+``UPLOAD_FOLDER`` in fixed-size chunks, so a request never holds more than
+one chunk of the image in memory.  While copying it:
+
+- checks the leading magic bytes against the allowed image formats and
+  rejects anything else before reading further;
+- stops as soon as the byte count passes the size limit;
+- hashes the content with SHA-256.
+
+An optional *prepare* callback may then rewrite the verified temp file (the
+admin endpoint strips EXIF / XMP metadata this way); the file is re-hashed
+afterwards, so the name always matches the bytes stored.  It is then renamed
+into place under a name derived from that hash
+(``<first 16 hex digits>.<ext>``), so uploading the same image twice stores
+it once and the second upload skips processing entirely (the same original
+always prepares to the same bytes).  The rename is atomic: readers never see
+a partially written upload.
+
+Files are never rewritten or renamed after that, so whether one is still
+needed is decided by ``reference_index`` — every ``/static/uploads/...``
+URL found in the text columns of the content models (image fields and
+rich-text bodies alike).  ``collect_garbage`` removes uploads nothing
+references, together with their ``variants/``; ``flask --app run
+gc-uploads --dry-run`` reports what it would reclaim.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from flask import current_app
+from PIL import Image
+from sqlalchemy import String, select
+
+from app import db
+
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = ".upload-"
+HASH_PREFIX = 16  # hex digits of SHA-256 used in the stored filename
+
+# Leading bytes → stored extension (SVG is deliberately absent: XSS vector)
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_SNIFF_BYTES = 12
+
+
+class UploadRejected(ValueError):
+    """The upload is not an acceptable image; ``str(exc)`` is user-facing."""
+
+
+class StoredUpload:
+    """Result of ``store_upload``."""
+
+    __slots__ = ("name", "path", "size", "sha256", "created")
+
+    def __init__(self, name, path, size, sha256, created):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.created = created  # False when an identical file already existed
+
+
+def sniff_image_type(head: bytes):
+    """Return the stored extension for *head*'s image format, or ``None``."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+def _verify(path: str) -> bool:
+    try:
+        with Image.open(path) as img:
+            img.verify()  # parses the structure without decoding pixels
+        return True
+    except Exception:
+        return False
+
+
+def _hash_file(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest, os.path.getsize(path)
+
+
+def store_upload(stream, upload_dir: str, max_bytes: int, prepare=None) -> StoredUpload:
+    """Stream *stream* into *upload_dir*; raise ``UploadRejected`` if unfit.
+
+    *prepare*, if given, is called with the verified temp file's path and may
+    rewrite it in place before it is hashed and named; an image it cannot
+    decode is rejected like any other invalid upload.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=TEMP_PREFIX, suffix=".tmp")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        ext = None
+        head = b""
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(CHUNK_SIZE):
+                if ext is None:
+                    head += chunk
+                    if len(head) < _SNIFF_BYTES:
+                        continue
+                    ext = sniff_image_type(head)
+                    if ext is None:
+                        raise UploadRejected("File is not a valid image.")
+                    chunk, head = head, b""
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(
+                        f"File too large (max {max_bytes // (1024 * 1024)} MB)."
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+            if ext is None and head:  # whole file shorter than the sniff window
+                raise UploadRejected("File is not a valid image.")
+        if size == 0:
+            raise UploadRejected("Empty file.")
+        if not _verify(tmp_path):
+            raise UploadRejected("File is not a valid image.")
+        if prepare is not None:
+            try:
+                prepare(tmp_path)
+            except (OSError, Image.DecompressionBombError):
+                # verify() does not decode pixels; a truncated body fails here
+                raise UploadRejected("File is not a valid image.")
+            digest, size = _hash_file(tmp_path)
+
+        sha256 = digest.hexdigest()
+        name = f"{sha256[:HASH_PREFIX]}.{ext}"
+        path = os.path.join(upload_dir, name)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return StoredUpload(name, path, size, sha256, created=False)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp_path, path)
+        return StoredUpload(name, path, size, sha256, created=True)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Reference tracking and garbage collection
+# ---------------------------------------------------------------------------
+
+
+def _upload_url_pattern():
+    prefix = current_app.static_url_path.rstrip("/") + "/uploads/"
+    return re.compile(re.escape(prefix) + r"((?:variants/)?[\w.-]+)")
+
+
+def _stem(name: str) -> str:
+    """Source stem an upload URL refers to (variants map back to theirs)."""
+    if name.startswith("variants/"):
+        name = name[len("variants/") :]
+        # <stem>-<width>w.<ext> or <stem>.json
+        base = os.path.splitext(name)[0]
+        return re.sub(r"-\d+w$", "", base)
+    return os.path.splitext(name)[0]
+
+
+def reference_index() -> dict:
+    """Map each referenced upload stem to the fields that reference it.
+
+    Scans every string column of the content models (``STAMP_MODELS``)
+    with one query per model; values look like ``"BlogPost#3.cover_image"``.
+    """
+    from app.cache import STAMP_MODELS
+
+    pattern = _upload_url_pattern()
+    index = {}
+    for model in STAMP_MODELS["content"]:
+        columns = [c for c in model.__table__.columns if isinstance(c.type, String)]
+        if not columns:
+            continue
+        query = select(model.__table__.c.id, *columns)
+        for row in db.session.execute(query):
+            row_id, values = row[0], row[1:]
+            for column, value in zip(columns, values):
+                if not value or "/uploads/" not in value:
+                    continue
+                for name in pattern.findall(value):
+                    index.setdefault(_stem(name), set()).add(
+                        f"{model.__name__}#{row_id}.{column.name}"
+                    )
+    return index
+
+
+class GarbageReport:
+    """Orphaned uploads found (and, unless a dry run, removed)."""
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.orphans = []  # (upload name, bytes incl. variants, file count)
+        self.kept = 0
+        self.skipped_recent = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return sum(size for _, size, _ in self.orphans)
+
+    @property
+    def files_reclaimed(self) -> int:
+        return sum(count for _, _, count in self.orphans)
+
+
+def _derived_files(upload_dir: str, stem: str) -> list:
+    variant_dir = os.path.join(upload_dir, "variants")
+    if not os.path.isdir(variant_dir):
+        return []
+    pattern = re.compile(rf"{re.escape(stem)}(-\d+w\.\w+|\.json)$")
+    return [
+        os.path.join(variant_dir, name)
+        for name in os.listdir(variant_dir)
+        if pattern.match(name)
+    ]
+
+
+def collect_garbage(
+    upload_dir: str, dry_run: bool = False, min_age: float = 86400
+) -> GarbageReport:
+    """Delete uploads no content references, with their variants.
+
+    Files younger than *min_age* seconds are kept: an image is uploaded a
+    moment before the form that references it is saved.  Abandoned temp
+    files from interrupted uploads are removed under the same rule.
+    """
+    report = GarbageReport(dry_run)
+    if not os.path.isdir(upload_dir):
+        return report
+    referenced = reference_index()
+    cutoff = time.time() - min_age
+    sources = set()
+    for name in sorted(os.listdir(upload_dir)):
+        path = os.path.join(upload_dir, name)
+        if not os.path.isfile(path) or (
+            name.startswith(".") and not name.startswith(TEMP_PREFIX)
+        ):
+            continue  # variants/, .gitkeep
+        sources.add(os.path.splitext(name)[0])
+        if os.path.getmtime(path) > cutoff:
+            report.skipped_recent += 1
+            continue
+        stem = os.path.splitext(name)[0]
+        if not name.startswith(TEMP_PREFIX) and stem in referenced:
+            report.kept += 1
+            continue
+        files = [path]
+        if not name.startswith(TEMP_PREFIX):
+            files += _derived_files(upload_dir, stem)
+        size = sum(os.path.getsize(f) for f in files)
+        report.orphans.append((name, size, len(files)))
+        if not dry_run:
+            for f in files:
+                os.remove(f)
+
+    # Variants whose source upload was removed by hand
+    variant_dir = os.path.join(upload_dir, "variants")
+    if os.path.isdir(variant_dir):
+        for name in sorted(os.listdir(variant_dir)):
+            path = os.path.join(variant_dir, name)
+            stem = _stem(f"variants/{name}")
+            if stem in sources or stem in referenced or not os.path.isfile(path):
+                continue
+            if os.path.getmtime(path) > cutoff:
+                continue
+            report.orphans.append((f"variants/{name}", os.path.getsize(path), 1))
+            if not dry_run:
+                os.remove(path)
+    return report
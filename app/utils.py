@@ -5,19 +5,20 @@ Centralises security helpers so routes.py and admin.py share a single
 implementation, reducing duplication and the risk of divergent logic.
 """
 
+import http.client
 import json
 import logging
 import os
 import re
 import smtplib
-import ssl
-import urllib.error
-import urllib.request
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 
 import bleach
 
+from app.mailer import http_client, smtp_pool
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -138,14 +139,23 @@ def generate_slug(title: str) -> str:
 # Email notification
 # ---------------------------------------------------------------------------
 
+# Overridable with RESEND_API_URL (e.g. a local stub in development)
+RESEND_API_URL = "https://api.resend.com"
+
 
 def _send_via_resend(
-    api_key: str, to_email: str, subject: str, html_body: str, text_body: str
+    api_key: str,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: str,
+    idempotency_key: str = None,
 ) -> tuple[bool, str]:
     """Send email via Resend HTTP API (no SMTP, no extra packages).
 
-    Uses only Python stdlib (urllib.request). Works on Render free tier
-    where outbound SMTP ports are blocked.
+    Uses a pooled keep-alive HTTPS connection from ``app.mailer``. Works on
+    Render free tier where outbound SMTP ports are blocked.  With an
+    *idempotency_key*, Resend sends a repeated request only once.
 
     Docs: https://resend.com/docs/api-reference/emails/send-email
     """
@@ -172,48 +182,21 @@ def _send_via_resend(
         subject,
     )
 
-    req = urllib.request.Request(
-        "https://api.resend.com/emails",
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "User-Agent": "portfolio-website/1.0",
-        },
-        method="POST",
-    )
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "User-Agent": "portfolio-website/1.0",
+    }
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
 
+    api_url = os.environ.get("RESEND_API_URL", "").strip() or RESEND_API_URL
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            data = json.loads(resp.read())
-            logger.info("Email sent via Resend (id=%s)", data.get("id"))
-            return True, "Email sent successfully via Resend"
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode(errors="replace")
-        try:
-            err = json.loads(body)
-            msg = err.get("message", body)
-        except (json.JSONDecodeError, ValueError):
-            msg = body
-
-        # Provide actionable guidance for common Resend errors
-        if "1010" in str(msg) or exc.code == 403:
-            detail = (
-                f"Resend API error {exc.code}: {msg}. "
-                f"Attempted: from={from_email}, to={to_email}. "
-                "With the free test sender (onboarding@resend.dev) the 'to' address "
-                "MUST exactly match the email you signed up for Resend with. "
-                "Check for typos/spaces in NOTIFICATION_EMAIL. "
-                "If it already matches, redeploy the Render service to pick up "
-                "the new env var, OR verify a custom domain at resend.com/domains."
-            )
-        else:
-            detail = f"Resend API error {exc.code}: {msg}"
-
-        logger.error(detail)
-        return False, detail
-    except urllib.error.URLError as exc:
-        detail = f"Could not reach Resend API: {exc.reason}"
+        status, body = http_client(api_url).request(
+            "POST", "/emails", body=payload, headers=headers
+        )
+    except (OSError, http.client.HTTPException) as exc:
+        detail = f"Could not reach Resend API: {type(exc).__name__}: {exc}"
         logger.error(detail)
         return False, detail
     except Exception as exc:
@@ -221,6 +204,35 @@ def _send_via_resend(
         logger.exception("Failed to send via Resend")
         return False, detail
 
+    text = body.decode(errors="replace")
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        data = {}
+
+    if 200 <= status < 300:
+        logger.info("Email sent via Resend (id=%s)", data.get("id"))
+        return True, "Email sent successfully via Resend"
+
+    msg = data.get("message", text) if isinstance(data, dict) else text
+
+    # Provide actionable guidance for common Resend errors
+    if "1010" in str(msg) or status == 403:
+        detail = (
+            f"Resend API error {status}: {msg}. "
+            f"Attempted: from={from_email}, to={to_email}. "
+            "With the free test sender (onboarding@resend.dev) the 'to' address "
+            "MUST exactly match the email you signed up for Resend with. "
+            "Check for typos/spaces in NOTIFICATION_EMAIL. "
+            "If it already matches, redeploy the Render service to pick up "
+            "the new env var, OR verify a custom domain at resend.com/domains."
+        )
+    else:
+        detail = f"Resend API error {status}: {msg}"
+
+    logger.error(detail)
+    return False, detail
+
 
 def get_email_config_status() -> dict:
     """Return a dict describing which email env vars are set.
@@ -255,7 +267,7 @@ def get_email_config_status() -> dict:
 
 
 def send_notification_email(
-    name: str, email: str, subject: str, message: str
+    name: str, email: str, subject: str, message: str, idempotency_key: str = None
 ) -> tuple[bool, str]:
     """Send an email notification when a contact form is submitted.
 
@@ -263,6 +275,9 @@ def send_notification_email(
     1. **Resend** (HTTP API) — if RESEND_API_KEY is set
     2. **SMTP** — if MAIL_SERVER / MAIL_USERNAME / MAIL_PASSWORD are set
 
+    *idempotency_key* is passed to Resend so that sending the same
+    notification again (a retried request or outbox attempt) is a no-op.
+
     Returns (success: bool, detail: str) — detail contains a human-readable
     diagnostic message for admin display.
     """
@@ -312,7 +327,12 @@ def send_notification_email(
     resend_api_key = os.environ.get("RESEND_API_KEY", "").strip()
     if resend_api_key:
         return _send_via_resend(
-            resend_api_key, notification_email, full_subject, html_body, text_body
+            resend_api_key,
+            notification_email,
+            full_subject,
+            html_body,
+            text_body,
+            idempotency_key,
         )
 
     # ── Fall back to SMTP ─────────────────────────────────────────────
@@ -343,23 +363,13 @@ def send_notification_email(
     msg.attach(MIMEText(text_body, "plain"))
     msg.attach(MIMEText(html_body, "html"))
 
+    # Port 465 uses implicit SSL; other ports upgrade with STARTTLS unless
+    # MAIL_USE_TLS=false (local relays only)
+    starttls = os.environ.get("MAIL_USE_TLS", "true").strip().lower() != "false"
+    pool = smtp_pool(mail_server, mail_port, mail_username, mail_password, starttls)
+
     try:
-        if mail_port == 465:
-            # Port 465 uses implicit SSL
-            context = ssl.create_default_context()
-            server = smtplib.SMTP_SSL(
-                mail_server, mail_port, timeout=15, context=context
-            )
-        else:
-            # Port 587 (or other) uses STARTTLS
-            server = smtplib.SMTP(mail_server, mail_port, timeout=15)
-            server.ehlo()
-            server.starttls(context=ssl.create_default_context())
-            server.ehlo()
-
-        with server:
-            server.login(mail_username, mail_password)
-            server.send_message(msg)
+        pool.send(msg)
 
         logger.info("Email notification sent for contact from %s", email)
         return True, "Email sent successfully"
@@ -601,3 +611,40 @@ def parse_user_agent_short(ua: str) -> dict:
     device = "Mobile" if is_mobile else "Desktop"
 
     return {"browser": browser, "os": os_name, "device": device}
+
+
+# Compact codes stored on PageVisit.browser / .os / .device — the index in
+# each tuple is the code.  Append only: stored rows keep their codes.
+UA_BROWSERS = ("Unknown", "Other", "Edge", "Opera", "Chrome", "Firefox", "Safari", "IE")
+UA_OSES = (
+    "Unknown",
+    "Other",
+    "iOS",
+    "Android",
+    "Windows",
+    "macOS",
+    "Linux",
+    "ChromeOS",
+)
+UA_DEVICES = ("Unknown", "Desktop", "Mobile")
+
+_BROWSER_CODES = {name: code for code, name in enumerate(UA_BROWSERS)}
+_OS_CODES = {name: code for code, name in enumerate(UA_OSES)}
+_DEVICE_CODES = {name: code for code, name in enumerate(UA_DEVICES)}
+
+
+@lru_cache(maxsize=1024)
+def classify_user_agent(ua: str) -> tuple:
+    """Return ``(browser, os, device)`` codes for a user-agent string.
+
+    An empty UA classifies as ``Unknown`` (code 0) on all three axes.  Results
+    are memoised because a handful of UA strings cover most traffic.
+    """
+    if not ua:
+        return (0, 0, 0)
+    parsed = parse_user_agent_short(ua)
+    return (
+        _BROWSER_CODES[parsed["browser"]],
+        _OS_CODES[parsed["os"]],
+        _DEVICE_CODES[parsed["device"]],
+    )
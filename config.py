@@ -36,6 +36,60 @@ class Config:
         os.path.dirname(os.path.abspath(__file__)), "app", "static", "uploads"
     )
 
+    # Write-behind analytics (see app/analytics.py)
+    VISIT_BUFFER_ASYNC = True  # background flusher thread; False = write inline
+    VISIT_BUFFER_MAX_SIZE = 10_000  # queued visits before new ones are dropped
+    VISIT_BUFFER_BATCH_SIZE = 100  # flush after this many visits…
+    VISIT_BUFFER_FLUSH_MS = 2000  # …or after this many milliseconds
+
+    # Rendered-page cache (see app/cache.py)
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_MAX_ENTRIES = 256  # LRU bound
+    PAGE_CACHE_TTL = 300  # seconds — also refreshes time-dependent pages
+    CONTENT_VERSION_TTL = 2.0  # seconds between cross-worker version checks
+    # Part of every ETag so a deploy invalidates validators (Render sets this)
+    RELEASE_ID = os.environ.get("RENDER_GIT_COMMIT", "")
+
+    # Split sitemap.xml into an index + shards above this many URLs
+    SITEMAP_MAX_URLS = 50_000
+
+    # Email outbox (see app/outbox.py)
+    # "thread" = dispatcher thread per web process, "inline" = deliver in the
+    # request, "external" = only queue (run `flask outbox-worker` separately)
+    OUTBOX_MODE = os.environ.get("OUTBOX_MODE", "thread")
+    OUTBOX_POLL_SECONDS = 30  # also woken immediately after each contact
+    OUTBOX_LEASE_SECONDS = 120  # a claimed row is retried after this
+    OUTBOX_MAX_ATTEMPTS = 6  # then the row is marked dead
+    OUTBOX_BACKOFF_SECONDS = 30  # doubled after every failed attempt…
+    OUTBOX_BACKOFF_MAX_SECONDS = 3600  # …up to this
+
+    # Request timing: Server-Timing header + admin Performance tab (app/perf.py)
+    PERF_METRICS_ENABLED = True
+    SERVER_TIMING_HEADER = True
+    SLOW_QUERY_MS = 250  # log statements slower than this; 0 disables
+
+    # Template bytecode cache + startup warm-up (see app/templating.py)
+    TEMPLATE_BYTECODE_CACHE = True
+    TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")  # None = temp dir
+    TEMPLATE_WARMUP = True  # compile every template in create_app
+
+    # Content-hashed static assets (see app/assets.py; `flask build-assets`)
+    ASSET_PIPELINE = True  # use static/dist/manifest.json when it exists
+    ASSET_MAX_AGE = 31536000  # one year — hashed names never change content
+
+    # Responsive image variants (see app/images.py; `flask optimize-images`)
+    IMAGE_VARIANT_WIDTHS = (96, 192, 384, 768, 1280)
+    IMAGE_WEBP_QUALITY = 80
+
+    # Full-text search (see app/search.py; `flask build-search-index`)
+    SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH")  # None = instance/
+    SEARCH_INDEX_PERSIST = True  # reload the index from disk instead of rebuilding
+    SEARCH_RESULTS_LIMIT = 20
+
+    # Keyset pagination page sizes (see app/pagination.py)
+    BLOG_PAGE_SIZE = 12
+    ADMIN_PAGE_SIZE = 25
+
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -72,6 +126,12 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False  # Disable CSRF for test POST requests
     SERVER_NAME = "localhost"  # Required for url_for in tests
     RATELIMIT_ENABLED = False  # Disable rate limiting during tests
+    VISIT_BUFFER_ASYNC = False  # Write visits inline so tests can assert on them
+    OUTBOX_MODE = "inline"  # Deliver queued email inline, no dispatcher thread
+    TEMPLATE_BYTECODE_CACHE = False  # Keep test runs off the shared disk cache
+    TEMPLATE_WARMUP = False
+    ASSET_PIPELINE = False  # ignore any locally built manifest
+    SEARCH_INDEX_PERSIST = False  # index lives in memory only
 
 
 config = {
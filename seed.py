@@ -6,7 +6,7 @@ Usage
 -----
     python seed.py                      # seed (skips if data exists)
     python seed.py --force              # drop all tables then re-seed
-    python seed.py --upgrade-schema     # add new _ar columns to existing DB
+    python seed.py --upgrade-schema     # add new columns to existing DB
     python seed.py --inject blog    data/new_post.json      # inject one record
     python seed.py --inject experience  data/new_exp.json
     python seed.py --inject project     data/new_proj.json
@@ -46,6 +46,7 @@ from app.models import (
     Experience,
     ImpactCard,
     LanguageItem,
+    PageVisit,
     Project,
     SiteConfig,
     SkillCluster,
@@ -1021,11 +1022,15 @@ _AR_SCHEMA_MIGRATIONS = [
     ("impact_cards", "description_ar", "TEXT"),
     ("skill_clusters", "title_ar", "TEXT"),
     ("skill_clusters", "tags_ar", "TEXT"),
+    # User-agent codes (backfill with: flask --app run classify-visits)
+    ("page_visits", "browser", "SMALLINT"),
+    ("page_visits", "os", "SMALLINT"),
+    ("page_visits", "device", "SMALLINT"),
 ]
 
 
 def upgrade_schema():
-    """Add all ``_ar`` columns to an existing database (idempotent).
+    """Add new columns and indexes to an existing database (idempotent).
 
     Safe to run on a live SQLite or PostgreSQL database.  Uses
     ``ADD COLUMN IF NOT EXISTS`` (PostgreSQL) or catches the duplicate-column
@@ -1057,6 +1062,11 @@ def upgrade_schema():
                         print(f"  ✓ {table}.{column} (already exists)")
                     else:
                         raise
+            # Indexes added to existing tables (create_all only builds them
+            # together with a new table)
+            for table in (BlogPost.__table__, PageVisit.__table__):
+                for index in sorted(table.indexes, key=lambda ix: ix.name):
+                    index.create(conn, checkfirst=True)
             conn.commit()
     print("Schema upgrade complete.")
 
@@ -12,6 +12,7 @@ os.environ.setdefault("ADMIN_PASSWORD", "test-password-123")
 
 from app import create_app
 from app import db as _db
+from app.cache import reset_caches
 from app.models import (
     BlogPost,
     Experience,
@@ -23,6 +24,7 @@ from app.models import (
     SiteConfig,
     SkillCluster,
 )
+from app.perf import count_queries
 
 
 @pytest.fixture(scope="session")
@@ -37,6 +39,7 @@ def _setup_db(app):
     """Create all tables before each test, drop after."""
     with app.app_context():
         _db.create_all()
+        reset_caches()  # cached pages must not leak between fresh databases
         yield
         _db.session.remove()
         _db.drop_all()
@@ -54,6 +57,16 @@ def db(app):
     return _db
 
 
+@pytest.fixture()
+def query_budget():
+    """``with query_budget(n): ...`` fails the test if more than n SELECTs run.
+
+    The failure lists repeated statements, so an N+1 shows up as one
+    statement run once per row.
+    """
+    return count_queries
+
+
 @pytest.fixture()
 def auth_client(client, app):
     """Test client that is already logged in as admin."""
@@ -3,6 +3,7 @@ Tests for admin routes and security.
 """
 
 import json
+import re
 
 
 class TestAdminLogin:
@@ -46,6 +47,84 @@ class TestAdminDashboard:
         assert resp.status_code == 200
 
 
+class TestAdminLists:
+    """Dashboard tables render one page and lazy-load the rest as JSON."""
+
+    def _add_messages(self, db, count):
+        from app.models import Message
+
+        for i in range(count):
+            db.session.add(
+                Message(
+                    name=f"Sender {i:02d}",
+                    email="a@example.com",
+                    subject="Hi",
+                    message="Hello there",
+                )
+            )
+        db.session.commit()
+
+    def test_dashboard_renders_first_page_only(self, app, auth_client, db, monkeypatch):
+        monkeypatch.setitem(app.config, "ADMIN_PAGE_SIZE", 3)
+        self._add_messages(db, 5)
+        html = auth_client.get("/admin/").get_data(as_text=True)
+        assert html.count("Sender ") == 3
+        assert 'data-target="rows-messages"' in html
+        assert '<div class="stat-val">5</div>' in html
+
+    def test_json_pages_continue_from_cursor(self, app, auth_client, db, monkeypatch):
+        monkeypatch.setitem(app.config, "ADMIN_PAGE_SIZE", 2)
+        self._add_messages(db, 5)
+        seen = []
+        url = "/admin/api/lists/messages"
+        while url:
+            data = auth_client.get(url).get_json()
+            seen += re.findall(r"Sender \d\d", data["html"])
+            url = data["next"]
+        assert sorted(seen) == [f"Sender {i:02d}" for i in range(5)]
+
+    def test_null_sort_order_rows_are_paginated(
+        self, app, auth_client, db, monkeypatch
+    ):
+        from app.models import Project
+
+        monkeypatch.setitem(app.config, "ADMIN_PAGE_SIZE", 2)
+        orders = (None, 1, None, 2, 0)
+        db.session.add_all(
+            Project(title=f"P{i}", description="d") for i in range(len(orders))
+        )
+        db.session.commit()
+        for i, order in enumerate(orders):  # bypass the column default
+            Project.query.filter_by(title=f"P{i}").update({"sort_order": order})
+        db.session.commit()
+
+        assert auth_client.get("/admin/").status_code == 200  # NULL ends page 1
+        seen = []
+        url = "/admin/api/lists/projects"
+        while url:
+            data = auth_client.get(url).get_json()
+            seen += re.findall(r"\bP\d\b", data["html"])
+            url = data["next"]
+        assert seen == ["P0", "P2", "P4", "P1", "P3"]
+
+    def test_content_lists_available(
+        self, auth_client, sample_project, sample_blog_post
+    ):
+        for name in ("projects", "experiences", "blog-posts"):
+            resp = auth_client.get(f"/admin/api/lists/{name}")
+            assert resp.status_code == 200
+        assert (
+            "Test Project"
+            in auth_client.get("/admin/api/lists/projects").get_json()["html"]
+        )
+
+    def test_unknown_list_404(self, auth_client):
+        assert auth_client.get("/admin/api/lists/users").status_code == 404
+
+    def test_lists_require_auth(self, client):
+        assert client.get("/admin/api/lists/messages").status_code == 302
+
+
 class TestProjectCRUD:
     """Tests for project CRUD operations."""
 
@@ -230,6 +309,54 @@ class TestExperienceCRUD:
             assert "<strong>" in highlights[0]
             assert "<em>" in highlights[1]
 
+    def test_experience_overlong_highlight_is_rejected(self, auth_client, app, db):
+        """A highlight that would be truncated re-renders the form instead."""
+        resp = auth_client.post(
+            "/admin/experience/new",
+            data={
+                "role": "Too Long",
+                "company": "Co",
+                "date_range": "2024",
+                "highlights": "ok\n" + "x" * 501,
+            },
+        )
+        assert resp.status_code == 400
+        assert b"Highlight 2 is longer than 500 characters" in resp.data
+        with app.app_context():
+            from app.models import Experience
+
+            assert Experience.query.filter_by(role="Too Long").count() == 0
+
+    def test_rejected_highlights_keep_submitted_values(
+        self, auth_client, app, sample_experience
+    ):
+        """Only the bad highlight needs fixing after a 400."""
+        data = {
+            "role": "Renamed Role",
+            "company": "New Co",
+            "date_range": "2025 — Present",
+            "description": "Typed before the error",
+            "highlights": "kept <strong>point</strong>\n" + "x" * 501,
+        }
+        new = auth_client.post("/admin/experience/new", data=data)
+        edit = auth_client.post(
+            f"/admin/experience/{sample_experience.id}/edit", data=data
+        )
+        for resp, label in ((new, b"Create Experience"), (edit, b"Update Experience")):
+            html = resp.data
+            assert resp.status_code == 400
+            assert b'value="Renamed Role"' in html
+            assert b'value="New Co"' in html
+            assert b"Typed before the error" in html
+            assert b"kept &lt;strong&gt;point&lt;/strong&gt;" in html
+            assert b"x" * 501 in html
+            assert label in html
+        with app.app_context():
+            from app.models import Experience
+
+            stored = Experience.query.get(sample_experience.id)
+            assert stored.role == sample_experience.role
+
     def test_experience_delete(self, auth_client, sample_experience):
         resp = auth_client.post(
             f"/admin/experience/{sample_experience.id}/delete",
@@ -0,0 +1,377 @@
+"""
+Tests for visit ingestion, rollups and dashboard stats (app/analytics.py).
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app import db as _db
+from app.analytics import (
+    HyperLogLog,
+    VisitBuffer,
+    bounce_counts,
+    classify_visits,
+    compact_visits,
+    dashboard_stats,
+    unique_visitors,
+)
+from app.models import PageVisit, VisitorSketch, VisitRollup
+from app.utils import UA_BROWSERS, UA_DEVICES, UA_OSES
+from tests.test_cache import count_selects
+
+CHROME = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+def _visit(path="/"):
+    return {"path": path, "referrer": "", "user_agent": "", "ip_hash": "abc"}
+
+
+@pytest.fixture()
+def make_buffer(app, monkeypatch):
+    """Build a standalone VisitBuffer with config overrides.
+
+    The app's own buffer registration is restored after the test.
+    """
+    monkeypatch.setitem(app.extensions, "visit_buffer", app.extensions["visit_buffer"])
+    buffers = []
+
+    def _make(**overrides):
+        for key, value in overrides.items():
+            monkeypatch.setitem(app.config, key, value)
+        buffer = VisitBuffer(app)
+        buffers.append(buffer)
+        return buffer
+
+    yield _make
+    for buffer in buffers:
+        buffer.shutdown()
+
+
+class TestTrackPageVisit:
+    """The before_request hook should enqueue public GETs only."""
+
+    def test_public_page_records_visit(self, client):
+        client.get("/en/blog")
+        visit = PageVisit.query.one()
+        assert visit.path == "/blog"
+        assert visit.visited_at is not None
+
+    def test_user_agent_classified_at_ingest(self, client):
+        client.get("/en/", headers={"User-Agent": CHROME})
+        visit = PageVisit.query.one()
+        assert UA_BROWSERS[visit.browser] == "Chrome"
+        assert UA_OSES[visit.os] == "Windows"
+        assert UA_DEVICES[visit.device] == "Desktop"
+
+    def test_admin_and_seo_paths_not_recorded(self, client):
+        client.get("/admin/login")
+        client.get("/robots.txt")
+        assert PageVisit.query.count() == 0
+
+
+class TestVisitBuffer:
+    """Batching, backpressure and shutdown behaviour."""
+
+    def test_flush_uses_single_multi_row_insert(self, app, make_buffer):
+        buffer = make_buffer(VISIT_BUFFER_ASYNC=False, VISIT_BUFFER_BATCH_SIZE=50)
+        buffer.async_mode = True  # queue only — no inline writes, no thread
+        for i in range(5):
+            buffer.record(**_visit(f"/p{i}"))
+
+        inserts = []
+
+        def _count(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("INSERT"):
+                inserts.append(statement)
+
+        event.listen(_db.engine, "before_cursor_execute", _count)
+        try:
+            assert buffer.flush() == 5
+        finally:
+            event.remove(_db.engine, "before_cursor_execute", _count)
+
+        assert len(inserts) == 1
+        assert PageVisit.query.count() == 5
+
+    def test_shutdown_drains_queue(self, make_buffer):
+        buffer = make_buffer(VISIT_BUFFER_ASYNC=False)
+        buffer.async_mode = True
+        for _ in range(3):
+            buffer.record(**_visit())
+        buffer.shutdown()
+        assert PageVisit.query.count() == 3
+        assert buffer.stats()["queued"] == 0
+
+    def test_background_flusher_writes_batches(self, make_buffer):
+        buffer = make_buffer(
+            VISIT_BUFFER_ASYNC=True,
+            VISIT_BUFFER_BATCH_SIZE=2,
+            VISIT_BUFFER_FLUSH_MS=50,
+        )
+        buffer.record(**_visit())
+        buffer.record(**_visit())
+        deadline = time.monotonic() + 2
+        while buffer.stats()["flushed"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.stats()["flushed"] == 2
+
+    def test_full_queue_drops_instead_of_blocking(self, make_buffer, monkeypatch):
+        buffer = make_buffer(
+            VISIT_BUFFER_ASYNC=True,
+            VISIT_BUFFER_MAX_SIZE=2,
+            VISIT_BUFFER_BATCH_SIZE=1,
+            VISIT_BUFFER_FLUSH_MS=10,
+        )
+        writing = threading.Event()
+        release = threading.Event()
+        real_write = buffer._write
+
+        def _slow_write(rows):
+            writing.set()
+            release.wait(2)
+            real_write(rows)
+
+        monkeypatch.setattr(buffer, "_write", _slow_write)
+
+        assert buffer.record(**_visit()) is True
+        assert writing.wait(2)  # flusher is now stuck on the first row
+        assert buffer.record(**_visit()) is True
+        assert buffer.record(**_visit()) is True
+        assert buffer.record(**_visit()) is False  # queue full → dropped
+
+        release.set()
+        buffer.shutdown()
+        stats = buffer.stats()
+        assert stats["dropped"] == 1
+        assert stats["flushed"] == 3
+        assert PageVisit.query.count() == 3
+
+
+def _add_visits(db, day, visitors):
+    """Insert visits on *day*: ``visitors`` maps ip_hash → list of paths."""
+    at = datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc)
+    for ip_hash, paths in visitors.items():
+        for path in paths:
+            db.session.add(
+                PageVisit(
+                    path=path,
+                    referrer="https://google.com",
+                    user_agent=CHROME,
+                    ip_hash=ip_hash,
+                    country="en-US",
+                    visited_at=at,
+                )
+            )
+    db.session.commit()
+
+
+class TestHyperLogLog:
+    """Distinct-count sketch accuracy and merging."""
+
+    def test_small_counts_are_near_exact(self):
+        sketch = HyperLogLog()
+        for i in range(100):
+            sketch.add(f"visitor-{i}")
+            sketch.add(f"visitor-{i}")  # duplicates don't count
+        assert abs(sketch.count() - 100) <= 2
+
+    def test_large_count_within_error_bound(self):
+        sketch = HyperLogLog()
+        for i in range(50_000):
+            sketch.add(str(i))
+        # Standard error is 1.04 / sqrt(4096) ≈ 1.6 %; allow ~3σ
+        assert abs(sketch.count() - 50_000) / 50_000 < 0.05
+
+    def test_merge_is_union(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        for i in range(300):
+            a.add(str(i))
+        for i in range(200, 500):
+            b.add(str(i))
+        merged = HyperLogLog.from_bytes(a.to_bytes()).merge(b)
+        assert abs(merged.count() - 500) <= 10
+
+    def test_sparse_sketch_serialises_small(self):
+        sketch = HyperLogLog()
+        sketch.add("one visitor")
+        data = sketch.to_bytes()
+        assert len(data) < 100
+        assert HyperLogLog.from_bytes(data).registers == sketch.registers
+
+    def test_merge_rejects_mismatched_precision(self):
+        with pytest.raises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+
+
+class TestCompaction:
+    """Complete days of raw visits are rolled up once."""
+
+    def test_compacts_past_days_only(self, db):
+        today = datetime.now(timezone.utc).date()
+        _add_visits(db, today - timedelta(days=2), {"a": ["/", "/blog"], "b": ["/"]})
+        _add_visits(db, today, {"c": ["/"]})
+
+        assert compact_visits() == 1
+        rollups = {
+            (r.dimension, r.value): r.count
+            for r in VisitRollup.query.filter_by(day=today - timedelta(days=2))
+        }
+        assert rollups[("total", "")] == 3
+        assert rollups[("path", "/")] == 2
+        assert rollups[("referrer", "https://google.com")] == 3
+        assert rollups[("browser", "Chrome")] == 3
+        assert rollups[("visitors", "")] == 2
+        assert rollups[("bounces", "")] == 1
+        # One site-wide sketch plus one per path
+        assert {s.scope for s in VisitorSketch.query} == {"", "/", "/blog"}
+        assert VisitRollup.query.filter_by(day=today).count() == 0
+
+    def test_compaction_is_idempotent(self, db):
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        _add_visits(db, yesterday, {"a": ["/"]})
+        assert compact_visits() == 1
+        assert compact_visits() == 0
+        assert VisitRollup.query.filter_by(dimension="total").one().count == 1
+
+    def test_late_flushed_visits_are_recompacted(self, db):
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        _add_visits(db, yesterday, {"a": ["/"]})
+        assert compact_visits() == 1
+        _add_visits(db, yesterday, {"b": ["/blog"]})  # buffer flushed late
+        assert compact_visits() == 1
+        rollups = {
+            (r.dimension, r.value): r.count
+            for r in VisitRollup.query.filter_by(day=yesterday)
+        }
+        assert rollups[("total", "")] == 2
+        assert rollups[("path", "/blog")] == 1
+        assert compact_visits() == 0
+
+    def test_concurrent_compaction_is_tolerated(self, db, monkeypatch):
+        import app.analytics as analytics
+
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        _add_visits(db, yesterday, {"a": ["/"]})
+        compact_visits()
+        _add_visits(db, yesterday, {"b": ["/"]})
+        # Another worker's rows survive our delete and collide with our insert
+        real_delete = analytics.delete
+        monkeypatch.setattr(
+            analytics, "delete", lambda model: real_delete(model).where(False)
+        )
+        assert compact_visits() == 1  # no IntegrityError escapes
+        assert VisitRollup.query.filter_by(dimension="total").one().count == 1
+
+    def test_classify_visits_backfills_codes(self, db):
+        _add_visits(db, datetime.now(timezone.utc).date(), {"a": ["/", "/blog"]})
+        db.session.add(PageVisit(path="/", user_agent=""))
+        db.session.commit()
+        assert PageVisit.query.filter(PageVisit.browser.is_(None)).count() == 3
+
+        assert classify_visits() == 3
+        assert classify_visits() == 0
+        codes = {(v.user_agent, v.browser) for v in PageVisit.query}
+        assert codes == {(CHROME, UA_BROWSERS.index("Chrome")), ("", 0)}
+
+    def test_cli_command(self, app, db):
+        _add_visits(
+            db, datetime.now(timezone.utc).date() - timedelta(days=1), {"a": ["/"]}
+        )
+        result = app.test_cli_runner().invoke(args=["compact-analytics"])
+        assert "Compacted 1 day(s)" in result.output
+
+
+class TestVisitorEstimates:
+    """Unique visitors and bounces over date ranges."""
+
+    def test_unique_visitors_over_range(self, db):
+        today = datetime.now(timezone.utc).date()
+        _add_visits(db, today - timedelta(days=3), {"a": ["/"], "b": ["/blog"]})
+        _add_visits(db, today - timedelta(days=2), {"a": ["/"], "c": ["/"]})
+        _add_visits(db, today, {"d": ["/"]})
+        compact_visits()
+
+        assert unique_visitors() == 4
+        assert (
+            unique_visitors(today - timedelta(days=3), today - timedelta(days=2)) == 3
+        )
+        assert unique_visitors(start=today - timedelta(days=2)) == 3
+        assert unique_visitors(path="/") == 3
+        assert unique_visitors(path="/blog") == 1
+        assert unique_visitors(end=today - timedelta(days=1), path="/") == 2
+
+    def test_bounce_counts_per_day(self, db):
+        today = datetime.now(timezone.utc).date()
+        _add_visits(db, today - timedelta(days=1), {"a": ["/", "/blog"], "b": ["/"]})
+        _add_visits(db, today, {"a": ["/"], "c": ["/", "/blog", "/"]})
+        compact_visits()
+
+        assert bounce_counts() == (4, 2)
+        assert bounce_counts(start=today) == (2, 1)
+        assert bounce_counts(end=today - timedelta(days=1)) == (2, 1)
+
+    def test_today_bounces_counted_in_sql(self, db):
+        _add_visits(db, datetime.now(timezone.utc).date(), {"a": ["/"], "b": ["/"]})
+        with count_selects() as selects:
+            bounce_counts()
+        assert len(selects) == 3  # two rollup sums + one aggregate over today
+        assert any("GROUP BY page_visits.ip_hash" in s for s in selects)
+
+
+class TestDashboardStats:
+    """Dashboard figures combine rollups with today's raw rows."""
+
+    def test_totals_span_rollups_and_today(self, db):
+        today = datetime.now(timezone.utc).date()
+        _add_visits(db, today - timedelta(days=3), {"a": ["/", "/blog"], "b": ["/"]})
+        _add_visits(db, today, {"a": ["/"], "c": ["/blog"]})
+
+        stats = dashboard_stats()
+        assert stats["total_visits"] == 5
+        assert stats["today_visits"] == 2
+        assert stats["unique_visitors"] == 3
+        assert stats["top_pages"][0].path == "/"
+        assert stats["top_pages"][0].count == 3
+        assert stats["top_referrers"][0].count == 5
+        assert stats["daily_counts"][-1] == 2
+        assert stats["daily_counts"][-4] == 3
+        assert stats["top_browsers"] == [("Chrome", 5)]
+        # Per-day visitors: a (2 pages), b, a, c → 3 of 4 bounced
+        assert stats["bounce_rate"] == 75.0
+
+    def test_dashboard_does_not_scan_old_raw_rows(self, db):
+        today = datetime.now(timezone.utc).date()
+        for offset in range(1, 6):
+            _add_visits(db, today - timedelta(days=offset), {"a": ["/"]})
+        compact_visits()
+        with count_selects() as selects:
+            dashboard_stats()
+        raw_scans = [
+            s for s in selects if "FROM page_visits" in s and "visited_at >=" not in s
+        ]
+        # Only the "recent visits" list (LIMIT 20) reads raw rows unfiltered
+        assert len(raw_scans) == 1
+
+    def test_browser_stats_do_not_load_user_agents(self, db):
+        _add_visits(db, datetime.now(timezone.utc).date(), {"a": ["/", "/blog"]})
+        classify_visits()
+        with count_selects() as selects:
+            stats = dashboard_stats()
+        assert stats["top_os"] == [("Windows", 2)]
+        assert stats["device_breakdown"] == [("Desktop", 2)]
+        assert not any("GROUP BY page_visits.user_agent" in s for s in selects)
+        assert not any(s.startswith("SELECT page_visits.user_agent") for s in selects)
+
+    def test_purge_keeps_rolled_up_totals(self, auth_client, db):
+        old_day = datetime.now(timezone.utc).date() - timedelta(days=200)
+        _add_visits(db, old_day, {"a": ["/", "/blog"]})
+        auth_client.post("/admin/purge-analytics", data={"retention_days": "90"})
+        assert PageVisit.query.count() == 0
+        assert dashboard_stats()["total_visits"] == 2
@@ -0,0 +1,111 @@
+"""
+Tests for the hashed static asset pipeline (app/assets.py).
+"""
+
+import gzip
+import os
+import shutil
+
+import pytest
+
+from app.assets import asset_pipeline, build_assets, minify_css, minify_js
+
+
+@pytest.fixture()
+def built_static(app, tmp_path, monkeypatch):
+    """Build a copy of the real static folder and serve it through the app."""
+    static = tmp_path / "static"
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns("dist"))
+    monkeypatch.setattr(app, "static_folder", str(static))
+    manifest = build_assets(str(static))
+    asset_pipeline.load(str(static))
+    yield static, manifest
+    asset_pipeline.clear()
+
+
+class TestMinifiers:
+    """Conservative CSS / JS minification."""
+
+    def test_css_drops_comments_and_whitespace(self):
+        css = "/* header */\na > b ,\n.c {\n  color : red ;\n  margin: 0 auto;\n}\n"
+        assert minify_css(css) == "a>b,.c{color :red;margin:0 auto}"
+
+    def test_css_keeps_strings_and_descendant_pseudo(self):
+        css = ".q::before { content: '  /* not a comment */  '; }\ndiv :hover { x: y }"
+        assert minify_css(css) == (
+            ".q::before{content:'  /* not a comment */  '}div :hover{x:y}"
+        )
+
+    def test_js_keeps_template_literals_verbatim(self):
+        js = "// note\nfunction f() {\n    /* block\n       comment */\n    return `a\n    b`;\n}\n"
+        assert minify_js(js) == "function f() {\nreturn `a\n    b`;\n}\n"
+
+
+class TestBuild:
+    """build-assets output."""
+
+    def test_manifest_maps_sources_to_hashed_files(self, built_static):
+        static, manifest = built_static
+        built = manifest["css/style.css"]
+        assert built.startswith("dist/css/style.") and built.endswith(".css")
+        assert (static / built).stat().st_size < (
+            static / "css/style.css"
+        ).stat().st_size
+        assert (
+            gzip.decompress((static / f"{built}.gz").read_bytes())
+            == (static / built).read_bytes()
+        )
+        assert not any(name.startswith("uploads/") for name in manifest)
+
+    def test_hash_changes_with_content(self, built_static):
+        static, manifest = built_static
+        with open(static / "js/i18n.js", "a") as fh:
+            fh.write("\nconsole.log('changed');\n")
+        rebuilt = build_assets(str(static))
+        assert rebuilt["js/i18n.js"] != manifest["js/i18n.js"]
+        assert os.path.exists(static / manifest["js/i18n.js"])  # old build kept
+
+
+class TestServing:
+    """Hashed URLs, immutable caching and encoding negotiation."""
+
+    def test_templates_link_hashed_files(self, client, built_static):
+        _, manifest = built_static
+        html = client.get("/en/").data.decode()
+        assert f"/static/{manifest['css/style.css']}" in html
+        assert f"/static/{manifest['js/main.js']}" in html
+        assert "v=20260302" not in html
+
+    def test_hashed_file_is_immutable_and_gzipped(self, client, built_static):
+        static, manifest = built_static
+        resp = client.get(
+            f"/static/{manifest['css/style.css']}",
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.mimetype == "text/css"
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert "max-age=31536000" in resp.headers["Cache-Control"]
+        assert "Accept-Encoding" in resp.headers["Vary"]
+        assert (
+            gzip.decompress(resp.data)
+            == (static / manifest["css/style.css"]).read_bytes()
+        )
+
+    def test_identity_when_compression_not_accepted(self, client, built_static):
+        static, manifest = built_static
+        resp = client.get(
+            f"/static/{manifest['js/main.js']}", headers={"Accept-Encoding": "identity"}
+        )
+        assert "Content-Encoding" not in resp.headers
+        assert resp.data == (static / manifest["js/main.js"]).read_bytes()
+
+    def test_unhashed_files_keep_default_caching(self, client, built_static):
+        resp = client.get("/static/css/style.css")
+        assert resp.status_code == 200
+        assert "immutable" not in resp.headers.get("Cache-Control", "")
+
+    def test_no_manifest_leaves_urls_alone(self, client):
+        html = client.get("/en/").data.decode()
+        assert "/static/css/style.css" in html
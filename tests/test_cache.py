@@ -0,0 +1,316 @@
+"""
+Tests for the content-versioned page cache (app/cache.py).
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from flask import template_rendered
+from sqlalchemy import event, update
+
+from app import db as _db
+from app.cache import (
+    PageCache,
+    content_version,
+    get_homepage_snapshot,
+    page_cache,
+    site_config,
+)
+from app.models import CacheVersion, Project, SiteConfig
+from app.perf import count_queries
+
+
+@contextmanager
+def count_selects():
+    """Collect SELECT statements issued on the engine inside the block."""
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(_db.engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(_db.engine, "before_cursor_execute", _record)
+
+
+class TestPageCache:
+    """Rendered pages are served from memory until content changes."""
+
+    def test_repeat_homepage_hit_runs_no_queries(self, client, sample_project):
+        first = client.get("/en/")
+        with count_selects() as selects:
+            second = client.get("/en/")
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert selects == []
+        assert page_cache.stats()["hits"] == 1
+
+    def test_cached_response_keeps_security_headers(self, client):
+        client.get("/en/")
+        resp = client.get("/en/")
+        assert "Content-Security-Policy" in resp.headers
+
+    def test_locales_cached_separately(self, client):
+        en = client.get("/en/")
+        ar = client.get("/ar/")
+        assert b'<html lang="ar" dir="rtl">' in ar.data
+        assert en.data != ar.data
+        assert page_cache.stats()["entries"] == 2
+
+    def test_query_string_variants_cached_separately(self, client, sample_blog_post):
+        client.get("/en/blog")
+        resp = client.get("/en/blog?category=AI")
+        assert b'data-switch-url="/ar/blog?category=AI"' in resp.data
+
+    def test_not_found_is_not_cached(self, client):
+        assert client.get("/en/project/9999").status_code == 404
+        assert page_cache.stats()["entries"] == 0
+
+    def test_admin_edit_invalidates_cached_page(self, auth_client, sample_project):
+        assert b"Test Project" in auth_client.get("/en/").data
+        auth_client.post(
+            f"/admin/project/{sample_project.id}/edit",
+            data={"title": "Renamed Project", "description": "Updated."},
+        )
+        resp = auth_client.get("/en/")
+        assert b"Renamed Project" in resp.data
+        assert b"Test Project" not in resp.data
+
+    def test_site_config_set_bumps_version(self, db):
+        before = content_version.current()
+        SiteConfig.set("hero_title", "New headline")
+        db.session.commit()
+        assert content_version.current() > before
+
+    def test_non_content_writes_keep_version(self, client, db):
+        before = content_version.current()
+        client.post(
+            "/contact",
+            json={
+                "name": "Test User",
+                "email": "test@example.com",
+                "subject": "Hi",
+                "message": "A message that is long enough.",
+            },
+        )
+        assert content_version.current() == before
+
+    def test_rollback_does_not_bump_version(self, db):
+        before = content_version.current()
+        db.session.add(Project(title="Discarded", description="x"))
+        db.session.flush()
+        db.session.rollback()
+        assert content_version.current() == before
+
+    def test_change_from_other_worker_seen_after_ttl(
+        self, app, client, db, sample_project, monkeypatch
+    ):
+        client.get("/en/")
+        # Simulate another process committing a new stamp
+        db.session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == "content")
+            .values(version=CacheVersion.version + 1)
+        )
+        db.session.commit()
+        monkeypatch.setitem(app.config, "CONTENT_VERSION_TTL", 0)
+        client.get("/en/")
+        assert page_cache.stats()["misses"] == 2
+
+
+class TestPageCacheStore:
+    """LRU / TTL bookkeeping of the PageCache store itself."""
+
+    def test_lru_evicts_oldest(self):
+        cache = PageCache()
+        cache.max_entries = 2
+        cache.set("a", 1, "A")
+        cache.set("b", 1, "B")
+        cache.get("a", 1)  # refresh "a"
+        cache.set("c", 1, "C")
+        assert cache.get("b", 1) is None
+        assert cache.get("a", 1) == "A"
+
+    def test_ttl_expiry(self):
+        cache = PageCache()
+        cache.ttl = -1
+        cache.set("a", 1, "A")
+        assert cache.get("a", 1) is None
+
+    def test_version_mismatch_is_miss(self):
+        cache = PageCache()
+        cache.set("a", 1, "A")
+        assert cache.get("a", 2) is None
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["entries"] == 0
+
+
+class TestHomepageSnapshot:
+    """The homepage loads its content once per content version."""
+
+    def test_homepage_query_count(self, client, sample_project, monkeypatch):
+        monkeypatch.setattr(page_cache, "enabled", False)
+        with count_selects() as cold:
+            client.get("/en/")
+        with count_selects() as warm:
+            client.get("/ar/")
+        # Seven content queries: no separate featured-projects query, and the
+        # version stamp is already known from the fixture's own commit
+        assert len(cold) == 7
+        assert warm == []
+
+    def test_snapshot_rebuilt_after_content_change(self, client, db, sample_project):
+        snapshot = get_homepage_snapshot()
+        assert get_homepage_snapshot() is snapshot
+        project = db.session.get(Project, sample_project.id)
+        project.title = "Retitled"
+        db.session.commit()
+        rebuilt = get_homepage_snapshot()
+        assert rebuilt is not snapshot
+        assert [p.title for p in rebuilt.all_projects] == ["Retitled"]
+
+    def test_featured_projects_derived_from_all_projects(self, db, sample_project):
+        db.session.add(Project(title="Side", description="x", featured=False))
+        db.session.commit()
+        snapshot = get_homepage_snapshot()
+        assert [p.title for p in snapshot.featured_projects] == ["Test Project"]
+        assert len(snapshot.all_projects) == 2
+
+
+class TestSiteConfigCache:
+    """Site config reads come from memory; saves write only changed keys."""
+
+    def _seed(self, db):
+        db.session.add_all(
+            [
+                SiteConfig(key="hero_title", value="Hello", group="hero"),
+                SiteConfig(key="hero_subtitle", value="World", group="hero"),
+                SiteConfig(key="about_years", value="4", group="about"),
+            ]
+        )
+        db.session.commit()
+
+    def test_reads_share_one_load(self, db):
+        self._seed(db)
+        with count_selects() as selects:
+            assert SiteConfig.get("hero_title") == "Hello"
+            assert SiteConfig.get("missing", "fallback") == "fallback"
+            assert SiteConfig.get_many(["hero_title", "about_years", "nope"]) == {
+                "hero_title": "Hello",
+                "about_years": "4",
+                "nope": "",
+            }
+            assert SiteConfig.get_group("hero") == {
+                "hero_title": "Hello",
+                "hero_subtitle": "World",
+            }
+        assert len(selects) == 1
+
+    def test_cached_values_are_read_only(self, db):
+        self._seed(db)
+        with pytest.raises(TypeError):
+            site_config.values()["hero_title"] = "x"
+
+    def test_set_many_writes_changed_keys_in_one_statement(self, db):
+        self._seed(db)
+        before = content_version.current()
+        with count_queries(selects_only=False) as queries:
+            changed = SiteConfig.set_many(
+                {"hero_title": "Hello", "hero_subtitle": "There", "new_key": "1"}
+            )
+        writes = [s for s in queries.statements if s.startswith("INSERT INTO site")]
+        assert sorted(changed) == ["hero_subtitle", "new_key"]
+        assert len(writes) == 1
+        assert "ON CONFLICT" in writes[0]
+        db.session.commit()
+        assert content_version.current() > before
+        assert SiteConfig.get_many(["hero_subtitle", "new_key"]) == {
+            "hero_subtitle": "There",
+            "new_key": "1",
+        }
+        # Existing rows keep their label / group
+        assert SiteConfig.get_group("hero")["hero_subtitle"] == "There"
+
+    def test_unchanged_save_writes_nothing(self, db):
+        self._seed(db)
+        before = content_version.current()
+        assert SiteConfig.set_many({"hero_title": "Hello"}) == []
+        db.session.commit()
+        assert content_version.current() == before
+
+    def test_admin_save_reports_changed_fields(self, auth_client, db):
+        self._seed(db)
+        resp = auth_client.post(
+            "/admin/site-config",
+            data={"cfg_hero_title": "Hello", "cfg_about_years": "5"},
+            follow_redirects=True,
+        )
+        assert b"Site configuration updated (1 fields changed)" in resp.data
+        assert SiteConfig.get("about_years") == "5"
+
+
+class TestConditionalGet:
+    """ETag / Last-Modified validators and early 304 responses."""
+
+    def test_pages_carry_validators(self, client):
+        resp = client.get("/en/")
+        assert resp.headers["ETag"].startswith('"')
+        assert "Last-Modified" in resp.headers
+        assert "no-cache" in resp.headers["Cache-Control"]
+
+    def test_if_none_match_returns_304_without_rendering(
+        self, app, client, sample_project
+    ):
+        etag = client.get("/en/").headers["ETag"]
+        rendered = []
+
+        def _on_render(sender, template, context, **extra):
+            rendered.append(template.name)
+
+        template_rendered.connect(_on_render, app)
+        try:
+            with count_selects() as selects:
+                resp = client.get("/en/", headers={"If-None-Match": etag})
+        finally:
+            template_rendered.disconnect(_on_render, app)
+        assert resp.status_code == 304
+        assert resp.data == b""
+        assert resp.headers["ETag"] == etag
+        assert "Content-Security-Policy" in resp.headers
+        assert rendered == []
+        assert selects == []
+
+    def test_if_modified_since_returns_304(self, client):
+        last_modified = client.get("/en/blog").headers["Last-Modified"]
+        resp = client.get("/en/blog", headers={"If-Modified-Since": last_modified})
+        assert resp.status_code == 304
+
+    def test_content_change_invalidates_etag(self, auth_client, sample_project):
+        etag = auth_client.get(f"/en/project/{sample_project.id}").headers["ETag"]
+        auth_client.post(
+            f"/admin/project/{sample_project.id}/edit",
+            data={"title": "Renamed Project", "description": "Updated."},
+        )
+        resp = auth_client.get(
+            f"/en/project/{sample_project.id}", headers={"If-None-Match": etag}
+        )
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+    def test_etag_differs_per_locale(self, client):
+        assert client.get("/en/").headers["ETag"] != client.get("/ar/").headers["ETag"]
+
+    def test_feeds_and_sitemap_revalidate(self, client, sample_blog_post):
+        for url in ("/feed.xml", "/ar/feed.xml", "/sitemap.xml"):
+            etag = client.get(url).headers["ETag"]
+            resp = client.get(url, headers={"If-None-Match": etag})
+            assert resp.status_code == 304, url
+
+    def test_missing_page_has_no_validators(self, client):
+        resp = client.get("/en/project/9999")
+        assert resp.status_code == 404
+        assert "ETag" not in resp.headers
@@ -1,15 +1,23 @@
 """Tests for locale and translation infrastructure."""
 
 import json
+import os
+import shutil
 from pathlib import Path
 
+import pytest
+
+import app.i18n as i18n
 from app.i18n import (
     TRANSLATIONS_DIR,
     _load_raw_translations,
+    compile_catalogs,
     get_locale_meta,
+    get_translator,
     is_supported_locale,
     load_translations,
     normalize_locale,
+    reload_catalogs_if_changed,
     resolve_locale,
     translate,
 )
@@ -136,6 +144,83 @@ class TestTranslations:
         assert ar_val == "المدونة"
 
 
+@pytest.fixture()
+def catalog_dir(tmp_path):
+    """Point the catalogs at an editable copy; recompile the real ones after."""
+    for name in ("en.json", "ar.json"):
+        shutil.copy(TRANSLATIONS_DIR / name, tmp_path / name)
+    original = i18n.TRANSLATIONS_DIR
+    i18n.TRANSLATIONS_DIR = tmp_path
+    compile_catalogs()
+    yield tmp_path
+    i18n.TRANSLATIONS_DIR = original
+    compile_catalogs()
+
+
+def _rewrite(path, **changes):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data.update(changes)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestCompiledCatalogs:
+    """Catalogs compiled at startup and the per-locale bound ``t``."""
+
+    def test_catalogs_are_read_only_and_merged(self):
+        catalogs = compile_catalogs()
+        assert set(catalogs) == {"en", "ar"}
+        assert catalogs["ar"]["nav.blog"] == "المدونة"
+        with pytest.raises(TypeError):
+            catalogs["en"]["nav.blog"] = "x"
+
+    def test_bound_translator_matches_translate(self, app):
+        with app.test_request_context("/ar/"):
+            t = get_translator("ar")
+            for key in ("nav.blog", "missing.key"):
+                assert t(key) == translate(key, locale="ar")
+            assert t("missing.key", default="fb") == "fb"
+            assert t("nav.blog", locale="en") == "Blog"
+
+    def test_templates_get_bound_translator(self, client, monkeypatch):
+        calls = {"count": 0}
+        original = i18n.get_current_locale
+
+        def counting():
+            calls["count"] += 1
+            return original()
+
+        monkeypatch.setattr(i18n, "get_current_locale", counting)
+        resp = client.get("/ar/")
+        assert "المدونة" in resp.data.decode("utf-8")
+        assert calls["count"] == 0  # no per-call locale lookups
+
+    def test_reload_picks_up_edited_file(self, catalog_dir):
+        assert reload_catalogs_if_changed() is False
+        _rewrite(catalog_dir / "en.json", **{"nav.blog": "Journal"})
+        assert reload_catalogs_if_changed() is True
+        assert get_translator("en")("nav.blog") == "Journal"
+        # Arabic keeps its own value; English fallback is rebuilt too
+        assert get_translator("ar")("nav.blog") == "المدونة"
+
+
+class TestBoundTranslatorParity:
+    """The bound ``t`` returns exactly what ``translate()`` does."""
+
+    def test_matches_translate_for_every_locale(self, app, catalog_dir):
+        _rewrite(catalog_dir / "en.json", **{"test.english_only": "Only English"})
+        reload_catalogs_if_changed()
+        keys = [*load_translations("en"), "no.such.key"]
+        for locale in ("en", "ar"):
+            with app.test_request_context(f"/{locale}/"):
+                i18n.g.locale = locale
+                t = get_translator(locale)
+                assert [t(key) for key in keys] == [translate(key) for key in keys]
+                assert t("test.english_only") == "Only English"  # fallback
+                assert t("no.such.key") == "no.such.key"
+
+
 class TestSwitchLocaleUrl:
     """Tests for build_switch_locale_url within route context."""
 
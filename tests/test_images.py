@@ -0,0 +1,152 @@
+"""
+Tests for responsive image variants (app/images.py).
+"""
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.images import generate_variants, optimize_folder, picture, strip_metadata
+
+
+def _png(path, size=(800, 400)):
+    Image.new("RGBA", size, (200, 40, 40, 255)).save(path, "PNG")
+    return str(path)
+
+
+def _jpeg_with_exif(path, size=(600, 300)):
+    exif = Image.Exif()
+    exif[0x010F] = "SpyCam"  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+    Image.new("RGB", size, (10, 120, 200)).save(path, "JPEG", exif=exif)
+    return str(path)
+
+
+@pytest.fixture()
+def static_dir(app, tmp_path, monkeypatch):
+    """An empty static folder served by the app."""
+    static = tmp_path / "static"
+    (static / "images").mkdir(parents=True)
+    monkeypatch.setattr(app, "static_folder", str(static))
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(static / "uploads"))
+    return static
+
+
+class TestGenerateVariants:
+    """Resized and WebP copies with a JSON record."""
+
+    def test_widths_narrower_than_source_plus_full_size(self, app, tmp_path):
+        with app.app_context():
+            record = generate_variants(_png(tmp_path / "a.png"), widths=(96, 384, 1280))
+        widths = sorted({v["width"] for v in record["variants"]})
+        assert widths == [96, 384, 800]
+        types = {v["type"] for v in record["variants"]}
+        assert types == {"image/png", "image/webp"}
+        small = next(v for v in record["variants"] if v["width"] == 96)
+        assert small["height"] == 48
+        with Image.open(tmp_path / small["file"]) as im:
+            assert im.size == (96, 48)
+        assert (tmp_path / "variants" / "a.json").exists()
+
+    def test_webp_is_smaller_for_photos(self, app, tmp_path):
+        path = tmp_path / "photo.png"
+        Image.effect_mandelbrot((640, 480), (-2, -1.5, 1, 1.5), 100).convert(
+            "RGB"
+        ).save(path, "PNG")
+        with app.app_context():
+            record = generate_variants(str(path), widths=(640,))
+        by_type = {v["type"]: v["bytes"] for v in record["variants"]}
+        assert by_type["image/webp"] < by_type["image/png"]
+
+    def test_exif_is_applied_then_stripped(self, app, tmp_path):
+        path = _jpeg_with_exif(tmp_path / "p.jpg")
+        with app.app_context():
+            record = generate_variants(path, widths=(150,))
+        jpeg = next(v for v in record["variants"] if v["type"] == "image/jpeg")
+        with Image.open(tmp_path / jpeg["file"]) as im:
+            assert im.size == (150, 300)  # rotated upright before resizing
+            assert not im.getexif()
+
+        strip_metadata(path)
+        with Image.open(path) as im:
+            assert im.size == (300, 600)
+            assert not im.getexif()
+
+    def test_optimize_folder_skips_up_to_date(self, app, tmp_path):
+        _png(tmp_path / "a.png")
+        with app.app_context():
+            assert len(optimize_folder(str(tmp_path))) == 1
+            assert optimize_folder(str(tmp_path)) == []
+            assert len(optimize_folder(str(tmp_path), force=True)) == 1
+
+
+class TestPictureHelper:
+    """Template markup for responsive images."""
+
+    def test_picture_lists_variants(self, app, static_dir):
+        _png(static_dir / "images" / "logo.png")
+        with app.test_request_context():
+            generate_variants(str(static_dir / "images" / "logo.png"), widths=(96, 192))
+            html = str(picture("images/logo.png", "Logo", "92px", class_="logo-img"))
+        assert html.startswith('<picture><source type="image/webp"')
+        assert "/static/images/variants/logo-96w.webp 96w" in html
+        assert "/static/images/variants/logo-192w.png 192w" in html
+        assert 'sizes="92px"' in html
+        assert 'width="800" height="400"' in html
+        assert 'class="logo-img"' in html
+        assert 'loading="lazy"' in html
+
+    def test_falls_back_to_plain_img(self, app, static_dir):
+        with app.test_request_context():
+            html = str(picture("images/missing.png", "x", loading="eager"))
+            external = str(picture("https://cdn.example.com/a.png", "y"))
+        assert html == (
+            '<img src="/static/images/missing.png" alt="x" loading="eager" '
+            'decoding="async">'
+        )
+        assert 'src="https://cdn.example.com/a.png"' in external
+
+    def test_homepage_uses_variants(self, client, static_dir):
+        _png(static_dir / "images" / "logo.png", size=(400, 400))
+        with client.application.app_context():
+            optimize_folder(str(static_dir / "images"))
+        html = client.get("/en/").data.decode()
+        assert 'href="/static/images/variants/logo-96w.png"' in html  # favicon
+        assert "logo-192w.webp 192w" in html
+
+    def test_bundled_profile_photo_gets_srcset(self, app, client, static_dir):
+        source = os.path.join(app.root_path, "static", "images", "profile.png")
+        assert os.path.isfile(source)  # the name the templates reference
+        with Image.open(source) as im:  # a small stand-in with the same shape
+            _png(
+                static_dir / "images" / "profile.png",
+                size=(im.width // 4, im.height // 4),
+            )
+        with client.application.app_context():
+            optimize_folder(str(static_dir / "images"))
+        html = client.get("/en/").data.decode()
+        assert "profile-96w.webp 96w" in html
+        assert 'srcset="/static/images/variants/profile-96w.png 96w' in html
+        assert "http://localhost/static/images/variants/profile-" in html  # og:image
+
+
+class TestUpload:
+    """Uploads are stripped and get variants."""
+
+    def test_upload_generates_variants(self, auth_client, static_dir):
+        buf = io.BytesIO()
+        Image.new("RGB", (500, 250), (0, 0, 0)).save(buf, "JPEG")
+        buf.seek(0)
+        resp = auth_client.post(
+            "/admin/upload-image",
+            data={"image": (buf, "photo.jpg", "image/jpeg")},
+            content_type="multipart/form-data",
+        )
+        assert resp.get_json()["success"]
+        name = os.path.basename(resp.get_json()["url"])
+        stem = os.path.splitext(name)[0]
+        variants = static_dir / "uploads" / "variants"
+        assert (variants / f"{stem}.json").exists()
+        assert (variants / f"{stem}-96w.webp").exists()
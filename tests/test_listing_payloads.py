@@ -0,0 +1,91 @@
+"""
+Benchmark: bytes read from the database by listing routes.
+
+Each route is requested twice — with the ``listing_options()`` projections
+and with them disabled (full rows, as before) — and every SELECT it issued
+is replayed to total the bytes of the values returned.  Run with ``-s`` to
+print the before/after table.
+"""
+
+import pytest
+from sqlalchemy.orm import undefer
+
+from app import db as _db
+from app.cache import page_cache, reset_caches
+from app.models import BlogPost, Project
+from tests.test_query_plans import capture_selects
+
+BODY = "<p>" + "Lorem ipsum dolor sit amet. " * 700 + "</p>"  # ~20 KB
+
+
+def fetched_bytes(captured) -> int:
+    """Total size of every value returned by the captured SELECTs."""
+    total = 0
+    connection = _db.session.connection()
+    for statement, parameters in captured:
+        for row in connection.exec_driver_sql(statement, parameters):
+            for value in row:
+                if isinstance(value, bytes):
+                    total += len(value)
+                elif value is not None:
+                    total += len(str(value).encode())
+    return total
+
+
+@pytest.fixture()
+def heavy_content(db):
+    for i in range(6):
+        db.session.add(
+            BlogPost(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                excerpt="Short excerpt.",
+                content=BODY,
+                content_ar=BODY,
+                category="AI",
+            )
+        )
+        db.session.add(
+            Project(
+                title=f"Project {i}",
+                short_description="Card summary.",
+                description="A short description.",
+                case_study=BODY,
+                challenge=BODY,
+                approach=BODY,
+                results=BODY,
+                has_case_study=True,
+            )
+        )
+    db.session.commit()
+
+
+def _measure(client, url) -> int:
+    reset_caches()
+    with capture_selects() as captured:
+        assert client.get(url).status_code == 200
+    return fetched_bytes(captured)
+
+
+@pytest.mark.parametrize(
+    "url, max_ratio",
+    [
+        ("/en/", 0.2),
+        ("/en/blog", 0.1),
+        ("/api/projects", 0.1),
+        ("/feed.xml", 0.1),
+        ("/sitemap.xml", 1.0),  # column-limited already
+    ],
+)
+def test_listing_routes_skip_heavy_columns(
+    client, heavy_content, monkeypatch, url, max_ratio
+):
+    monkeypatch.setattr(page_cache, "enabled", False)
+    after = _measure(client, url)
+
+    for model in (BlogPost, Project):
+        monkeypatch.setattr(
+            model, "listing_options", classmethod(lambda cls, *extra: undefer(cls.id))
+        )
+    before = _measure(client, url)
+    assert after <= before * max_ratio
@@ -0,0 +1,295 @@
+"""
+Tests for the pooled email transports (app/mailer.py).
+
+Both run against local stand-ins: a minimal threaded SMTP server that
+accepts any AUTH PLAIN login, and an HTTP/1.1 stub of the Resend API.
+"""
+
+import http.client
+import json
+import socketserver
+import threading
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.mailer import KeepAliveClient, SMTPPool, close_transports, transport_stats
+from app.utils import send_notification_email
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost ESMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            server.commands.append(verb)
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif verb == "AUTH":
+                server.logins += 1
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data)
+                server.messages.append(b"".join(lines))
+                self.reply("250 Queued")
+                if server.drop_after_message:
+                    return
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.connections = 0
+        self.logins = 0
+        self.commands = []
+        self.messages = []
+        self.drop_after_message = False
+
+
+class _ResendStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        server.ports.add(self.client_address[1])
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append((self.path, self.headers["Authorization"], body))
+        server.idempotency_keys.append(self.headers["Idempotency-Key"])
+        status, payload = server.responses.pop(0) if server.responses else (200, {})
+        data = json.dumps(payload or {"id": "stub-1"}).encode()
+        drop, server.drop = server.drop, None
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if drop == "mid-response":
+            data = data[:5]
+        self.wfile.write(data)
+        if drop:  # without "Connection: close", so the client keeps the socket
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(server):
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    return server
+
+
+@pytest.fixture()
+def smtp_server():
+    server = _serve(_SMTPServer())
+    yield server
+    close_transports()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def resend_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ResendStub)
+    server.ports = set()
+    server.requests = []
+    server.idempotency_keys = []
+    server.responses = []
+    server.drop = None  # "after-response" / "mid-response", for the next request
+    _serve(server)
+    yield server
+    close_transports()
+    server.shutdown()
+    server.server_close()
+
+
+def _message(n=1):
+    msg = EmailMessage()
+    msg["From"] = "site@example.com"
+    msg["To"] = "owner@example.com"
+    msg["Subject"] = f"Message {n}"
+    msg.set_content("Hello")
+    return msg
+
+
+def _pool(server, **kwargs):
+    host, port = server.server_address
+    return SMTPPool(host, port, "user", "secret", starttls=False, **kwargs)
+
+
+class TestSMTPPool:
+    """Authenticated sessions are kept and reused."""
+
+    def test_reuses_one_authenticated_session(self, smtp_server):
+        pool = _pool(smtp_server)
+        for n in range(3):
+            pool.send(_message(n))
+        assert len(smtp_server.messages) == 3
+        assert smtp_server.connections == 1
+        assert smtp_server.logins == 1
+        stats = pool.stats()
+        assert (stats["opened"], stats["reused"], stats["sent"]) == (1, 2, 3)
+        assert stats["idle"] == 1
+        pool.close()
+
+    def test_idle_session_is_checked_with_noop(self, smtp_server):
+        pool = _pool(smtp_server, check_after=0)
+        pool.send(_message(1))
+        pool.send(_message(2))
+        assert "NOOP" in smtp_server.commands
+        assert smtp_server.connections == 1
+        pool.close()
+
+    def test_expired_session_is_replaced(self, smtp_server):
+        pool = _pool(smtp_server, idle_timeout=0)
+        pool.send(_message(1))
+        pool.send(_message(2))
+        assert smtp_server.connections == 2
+        assert pool.stats()["discarded"] == 1
+        pool.close()
+
+    def test_server_closed_session_is_retried_once(self, smtp_server):
+        smtp_server.drop_after_message = True
+        pool = _pool(smtp_server)
+        pool.send(_message(1))
+        pool.send(_message(2))  # reused socket is dead; reconnects
+        assert len(smtp_server.messages) == 2
+        assert smtp_server.connections == 2
+        assert pool.stats()["failed"] == 0
+
+    def test_connection_failure_is_recorded(self):
+        pool = SMTPPool("127.0.0.1", 1, starttls=False, timeout=1)
+        with pytest.raises(OSError):
+            pool.send(_message())
+        assert pool.stats()["failed"] == 1
+
+
+class TestKeepAliveClient:
+    """HTTP/1.1 connections to one origin are reused."""
+
+    def test_reuses_connection(self, resend_stub):
+        host, port = resend_stub.server_address
+        client = KeepAliveClient(f"http://{host}:{port}")
+        for _ in range(3):
+            status, body = client.request("POST", "/emails", body=b"{}")
+            assert status == 200
+        assert len(resend_stub.ports) == 1
+        stats = client.stats()
+        assert (stats["opened"], stats["reused"], stats["sent"]) == (1, 2, 3)
+        client.close()
+
+    def test_error_status_is_returned(self, resend_stub):
+        resend_stub.responses = [(422, {"message": "bad"})]
+        host, port = resend_stub.server_address
+        client = KeepAliveClient(f"http://{host}:{port}")
+        status, body = client.request("POST", "/emails", body=b"{}")
+        assert status == 422
+        assert json.loads(body)["message"] == "bad"
+        assert client.stats()["failed"] == 1
+        client.close()
+
+    def test_connection_closed_while_idle_is_retried(self, resend_stub):
+        resend_stub.drop = "after-response"
+        host, port = resend_stub.server_address
+        client = KeepAliveClient(f"http://{host}:{port}")
+        for _ in range(2):
+            assert client.request("POST", "/emails", body=b"{}")[0] == 200
+        assert len(resend_stub.requests) == 2
+        assert client.stats()["opened"] == 2
+        client.close()
+
+    def test_connection_dropped_mid_response_is_not_retried(self, resend_stub):
+        host, port = resend_stub.server_address
+        client = KeepAliveClient(f"http://{host}:{port}")
+        client.request("POST", "/emails", body=b"{}")
+        resend_stub.drop = "mid-response"
+        with pytest.raises(http.client.IncompleteRead):
+            client.request("POST", "/emails", body=b"{}")
+        assert len(resend_stub.requests) == 2  # delivered exactly once
+        assert client.stats()["failed"] == 1
+        client.close()
+
+    def test_rejects_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            KeepAliveClient("ftp://example.com")
+
+
+class TestSendNotificationEmail:
+    """send_notification_email() goes through the shared transports."""
+
+    def test_resend_path_uses_stub(self, resend_stub, monkeypatch):
+        host, port = resend_stub.server_address
+        monkeypatch.setenv("RESEND_API_KEY", "re_test")
+        monkeypatch.setenv("RESEND_API_URL", f"http://{host}:{port}")
+        monkeypatch.setenv("NOTIFICATION_EMAIL", "owner@example.com")
+        for _ in range(2):
+            ok, detail = send_notification_email("A", "a@example.com", "Hi", "Body")
+            assert ok, detail
+        path, auth, body = resend_stub.requests[0]
+        assert (path, auth) == ("/emails", "Bearer re_test")
+        assert body["to"] == ["owner@example.com"]
+        assert len(resend_stub.ports) == 1
+        assert transport_stats()[f"http://{host}:{port}"]["reused"] == 1
+        assert resend_stub.idempotency_keys == [None, None]
+
+    def test_resend_request_carries_idempotency_key(self, resend_stub, monkeypatch):
+        host, port = resend_stub.server_address
+        monkeypatch.setenv("RESEND_API_KEY", "re_test")
+        monkeypatch.setenv("RESEND_API_URL", f"http://{host}:{port}")
+        monkeypatch.setenv("NOTIFICATION_EMAIL", "owner@example.com")
+        ok, detail = send_notification_email(
+            "A", "a@example.com", "Hi", "Body", idempotency_key="outbox-7"
+        )
+        assert ok, detail
+        assert resend_stub.idempotency_keys == ["outbox-7"]
+
+    def test_resend_403_keeps_guidance(self, resend_stub, monkeypatch):
+        resend_stub.responses = [(403, {"message": "not allowed"})]
+        host, port = resend_stub.server_address
+        monkeypatch.setenv("RESEND_API_KEY", "re_test")
+        monkeypatch.setenv("RESEND_API_URL", f"http://{host}:{port}")
+        monkeypatch.setenv("NOTIFICATION_EMAIL", "owner@example.com")
+        ok, detail = send_notification_email("A", "a@example.com", "Hi", "Body")
+        assert not ok
+        assert "Resend API error 403: not allowed" in detail
+        assert "NOTIFICATION_EMAIL" in detail
+
+    def test_smtp_path_reuses_session(self, smtp_server, monkeypatch):
+        host, port = smtp_server.server_address
+        monkeypatch.delenv("RESEND_API_KEY", raising=False)
+        monkeypatch.setenv("MAIL_SERVER", host)
+        monkeypatch.setenv("MAIL_PORT", str(port))
+        monkeypatch.setenv("MAIL_USERNAME", "user")
+        monkeypatch.setenv("MAIL_PASSWORD", "secret")
+        monkeypatch.setenv("MAIL_USE_TLS", "false")
+        monkeypatch.setenv("NOTIFICATION_EMAIL", "owner@example.com")
+        for _ in range(2):
+            ok, detail = send_notification_email("A", "a@example.com", "Hi", "Body")
+            assert ok, detail
+        assert len(smtp_server.messages) == 2
+        assert smtp_server.logins == 1
+        assert b"[Portfolio Contact] Hi" in smtp_server.messages[0]
@@ -0,0 +1,144 @@
+"""
+Tests for the model mixins (LocalizedMixin, ListingMixin).
+"""
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app.models import BlogPost, Experience, Project, parse_highlights
+from tests.test_cache import count_selects
+
+
+class TestLocalizedFields:
+    """Per-locale resolution with English fallback, memoised per instance."""
+
+    def test_localized_fields_are_columns_with_ar_sibling(self):
+        assert "title" in Project.localized_fields()
+        assert "challenge" in Project.localized_fields()
+        assert "technologies" not in Project.localized_fields()
+        assert Experience.localized_fields() == (
+            "description",
+            "highlights",
+            "role",
+        )
+
+    def test_fallback_chain(self, db, sample_project):
+        project = db.session.get(Project, sample_project.id)
+        project.short_description_ar = "   "
+        db.session.commit()
+        assert project.get_field("title", "ar") == "مشروع تجريبي"
+        assert project.get_field("title", "en") == "Test Project"
+        assert project.get_field("short_description", "ar") == "Short desc"
+        assert project.get_field("client", "ar") == ""
+
+    def test_view_is_built_once_per_locale(self, db, sample_project):
+        project = db.session.get(Project, sample_project.id)
+        first = project.localized("ar")
+        assert project.localized("ar") is first
+        assert project.localized("en") is not first
+
+    def test_assignment_invalidates_view(self, db, sample_project):
+        project = db.session.get(Project, sample_project.id)
+        assert project.get_field("title", "ar") == "مشروع تجريبي"
+        project.title_ar = "عنوان جديد"
+        assert project.get_field("title", "ar") == "عنوان جديد"
+
+    def test_refresh_invalidates_view(self, db, sample_project):
+        project = db.session.get(Project, sample_project.id)
+        assert project.get_field("title", "en") == "Test Project"
+        db.session.execute(Project.__table__.update().values(title="Changed elsewhere"))
+        db.session.expire(project)
+        assert project.get_field("title", "en") == "Changed elsewhere"
+
+    def test_view_skips_unloaded_columns(self, db, sample_project):
+        project = (
+            Project.query.options(Project.listing_options())
+            .filter_by(id=sample_project.id)
+            .one()
+        )
+        with count_selects() as selects:
+            view = project.localized("ar")
+        assert selects == []
+        assert "description" not in view
+        with pytest.raises(InvalidRequestError):
+            project.get_field("description", "ar")  # raiseload still applies
+
+    def test_highlights_default_to_empty_list(self, db, sample_experience):
+        exp = db.session.get(Experience, sample_experience.id)
+        assert exp.get_highlights("ar") == "[]"
+        exp.highlights = '["One"]'
+        assert exp.get_highlights("ar") == '["One"]'
+
+
+class TestHighlights:
+    """Highlights are validated on write and decoded once per load."""
+
+    def test_lists_are_stored_as_json(self, db, sample_experience):
+        exp = db.session.get(Experience, sample_experience.id)
+        exp.highlights = ["One", "<strong>Two</strong>"]
+        assert exp.highlights == '["One", "<strong>Two</strong>"]'
+        assert exp.highlight_list("en") == ("One", "<strong>Two</strong>")
+
+    @pytest.mark.parametrize("raw", ["not json", '{"a": 1}', "[1, 2]"])
+    def test_malformed_values_are_rejected(self, db, sample_experience, raw):
+        exp = db.session.get(Experience, sample_experience.id)
+        with pytest.raises(ValueError):
+            exp.highlights = raw
+
+    def test_arabic_falls_back_to_english(self, db, sample_experience):
+        exp = db.session.get(Experience, sample_experience.id)
+        exp.highlights = ["One"]
+        assert exp.highlight_list("ar") == ("One",)
+        exp.highlights_ar = ["واحد"]
+        assert exp.highlight_list("ar") == ("واحد",)
+
+    def test_decoded_once(self, db, sample_experience, monkeypatch):
+        exp = db.session.get(Experience, sample_experience.id)
+        exp.highlights = ["One"]
+        first = exp.highlight_list("en")
+        # A second decode would fail the test
+        monkeypatch.setattr("app.models.parse_highlights", pytest.fail)
+        assert exp.highlight_list("en") is first
+
+    def test_legacy_rows_render_without_highlights(self, db, sample_experience):
+        db.session.execute(Experience.__table__.update().values(highlights="[broken"))
+        exp = db.session.get(Experience, sample_experience.id)
+        db.session.expire(exp)
+        assert exp.highlight_list("en") == ()
+
+    def test_parse_empty(self):
+        assert parse_highlights(None) == ()
+        assert parse_highlights("") == ()
+        assert parse_highlights("[]") == ()
+
+
+class TestLocalizedRows:
+    """Bulk conversion to plain records."""
+
+    def test_records_mix_localized_and_plain_fields(self, db, sample_blog_post):
+        posts = BlogPost.query.all()
+        (ar,) = BlogPost.localized_rows(posts, "ar", ("slug", "title", "read_time"))
+        assert ar == ("test-blog-post", "مقال تجريبي", 3)
+        assert ar.title == "مقال تجريبي"
+        (en,) = BlogPost.localized_rows(posts, "en", ("slug", "title", "read_time"))
+        assert en.title == "Test Blog Post"
+        assert type(ar) is type(en)  # record type cached per field list
+
+    def test_api_projects_uses_records(self, client, sample_project):
+        data = client.get("/ar/api/projects").get_json()
+        assert data == [
+            {
+                "id": sample_project.id,
+                "title": "مشروع تجريبي",
+                "short_description": "وصف مختصر",
+                "category": "NLP",
+                "technologies": ["Python", "Flask"],
+                "year": "2024",
+                "featured": True,
+            }
+        ]
+
+    def test_localized_feed_uses_records(self, client, sample_blog_post):
+        xml = client.get("/ar/feed.xml").data.decode()
+        assert "<title>مقال تجريبي</title>" in xml
+        assert "<description>ملخص تجريبي</description>" in xml
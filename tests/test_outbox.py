@@ -0,0 +1,183 @@
+"""
+Tests for the transactional email outbox (app/outbox.py).
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import EmailOutbox, Message
+from app.outbox import SENDERS, enqueue, outbox
+
+CONTACT = {
+    "name": "Test User",
+    "email": "test@example.com",
+    "subject": "Hello",
+    "message": "A message that is long enough.",
+}
+
+
+@pytest.fixture()
+def sender(monkeypatch):
+    """Replace the contact sender with a scripted fake.
+
+    Set ``sender.results`` to the (success, detail) tuples to return in turn;
+    every call's payload is appended to ``sender.calls`` and its idempotency
+    key to ``sender.keys``.
+    """
+
+    class FakeSender:
+        def __init__(self):
+            self.calls = []
+            self.keys = []
+            self.results = []
+
+        def __call__(self, payload, idempotency_key):
+            self.calls.append(payload)
+            self.keys.append(idempotency_key)
+            return self.results.pop(0) if self.results else (True, "ok")
+
+    fake = FakeSender()
+    monkeypatch.setitem(SENDERS, "contact_notification", fake)
+    return fake
+
+
+def _queue(db):
+    entry = enqueue("contact_notification", CONTACT)
+    db.session.commit()
+    return entry.id
+
+
+def _make_due(db, row_id):
+    entry = db.session.get(EmailOutbox, row_id)
+    entry.next_attempt_at = datetime(2000, 1, 1)
+    db.session.commit()
+
+
+class TestContactEnqueues:
+    """contact() commits the message and its email together."""
+
+    def test_contact_writes_message_and_outbox_row(self, client, sender):
+        resp = client.post("/contact", json=CONTACT)
+        assert resp.status_code == 200
+        message = Message.query.one()
+        entry = EmailOutbox.query.one()
+        assert entry.message_id == message.id
+        assert json.loads(entry.payload)["subject"] == "Hello"
+        assert entry.status == "sent"  # inline mode in tests
+        assert sender.calls == [CONTACT]
+
+    def test_external_mode_returns_without_sending(self, client, sender, monkeypatch):
+        monkeypatch.setattr(outbox, "mode", "external")
+        resp = client.post("/contact", json=CONTACT)
+        assert resp.status_code == 200
+        assert sender.calls == []
+        assert EmailOutbox.query.one().status == "pending"
+
+    def test_honeypot_queues_nothing(self, client, sender):
+        client.post("/contact", json={**CONTACT, "website": "spam"})
+        assert EmailOutbox.query.count() == 0
+
+
+class TestDispatch:
+    """Retries, backoff, dead-lettering and claiming."""
+
+    def test_failure_schedules_retry_with_backoff(self, db, sender):
+        sender.results = [(False, "SMTP timeout")]
+        row_id = _queue(db)
+        assert outbox.dispatch_due() == 0
+        entry = db.session.get(EmailOutbox, row_id)
+        assert entry.status == "pending"
+        assert entry.attempts == 1
+        assert entry.last_error == "SMTP timeout"
+        assert entry.next_attempt_at > datetime.utcnow() + timedelta(seconds=20)
+
+    def test_backoff_doubles_and_caps(self):
+        assert outbox.backoff_delay(1) == timedelta(seconds=30)
+        assert outbox.backoff_delay(3) == timedelta(seconds=120)
+        assert outbox.backoff_delay(20) == timedelta(seconds=3600)
+
+    def test_exhausted_attempts_go_dead_then_retry(self, db, sender, monkeypatch):
+        monkeypatch.setattr(outbox, "max_attempts", 2)
+        sender.results = [(False, "down"), (False, "still down")]
+        row_id = _queue(db)
+        outbox.dispatch_due()
+        _make_due(db, row_id)
+        outbox.dispatch_due()
+        entry = db.session.get(EmailOutbox, row_id)
+        assert entry.status == "dead"
+        assert entry.attempts == 2
+
+        assert outbox.retry_dead() == 1  # re-queued and delivered inline
+        db.session.refresh(entry)
+        assert entry.status == "sent"
+        assert len(sender.calls) == 3
+        assert sender.keys == [f"outbox-{row_id}"] * 3  # one email at Resend
+
+    def test_sender_exception_counts_as_failure(self, db, monkeypatch):
+        def _boom(payload, idempotency_key):
+            raise OSError("connection refused")
+
+        monkeypatch.setitem(SENDERS, "contact_notification", _boom)
+        row_id = _queue(db)
+        outbox.dispatch_due()
+        entry = db.session.get(EmailOutbox, row_id)
+        assert entry.status == "pending"
+        assert "connection refused" in entry.last_error
+
+    def test_leased_row_is_not_sent_twice(self, db, sender):
+        row_id = _queue(db)
+        # Another worker claimed it a moment ago
+        entry = db.session.get(EmailOutbox, row_id)
+        entry.status = "sending"
+        entry.next_attempt_at = datetime.utcnow() + timedelta(minutes=2)
+        db.session.commit()
+        assert outbox.dispatch_due() == 0
+        assert sender.calls == []
+
+    def test_expired_lease_is_reclaimed(self, db, sender):
+        row_id = _queue(db)
+        entry = db.session.get(EmailOutbox, row_id)
+        entry.status = "sending"  # claimed by a worker that then died
+        entry.attempts = 1
+        db.session.commit()
+        _make_due(db, row_id)
+        assert outbox.dispatch_due() == 1
+        assert db.session.get(EmailOutbox, row_id).attempts == 2
+
+    def test_dispatcher_thread_wakes_on_notify(self, app, db, sender, monkeypatch):
+        monkeypatch.setattr(outbox, "mode", "thread")
+        monkeypatch.setattr(outbox, "poll_interval", 60)
+        outbox.start()
+        try:
+            row_id = _queue(db)
+            outbox.notify()
+            deadline = time.monotonic() + 2
+            while not sender.calls and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            outbox.shutdown()
+        assert sender.calls == [CONTACT]
+        db.session.expire_all()
+        assert db.session.get(EmailOutbox, row_id).status == "sent"
+
+
+class TestAdminOutbox:
+    """Dashboard stats and the dead-letter retry button."""
+
+    def test_dashboard_shows_outbox_stats(self, auth_client, db, sender):
+        sender.results = [(False, "down")]
+        _queue(db)
+        outbox.dispatch_due()
+        assert b"Outbox: 1 queued" in auth_client.get("/admin/").data
+
+    def test_retry_route_requeues_dead(self, auth_client, db, sender):
+        row_id = _queue(db)
+        entry = db.session.get(EmailOutbox, row_id)
+        entry.status = "dead"
+        db.session.commit()
+        resp = auth_client.post("/admin/outbox/retry")
+        assert resp.status_code == 302
+        assert db.session.get(EmailOutbox, row_id).status == "sent"
@@ -0,0 +1,96 @@
+"""
+Tests for per-request timing (app/perf.py).
+"""
+
+import re
+
+import pytest
+
+from app.perf import LatencyHistogram, request_metrics
+
+TIMING_RE = re.compile(
+    r'db;dur=([\d.]+);desc="(\d+) queries", tpl;dur=([\d.]+), '
+    r"app;dur=([\d.]+), total;dur=([\d.]+)"
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    request_metrics.reset()
+    yield
+    request_metrics.reset()
+
+
+def _timing(resp):
+    match = TIMING_RE.fullmatch(resp.headers["Server-Timing"])
+    assert match, resp.headers["Server-Timing"]
+    db_ms, queries, tpl_ms, app_ms, total_ms = match.groups()
+    return float(db_ms), int(queries), float(tpl_ms), float(app_ms), float(total_ms)
+
+
+class TestServerTiming:
+    """Every response carries the db / tpl / app / total breakdown."""
+
+    def test_header_breaks_down_total(self, client, sample_blog_post):
+        db_ms, queries, tpl_ms, app_ms, total_ms = _timing(client.get("/en/blog"))
+        assert queries >= 1
+        assert tpl_ms > 0
+        assert db_ms + tpl_ms + app_ms == pytest.approx(total_ms, abs=0.5)
+
+    def test_cached_page_reports_no_queries(self, client):
+        client.get("/en/")
+        _, queries, tpl_ms, _, _ = _timing(client.get("/en/"))
+        assert (queries, tpl_ms) == (0, 0)
+
+    def test_error_responses_are_timed(self, client):
+        assert "Server-Timing" in client.get("/en/blog/no-such-post").headers
+
+    def test_header_can_be_disabled(self, client, monkeypatch):
+        monkeypatch.setattr(request_metrics, "server_timing", False)
+        assert "Server-Timing" not in client.get("/en/").headers
+
+
+class TestEndpointHistograms:
+    """Per-endpoint percentiles for the admin Performance tab."""
+
+    def test_records_per_endpoint(self, client, sample_blog_post):
+        for _ in range(3):
+            client.get("/en/blog")
+        client.get("/static/css/style.css")
+        rows = {row["endpoint"]: row for row in request_metrics.stats()}
+        assert rows["main.blog"]["count"] == 3
+        assert rows["main.blog"]["queries_mean"] > 0  # first render; then cached
+        assert "static" not in rows
+
+    def test_percentiles_within_bucket_precision(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.add(float(ms))
+        assert histogram.percentile(0.5) == pytest.approx(500, rel=0.1)
+        assert histogram.percentile(0.95) == pytest.approx(950, rel=0.1)
+        assert histogram.percentile(0.99) == pytest.approx(990, rel=0.1)
+        assert histogram.percentile(1.0) == 1000
+        assert len(histogram.buckets) < 80  # bounded, not one per sample
+
+    def test_sub_millisecond_requests(self):
+        histogram = LatencyHistogram()
+        histogram.add(0.2)
+        assert histogram.percentile(0.99) == pytest.approx(0.2)
+
+    def test_performance_tab_and_reset(self, auth_client):
+        auth_client.get("/en/")
+        html = auth_client.get("/admin/").data.decode()
+        assert 'id="tab-performance"' in html
+        assert "main.index" in html
+        resp = auth_client.post("/admin/performance/reset")
+        assert resp.status_code == 302
+        # Only the reset request itself remains
+        assert [r["endpoint"] for r in request_metrics.stats()] == [
+            "admin.performance_reset"
+        ]
+
+    def test_reset_requires_login(self, client):
+        client.post("/admin/performance/reset")
+        # Unauthenticated: redirected to login and nothing cleared
+        client.get("/en/")
+        assert request_metrics.stats()
@@ -0,0 +1,174 @@
+"""
+Query budgets per route and the N+1 / slow-query detector (app/perf.py).
+
+Each public route is rendered cold (caches reset) with ten rows of every
+content model; the number of SELECTs must stay within its declared budget
+and must not grow with the number of rows.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.perf as perf
+from app.cache import reset_caches
+from app.models import (
+    BlogPost,
+    Experience,
+    ImpactCard,
+    LanguageItem,
+    Message,
+    Project,
+    SkillCluster,
+)
+from app.perf import QueryBudgetExceeded, count_queries, normalize_sql
+
+# URL → most SELECTs a cold render may run
+ROUTE_BUDGETS = {
+    "/en/": 8,
+    "/en/blog": 3,
+    "/en/blog/post-0": 3,
+    "/en/project/1": 2,
+    "/en/case-study/1": 2,
+    "/en/api/projects": 1,
+    "/feed.xml": 2,
+    "/sitemap.xml": 3,
+}
+ADMIN_BUDGET = 36  # dashboard: every tab, analytics rollups and sketches
+
+
+def _seed(db, count, start=0):
+    now = datetime.now(timezone.utc)
+    for i in range(start, start + count):
+        db.session.add_all(
+            [
+                Project(
+                    title=f"Project {i}",
+                    description="Description",
+                    short_description="Short",
+                    technologies="Python, Flask",
+                    category="NLP",
+                    featured=True,
+                    has_case_study=True,
+                    sort_order=i,
+                ),
+                BlogPost(
+                    title=f"Post {i}",
+                    slug=f"post-{i}",
+                    content="<p>Body</p>",
+                    category="AI",
+                    tags="a, b",
+                    published=True,
+                    created_at=now - timedelta(days=i),
+                ),
+                Experience(
+                    role="Role",
+                    company="Company",
+                    date_range="2024",
+                    highlights='["One", "Two"]',
+                    sort_order=i,
+                ),
+                ImpactCard(value=str(i), description="Impact", sort_order=i),
+                SkillCluster(title=f"Cluster {i}", tags="a, b", sort_order=i),
+                LanguageItem(name=f"Language {i}", level="Fluent", sort_order=i),
+                Message(name="N", email="n@example.com", subject="S", message="M"),
+            ]
+        )
+    db.session.commit()
+
+
+def _cold_count(client, url):
+    reset_caches()
+    with count_queries() as queries:
+        resp = client.get(url)
+    assert resp.status_code == 200, url
+    return queries.count
+
+
+class TestRouteBudgets:
+    """Public routes and the dashboard stay within their query budgets."""
+
+    @pytest.mark.parametrize("url", ROUTE_BUDGETS)
+    def test_public_route_within_budget(self, client, db, url, query_budget):
+        _seed(db, 10)
+        reset_caches()
+        with query_budget(ROUTE_BUDGETS[url]):
+            assert client.get(url).status_code == 200
+
+    def test_admin_dashboard_within_budget(self, auth_client, db, query_budget):
+        _seed(db, 10)
+        with query_budget(ADMIN_BUDGET):
+            assert auth_client.get("/admin/").status_code == 200
+
+    def test_query_count_does_not_grow_with_rows(self, auth_client, db):
+        urls = list(ROUTE_BUDGETS) + ["/admin/"]
+        _seed(db, 1)
+        one_row = {url: _cold_count(auth_client, url) for url in urls}
+        _seed(db, 9, start=1)
+        ten_rows = {url: _cold_count(auth_client, url) for url in urls}
+        assert ten_rows == one_row
+
+
+class TestCountQueries:
+    """The assertion API itself."""
+
+    def test_within_budget_passes(self, db):
+        with count_queries(2) as queries:
+            Project.query.all()
+        assert queries.count == 1
+
+    def test_exceeding_budget_names_repeated_statement(self, db):
+        _seed(db, 3)
+        with pytest.raises(QueryBudgetExceeded) as excinfo:
+            with count_queries(1):
+                for project in Project.query.all():
+                    db.session.expire(project)
+                    project.title  # one refresh per row: an N+1
+        message = str(excinfo.value)
+        assert "4 queries ran, budget is 1" in message
+        assert "3× SELECT" in message
+        assert "possible N+1" in message
+
+    def test_writes_ignored_unless_requested(self, db):
+        with count_queries() as selects, count_queries(selects_only=False) as every:
+            db.session.add(LanguageItem(name="X", level="Y"))
+            db.session.commit()
+        assert selects.count == 0
+        assert every.count >= 1
+
+    def test_error_inside_block_is_not_masked(self, db):
+        with pytest.raises(ZeroDivisionError):
+            with count_queries(0):
+                Project.query.all()
+                1 / 0
+
+    def test_normalize_sql_merges_values(self):
+        a = normalize_sql(
+            "SELECT *  FROM t\n WHERE id = 1 AND name = 'x' AND k IN (?, ?)"
+        )
+        b = normalize_sql("SELECT * FROM t WHERE id = 22 AND name = 'y' AND k IN (?)")
+        assert a == b == "SELECT * FROM t WHERE id = ? AND name = ? AND k IN (?)"
+
+
+class TestSlowQueryLog:
+    """Statements above SLOW_QUERY_MS are logged with caller and endpoint."""
+
+    def test_logs_normalized_sql_and_caller(self, client, caplog, monkeypatch):
+        monkeypatch.setattr(perf, "_slow_query_seconds", 0.0)
+        with caplog.at_level(logging.WARNING, logger="app.perf"):
+            client.get("/en/blog")
+        records = [
+            r
+            for r in caplog.records
+            if r.getMessage().startswith("Slow query") and r.endpoint == "main.blog"
+        ]
+        assert records
+        assert all(r.caller.startswith("app/") for r in records)
+        assert any("WHERE blog_posts.published = ?" in r.sql for r in records)
+
+    def test_disabled_logs_nothing(self, client, caplog, monkeypatch):
+        monkeypatch.setattr(perf, "_slow_query_seconds", None)
+        with caplog.at_level(logging.WARNING, logger="app.perf"):
+            client.get("/en/blog")
+        assert not [r for r in caplog.records if "Slow query" in r.getMessage()]
@@ -0,0 +1,146 @@
+"""
+Query-plan regression tests: hot queries must be served by an index.
+
+Every SELECT issued while a route (or analytics job) runs is re-run under
+SQLite's ``EXPLAIN QUERY PLAN``; a plain ``SCAN`` of ``blog_posts`` or
+``page_visits`` (a full table scan without an index) fails the test.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app import db as _db
+from app.analytics import compact_visits, dashboard_stats
+from app.models import BlogPost, PageVisit
+
+WATCHED_TABLES = ("blog_posts", "page_visits")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+
+
+@contextmanager
+def capture_selects():
+    """Collect ``(statement, parameters)`` for SELECTs run inside the block."""
+    captured = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(_db.engine, "before_cursor_execute", _record)
+    try:
+        yield captured
+    finally:
+        event.remove(_db.engine, "before_cursor_execute", _record)
+
+
+def full_scans(captured, tables=WATCHED_TABLES) -> list:
+    """Return ``(table, statement)`` for each of *tables* scanned in full."""
+    scans = []
+    connection = _db.session.connection()
+    for statement, parameters in captured:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).all()
+        for row in plan:
+            match = _FULL_SCAN.match(row[-1])
+            if match and match.group(1) in tables:
+                scans.append((match.group(1), statement))
+    return scans
+
+
+@pytest.fixture()
+def blog_posts(db):
+    now = datetime.now(timezone.utc)
+    for i, category in enumerate(("AI", "AI", "Neuroscience", None)):
+        db.session.add(
+            BlogPost(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                content="<p>Body</p>",
+                category=category,
+                published=i != 3,
+                created_at=now - timedelta(days=i),
+            )
+        )
+    db.session.commit()
+
+
+@pytest.fixture()
+def page_visits(db):
+    now = datetime.now(timezone.utc)
+    for offset in range(3):
+        for path in ("/", "/blog"):
+            db.session.add(
+                PageVisit(
+                    path=path,
+                    referrer="https://google.com",
+                    user_agent="Mozilla/5.0 Firefox/120.0",
+                    ip_hash=f"visitor-{offset}",
+                    country="en-US",
+                    visited_at=now - timedelta(days=offset),
+                    browser=5,
+                    os=1,
+                    device=1,
+                )
+            )
+    db.session.commit()
+
+
+class TestBlogQueryPlans:
+    """Public blog queries use the (published, …, created_at) indexes."""
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/en/",
+            "/en/blog",
+            "/en/blog?category=AI",
+            "/en/blog/post-0",
+            "/feed.xml",
+            "/ar/feed.xml",
+            "/sitemap.xml",
+        ],
+    )
+    def test_public_blog_queries_use_indexes(self, client, blog_posts, url):
+        with capture_selects() as captured:
+            assert client.get(url).status_code == 200
+        assert any("blog_posts" in statement for statement, _ in captured)
+        assert full_scans(captured) == []
+
+    def test_listing_uses_published_created_at_index(self, client, blog_posts):
+        with capture_selects() as captured:
+            client.get("/en/blog")
+        plans = [
+            row[-1]
+            for statement, parameters in captured
+            for row in _db.session.connection()
+            .exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            .all()
+        ]
+        assert any("ix_blog_posts_published_created_at" in p for p in plans)
+        assert not any("USE TEMP B-TREE FOR ORDER BY" in p for p in plans)
+
+
+class TestAnalyticsQueryPlans:
+    """Compaction and dashboard reads stay on the visited_at indexes."""
+
+    def test_compaction_uses_indexes(self, page_visits):
+        with capture_selects() as captured:
+            assert compact_visits() == 2
+        assert full_scans(captured) == []
+
+    def test_dashboard_uses_indexes(self, page_visits):
+        with capture_selects() as captured:
+            dashboard_stats()
+        assert full_scans(captured) == []
+
+    def test_admin_dashboard_uses_indexes(self, auth_client, blog_posts, page_visits):
+        with capture_selects() as captured:
+            assert auth_client.get("/admin/").status_code == 200
+        # The admin post list reads every post by design; only the visit
+        # table, which grows without bound, must never be scanned
+        assert full_scans(captured, tables=("page_visits",)) == []
@@ -3,6 +3,8 @@ Tests for public routes (main blueprint).
 """
 
 import json
+import re
+from datetime import datetime, timedelta, timezone
 
 
 class TestIndex:
@@ -194,6 +196,59 @@ class TestBlog:
         assert resp.status_code == 404
 
 
+def _add_posts(db, count, category="AI"):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        db.session.add(
+            BlogPost(
+                title=f"Post {i:02d}",
+                slug=f"post-{i:02d}",
+                content="<p>Body</p>",
+                category=category,
+                # Pairs of posts share a timestamp so the id tie-break matters
+                created_at=start + timedelta(days=i // 2),
+            )
+        )
+    db.session.commit()
+
+
+class TestBlogPagination:
+    """Keyset pagination of the blog listing (?after= cursors)."""
+
+    def _titles(self, resp):
+        return re.findall(r"Post \d\d", resp.get_data(as_text=True))
+
+    def test_pages_cover_every_post_once(self, app, client, db, monkeypatch):
+        monkeypatch.setitem(app.config, "BLOG_PAGE_SIZE", 4)
+        _add_posts(db, 10)
+        seen = []
+        url = "/en/blog"
+        while url:
+            resp = client.get(url)
+            assert resp.status_code == 200
+            seen += self._titles(resp)
+            match = re.search(
+                r'<link rel="next" href="([^"]+)"', resp.get_data(as_text=True)
+            )
+            url = match.group(1).replace("&amp;", "&") if match else None
+        assert seen == [f"Post {i:02d}" for i in reversed(range(10))]
+
+    def test_last_page_has_no_next_link(self, app, client, db, monkeypatch):
+        monkeypatch.setitem(app.config, "BLOG_PAGE_SIZE", 4)
+        _add_posts(db, 4)
+        resp = client.get("/en/blog")
+        assert b'rel="next"' not in resp.data
+
+    def test_next_link_keeps_category(self, app, client, db, monkeypatch):
+        monkeypatch.setitem(app.config, "BLOG_PAGE_SIZE", 2)
+        _add_posts(db, 3)
+        resp = client.get("/en/blog?category=AI")
+        assert b'rel="next" href="/en/blog?category=AI&amp;after=' in resp.data
+
+    def test_invalid_cursor_returns_400(self, client):
+        assert client.get("/en/blog?after=not-a-cursor").status_code == 400
+
+
 from app.models import BlogPost
 
 
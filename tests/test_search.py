@@ -0,0 +1,239 @@
+"""
+Tests for full-text search (app/search.py) and the /<locale>/search route.
+"""
+
+import json
+
+import pytest
+
+from app import search as search_module
+from app.models import BlogPost, Project
+from app.search import (
+    FORMAT,
+    SearchIndex,
+    analyze,
+    build_document,
+    get_search_index,
+    load_index,
+    normalize_arabic,
+    search_content,
+    stem,
+    strip_html,
+)
+
+
+@pytest.fixture()
+def corpus(app, db):
+    """Three posts (one draft) and one project, in both languages."""
+    posts = [
+        BlogPost(
+            title="Training Recommendation Models",
+            slug="training-models",
+            excerpt="How we trained ranking models.",
+            content="<p>Ranking <b>models</b> for flights &amp; hotels.</p>",
+            title_ar="تدريب نماذج التوصية",
+            content_ar="<p>المَكتبةُ الجديدة للنماذج.</p>",
+            category="AI",
+            tags="ml, ranking",
+            published=True,
+        ),
+        BlogPost(
+            title="Notes on Neuroscience",
+            slug="neuroscience",
+            content="<p>Memory, attention and a brief word on models.</p>",
+            category="Neuroscience",
+            published=True,
+        ),
+        BlogPost(
+            title="Unfinished draft about models",
+            slug="draft",
+            content="<p>models models models</p>",
+            published=False,
+        ),
+    ]
+    project = Project(
+        title="Flight Delay Predictor",
+        description="<p>Predicts delays with gradient boosting.</p>",
+        short_description="Delay forecasting",
+        description_ar="<p>التنبؤ بتأخير الرحلات</p>",
+        technologies="Python, LightGBM",
+    )
+    db.session.add_all([*posts, project])
+    db.session.commit()
+    return posts, project
+
+
+class TestAnalyzer:
+    """HTML stripping, Arabic normalization and stemming."""
+
+    def test_strip_html(self):
+        html = "<p>A &amp; B</p><script>alert(1)</script>\n<em>c</em>"
+        assert strip_html(html) == "A & B c"
+
+    def test_arabic_normalization(self):
+        assert normalize_arabic("أَحْمَد إبراهيم آمال مدرسة مستشفى") == (
+            "احمد ابراهيم امال مدرسه مستشفي"
+        )
+        assert normalize_arabic("عـــلم") == "علم"  # tatweel
+
+    def test_arabic_article_and_variants_meet(self):
+        assert analyze("المَكتبةُ") == analyze("مكتبة") == analyze("والمكتبه")
+
+    def test_english_stemming(self):
+        assert stem("models") == stem("modeling") == stem("model")
+        assert stem("running") == "run"
+        assert stem("studies") == "study"
+        assert stem("class") == stem("classes") == "class"
+
+    def test_stopwords_dropped(self):
+        assert analyze("The models of the year") == ["model", "year"]
+        assert analyze("في المكتبة") == ["مكتبه"]
+
+
+class TestIndex:
+    """BM25 ranking and copy-on-write updates."""
+
+    def test_title_match_ranks_first(self, app, corpus):
+        results = search_content("models", "en")
+        assert [r.slug for r in results] == ["training-models", "neuroscience"]
+        assert results[0].score > results[1].score
+        assert results[0].snippet == "How we trained ranking models."
+
+    def test_drafts_are_not_indexed(self, app, corpus):
+        assert "draft" not in {r.slug for r in search_content("unfinished", "en")}
+
+    def test_project_and_arabic_fallback(self, app, corpus):
+        _, project = corpus
+        results = search_content("lightgbm", "ar")
+        assert [(r.kind, r.id) for r in results] == [("project", project.id)]
+        assert results[0].title == "Flight Delay Predictor"  # no title_ar
+
+    def test_arabic_query(self, app, corpus):
+        results = search_content("مكتبه", "ar")
+        assert [r.slug for r in results] == ["training-models"]
+        assert results[0].title == "تدريب نماذج التوصية"
+        assert search_content("رحلات", "ar")[0].kind == "project"
+
+    def test_no_database_queries_once_current(self, app, corpus, query_budget):
+        search_content("models", "en")
+        with query_budget(0):
+            for _ in range(50):
+                search_content("ranking models", "en")
+
+    def test_updated_shares_untouched_postings(self, app, corpus):
+        index = get_search_index()
+        post = BlogPost.query.filter_by(slug="neuroscience").one()
+        doc = build_document("post", post, "changed")
+        doc["locales"]["en"]["terms"] = {"memory": 1}
+        updated = index.updated(1, {f"post:{post.id}": doc})
+        assert updated.postings["en"]["flight"] is index.postings["en"]["flight"]
+        assert "attention" not in updated.postings["en"]  # emptied list pruned
+        assert f"post:{post.id}" in index.postings["en"]["attention"]  # old untouched
+
+
+class TestSync:
+    """The index follows admin edits incrementally."""
+
+    def test_admin_edit_reindexes_only_that_post(
+        self, app, auth_client, corpus, monkeypatch
+    ):
+        posts, _ = corpus
+        search_content("models", "en")
+        built = []
+        original = search_module.build_document
+        monkeypatch.setattr(
+            search_module,
+            "build_document",
+            lambda kind, obj, updated: built.append(obj.id)
+            or original(kind, obj, updated),
+        )
+        resp = auth_client.post(
+            f"/admin/blog/{posts[1].id}/edit",
+            data={
+                "title": "Notes on Neuroscience",
+                "slug": "neuroscience",
+                "content": "<p>Now about hippocampus replay.</p>",
+                "published": "on",
+            },
+        )
+        assert resp.status_code == 302
+        assert [r.slug for r in search_content("hippocampus", "en")] == ["neuroscience"]
+        assert built == [posts[1].id]
+
+    def test_unpublish_and_delete_remove_documents(self, app, db, corpus):
+        posts, project = corpus
+        assert search_content("neuroscience", "en")
+        db.session.get(BlogPost, posts[1].id).published = False
+        db.session.delete(db.session.get(Project, project.id))
+        db.session.commit()
+        assert search_content("neuroscience", "en") == []
+        assert search_content("delay", "en") == []
+        assert set(get_search_index().docs) == {f"post:{posts[0].id}"}
+
+
+class TestPersistence:
+    """Workers load the saved documents instead of re-analysing."""
+
+    @pytest.fixture()
+    def index_file(self, app, tmp_path, monkeypatch):
+        path = tmp_path / "search-index.json"
+        monkeypatch.setitem(app.config, "SEARCH_INDEX_PERSIST", True)
+        monkeypatch.setitem(app.config, "SEARCH_INDEX_PATH", str(path))
+        return path
+
+    def test_saved_after_sync_and_reloaded(self, app, corpus, index_file, monkeypatch):
+        search_content("models", "en")
+        data = json.loads(index_file.read_text(encoding="utf-8"))
+        assert data["format"] == FORMAT
+        assert len(data["docs"]) == 3
+
+        search_module._drop_index()  # a fresh worker
+        monkeypatch.setattr(
+            search_module, "build_document", pytest.fail  # must not re-analyse
+        )
+        results = search_content("models", "en")
+        assert [r.slug for r in results] == ["training-models", "neuroscience"]
+
+    def test_outdated_or_corrupt_file_is_ignored(self, app, index_file):
+        index_file.write_text(json.dumps({"format": FORMAT - 1, "docs": {}}))
+        assert load_index(str(index_file)).docs == {}
+        index_file.write_text("{not json")
+        assert isinstance(load_index(str(index_file)), SearchIndex)
+
+    def test_cli_rebuild(self, app, corpus, index_file):
+        result = app.test_cli_runner().invoke(args=["build-search-index"])
+        assert result.exit_code == 0, result.output
+        assert "Indexed 2 post(s) and 1 project(s)" in result.output
+        assert index_file.exists()
+
+
+class TestSearchRoute:
+    """/<locale>/search renders ranked results."""
+
+    def test_results_page(self, client, corpus):
+        resp = client.get("/en/search?q=ranking+models")
+        html = resp.data.decode()
+        assert resp.status_code == 200
+        assert 'href="/en/blog/training-models"' in html
+        assert 'content="noindex, follow"' in html
+        assert html.index("training-models") < html.index("/en/blog/neuroscience")
+
+    def test_arabic_results_link_arabic_pages(self, client, corpus):
+        _, project = corpus
+        html = client.get("/ar/search?q=الرحلات").data.decode()
+        assert f'href="/ar/project/{project.id}"' in html
+
+    def test_empty_and_unmatched_queries(self, client, corpus):
+        assert client.get("/en/search").status_code == 200
+        html = client.get("/en/search?q=zzzz").data.decode()
+        assert "Nothing matched your search" in html
+
+    def test_legacy_redirect_keeps_query(self, client):
+        resp = client.get("/search?q=ai")
+        assert resp.status_code == 301
+        assert resp.headers["Location"].endswith("/en/search?q=ai")
+
+    def test_query_cost(self, client, corpus, query_budget):
+        client.get("/en/search?q=models")
+        with query_budget(0):
+            client.get("/en/search?q=flight+delay")
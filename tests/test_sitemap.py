@@ -0,0 +1,72 @@
+"""
+Tests for the prebuilt sitemap (app/sitemap.py).
+"""
+
+import gzip
+
+from app.models import BlogPost, ImpactCard, Project
+from app.sitemap import sitemap_version
+from tests.test_cache import count_selects
+
+
+class TestSitemap:
+    """sitemap.xml is built once per post/project change and served from memory."""
+
+    def test_lists_posts_projects_and_case_studies(
+        self, client, db, sample_blog_post, sample_project
+    ):
+        project = db.session.get(Project, sample_project.id)
+        project.has_case_study = True
+        db.session.commit()
+        xml = client.get("/sitemap.xml").data.decode()
+        for locale in ("en", "ar"):
+            assert f"/{locale}/blog/test-blog-post</loc>" in xml
+            assert f"/{locale}/project/{sample_project.id}</loc>" in xml
+            assert f"/{locale}/case-study/{sample_project.id}</loc>" in xml
+
+    def test_repeat_request_runs_no_queries(self, client, sample_blog_post):
+        first = client.get("/sitemap.xml")
+        with count_selects() as selects:
+            second = client.get("/sitemap.xml")
+        assert second.data == first.data
+        assert selects == []
+
+    def test_gzip_variant_when_accepted(self, client, sample_blog_post):
+        plain = client.get("/sitemap.xml")
+        packed = client.get("/sitemap.xml", headers={"Accept-Encoding": "gzip"})
+        assert packed.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in packed.headers["Vary"]
+        assert gzip.decompress(packed.data) == plain.data
+        assert packed.headers["ETag"] != plain.headers["ETag"]
+
+    def test_rebuilt_when_post_added(self, client, db):
+        client.get("/sitemap.xml")
+        db.session.add(BlogPost(title="Fresh", slug="fresh-post", content="<p>x</p>"))
+        db.session.commit()
+        assert b"/en/blog/fresh-post</loc>" in client.get("/sitemap.xml").data
+
+    def test_unrelated_content_keeps_sitemap_version(self, db):
+        before = sitemap_version.current()
+        db.session.add(ImpactCard(value="5", description="Stat"))
+        db.session.commit()
+        assert sitemap_version.current() == before
+
+    def test_single_file_has_no_shards(self, client):
+        assert b"<urlset" in client.get("/sitemap.xml").data
+        assert client.get("/sitemap-1.xml").status_code == 404
+
+
+class TestSitemapIndex:
+    """Large sitemaps are split into an index plus shards."""
+
+    def test_index_and_shards(self, app, client, sample_blog_post, monkeypatch):
+        monkeypatch.setitem(app.config, "SITEMAP_MAX_URLS", 4)
+        root = client.get("/sitemap.xml").data.decode()
+        assert "<sitemapindex" in root
+        # 3 static pages + 1 post, per locale → 8 URLs → 2 shards
+        assert "/sitemap-1.xml</loc>" in root
+        assert "/sitemap-2.xml</loc>" in root
+        shard = client.get("/sitemap-2.xml")
+        assert shard.status_code == 200
+        assert b"<urlset" in shard.data
+        assert client.get("/sitemap-3.xml").status_code == 404
@@ -0,0 +1,65 @@
+"""
+Tests for the template bytecode cache and startup warm-up (app/templating.py).
+"""
+
+import logging
+
+import pytest
+from jinja2 import FileSystemBytecodeCache
+
+from app.templating import init_templates, warm_templates
+
+
+@pytest.fixture()
+def jinja_env(app, monkeypatch, tmp_path):
+    """The app's Jinja environment with a fresh bytecode cache in tmp_path."""
+    env = app.jinja_env
+    monkeypatch.setattr(env, "bytecode_cache", FileSystemBytecodeCache(str(tmp_path)))
+    env.cache.clear()
+    yield env
+    env.cache.clear()
+
+
+class TestWarmTemplates:
+    """Every template is compiled before the first request."""
+
+    def test_compiles_every_template(self, app, jinja_env):
+        timings = warm_templates(app)
+        names = {name for name, _ in timings}
+        assert {"index.html", "admin/dashboard.html", "sitemap.xml"} <= names
+        assert len(jinja_env.cache) == len(names)
+
+    def test_second_warm_up_loads_bytecode(self, app, jinja_env, monkeypatch):
+        warm_templates(app)
+        jinja_env.cache.clear()  # as in a new worker process
+
+        compiled = []
+        original = jinja_env.compile
+        monkeypatch.setattr(
+            jinja_env,
+            "compile",
+            lambda *a, **kw: compiled.append(a) or original(*a, **kw),
+        )
+        warm_templates(app)
+        assert compiled == []
+
+    def test_logs_summary(self, app, jinja_env, caplog):
+        with caplog.at_level(logging.INFO, logger="app.templating"):
+            warm_templates(app)
+        assert any("Warmed" in r.getMessage() for r in caplog.records)
+
+    def test_warmed_templates_still_render(self, app, jinja_env, client):
+        warm_templates(app)
+        assert client.get("/en/").status_code == 200
+
+
+class TestInitTemplates:
+    """Configuration switches."""
+
+    def test_uses_configured_cache_dir(self, app, jinja_env, monkeypatch, tmp_path):
+        cache_dir = tmp_path / "bytecode"
+        monkeypatch.setitem(app.config, "TEMPLATE_BYTECODE_CACHE", True)
+        monkeypatch.setitem(app.config, "TEMPLATE_CACHE_DIR", str(cache_dir))
+        monkeypatch.setitem(app.config, "TEMPLATE_WARMUP", True)
+        init_templates(app)
+        assert any(cache_dir.glob("portfolio-*.cache"))
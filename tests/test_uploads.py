@@ -0,0 +1,241 @@
+"""
+Tests for streamed, content-addressed upload storage (app/uploads.py).
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from app.images import strip_metadata
+from app.models import BlogPost, Project
+from app.uploads import (
+    CHUNK_SIZE,
+    UploadRejected,
+    collect_garbage,
+    reference_index,
+    sniff_image_type,
+    store_upload,
+)
+
+
+def _image_bytes(fmt="PNG", size=(64, 32), color=(255, 0, 0)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, fmt)
+    return buf.getvalue()
+
+
+def _text_chunk():
+    info = PngInfo()
+    info.add_text("Comment", "x" * 500)
+    return info
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that records how many bytes were read from it."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class TestStoreUpload:
+    """Chunked copy, validation and deduplication."""
+
+    def test_stores_under_content_hash(self, tmp_path):
+        data = _image_bytes()
+        stored = store_upload(io.BytesIO(data), str(tmp_path), 1024 * 1024)
+        assert stored.created
+        assert stored.name == f"{stored.sha256[:16]}.png"
+        assert stored.size == len(data)
+        assert (tmp_path / stored.name).read_bytes() == data
+        assert os.listdir(tmp_path) == [stored.name]  # no temp files left
+
+    def test_identical_upload_is_deduplicated(self, tmp_path):
+        data = _image_bytes("JPEG")
+        first = store_upload(io.BytesIO(data), str(tmp_path), 1024 * 1024)
+        second = store_upload(io.BytesIO(data), str(tmp_path), 1024 * 1024)
+        assert first.name == second.name and first.name.endswith(".jpg")
+        assert not second.created
+        assert os.listdir(tmp_path) == [first.name]
+
+    def test_prepare_runs_before_hashing(self, tmp_path):
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 32)).save(buf, "PNG", pnginfo=_text_chunk())
+        stored = store_upload(
+            io.BytesIO(buf.getvalue()), str(tmp_path), 1024 * 1024, strip_metadata
+        )
+        content = (tmp_path / stored.name).read_bytes()
+        assert stored.sha256 == hashlib.sha256(content).hexdigest()
+        assert stored.size == len(content) < len(buf.getvalue())
+        assert os.listdir(tmp_path) == [stored.name]
+
+    def test_oversize_aborts_early(self, tmp_path):
+        data = _image_bytes() + b"\0" * (CHUNK_SIZE * 20)
+        stream = CountingStream(data)
+        with pytest.raises(UploadRejected, match="too large"):
+            store_upload(stream, str(tmp_path), CHUNK_SIZE * 2)
+        assert stream.bytes_read <= CHUNK_SIZE * 3
+        assert os.listdir(tmp_path) == []
+
+    def test_non_image_rejected_after_first_chunk(self, tmp_path):
+        stream = CountingStream(b"MZ\x90\x00" + b"\0" * (CHUNK_SIZE * 10))
+        with pytest.raises(UploadRejected, match="not a valid image"):
+            store_upload(stream, str(tmp_path), 10 * 1024 * 1024)
+        assert stream.bytes_read == CHUNK_SIZE
+        assert os.listdir(tmp_path) == []
+
+    def test_truncated_image_fails_verification(self, tmp_path):
+        data = _image_bytes()[:40]
+        with pytest.raises(UploadRejected):
+            store_upload(io.BytesIO(data), str(tmp_path), 1024 * 1024)
+        assert os.listdir(tmp_path) == []
+
+    def test_empty_upload(self, tmp_path):
+        with pytest.raises(UploadRejected, match="Empty"):
+            store_upload(io.BytesIO(b""), str(tmp_path), 1024)
+
+    def test_sniffs_webp(self):
+        assert sniff_image_type(_image_bytes("WEBP")) == "webp"
+        assert sniff_image_type(b"<svg xmlns=...") is None
+
+
+class TestUploadRoute:
+    """The admin endpoint stores uploads through store_upload."""
+
+    @pytest.fixture()
+    def upload_dir(self, app, tmp_path, monkeypatch):
+        static = tmp_path / "static"
+        static.mkdir()
+        monkeypatch.setattr(app, "static_folder", str(static))
+        monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(static / "uploads"))
+        return static / "uploads"
+
+    def _post(self, client, data, name="photo.png", mime="image/png"):
+        return client.post(
+            "/admin/upload-image",
+            data={"image": (io.BytesIO(data), name, mime)},
+            content_type="multipart/form-data",
+        )
+
+    def test_reupload_returns_same_url(self, auth_client, upload_dir):
+        data = _image_bytes()
+        first = self._post(auth_client, data).get_json()
+        second = self._post(auth_client, data, name="copy.png").get_json()
+        assert first["success"] and second["success"]
+        assert first["url"] == second["url"]
+        assert len([p for p in upload_dir.iterdir() if p.is_file()]) == 1
+
+    def test_stripped_upload_is_named_by_its_content(self, auth_client, upload_dir):
+        exif = Image.Exif()
+        exif[0x010F] = "SpyCam"  # Make
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 32), (0, 0, 255)).save(buf, "JPEG", exif=exif)
+        data = buf.getvalue()
+        first = self._post(auth_client, data, "photo.jpg", "image/jpeg").get_json()
+        second = self._post(auth_client, data, "copy.jpg", "image/jpeg").get_json()
+        assert first["url"] == second["url"]
+
+        name = os.path.basename(first["url"])
+        content = (upload_dir / name).read_bytes()
+        assert content != data
+        assert name == f"{hashlib.sha256(content).hexdigest()[:16]}.jpg"
+        with Image.open(upload_dir / name) as im:
+            assert not im.getexif()
+
+    def test_truncated_jpeg_is_rejected(self, auth_client, upload_dir):
+        """verify() passes a cut-off JPEG; stripping its metadata does not."""
+        buf = io.BytesIO()
+        Image.effect_noise((256, 256), 64).convert("RGB").save(buf, "JPEG")
+        resp = self._post(auth_client, buf.getvalue()[:3000], "cut.jpg", "image/jpeg")
+        assert resp.status_code == 400
+        assert resp.get_json()["message"] == "File is not a valid image."
+        assert list(upload_dir.iterdir()) == []
+
+    def test_disguised_file_rejected(self, auth_client, upload_dir):
+        resp = self._post(auth_client, b"<?php echo 1; ?>" + b" " * 100)
+        assert resp.status_code == 400
+        assert resp.get_json()["message"] == "File is not a valid image."
+
+
+class TestGarbageCollection:
+    """Unreferenced uploads and their variants are reclaimed."""
+
+    @pytest.fixture()
+    def uploads(self, app, tmp_path, monkeypatch):
+        folder = tmp_path / "uploads"
+        (folder / "variants").mkdir(parents=True)
+        monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(folder))
+        old = 1_000_000_000  # 2001 — well past any grace period
+        for name in (
+            "aaaa.png",
+            "bbbb.jpg",
+            "cccc.png",
+            "variants/cccc-96w.webp",
+            "variants/cccc.json",
+            "variants/gone-96w.png",
+            ".upload-x.tmp",
+        ):
+            path = folder / name
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (old, old))
+        (folder / ".gitkeep").touch()
+        return folder
+
+    @pytest.fixture()
+    def references(self, db, sample_project, sample_blog_post):
+        project = db.session.get(Project, sample_project.id)
+        project.image_url = "/static/uploads/aaaa.png"
+        post = db.session.get(BlogPost, sample_blog_post.id)
+        post.content = '<p><img src="https://example.com/static/uploads/bbbb.jpg"></p>'
+        db.session.commit()
+
+    def test_reference_index(self, app, references, sample_project):
+        index = reference_index()
+        assert index["aaaa"] == {f"Project#{sample_project.id}.image_url"}
+        assert "bbbb" in index
+        assert "cccc" not in index
+
+    def test_dry_run_reports_without_deleting(self, app, uploads, references):
+        report = collect_garbage(str(uploads), dry_run=True)
+        names = [name for name, _, _ in report.orphans]
+        assert names == [".upload-x.tmp", "cccc.png", "variants/gone-96w.png"]
+        assert report.bytes_reclaimed == 500
+        assert report.files_reclaimed == 5
+        assert report.kept == 2
+        assert (uploads / "cccc.png").exists()
+
+    def test_collects_orphans_and_variants(self, app, uploads, references):
+        collect_garbage(str(uploads))
+        remaining = sorted(
+            str(p.relative_to(uploads)) for p in uploads.rglob("*") if p.is_file()
+        )
+        assert remaining == [".gitkeep", "aaaa.png", "bbbb.jpg"]
+
+    def test_recent_uploads_are_kept(self, app, uploads, references):
+        (uploads / "dddd.png").write_bytes(b"new")
+        report = collect_garbage(str(uploads))
+        assert report.skipped_recent == 1
+        assert (uploads / "dddd.png").exists()
+
+    def test_variant_url_keeps_source(self, app, db, uploads, sample_project):
+        project = db.session.get(Project, sample_project.id)
+        project.image_url = "/static/uploads/variants/cccc-96w.webp"
+        db.session.commit()
+        collect_garbage(str(uploads))
+        assert (uploads / "cccc.png").exists()
+        assert (uploads / "variants" / "cccc-96w.webp").exists()
+
+    def test_cli_dry_run(self, app, uploads, references):
+        result = app.test_cli_runner().invoke(args=["gc-uploads", "--dry-run"])
+        assert result.exit_code == 0, result.output
+        assert "Would remove cccc.png (3 file(s)" in result.output
+        assert (uploads / "cccc.png").exists()